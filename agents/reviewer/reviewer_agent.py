@@ -1,5 +1,6 @@
 # agents/reviewer/reviewer_agent.py
-from api.api import API
+from api.api import API, prompt_text
+from profiling import traced
 from xml.etree import ElementTree
 import asyncio
 
@@ -8,10 +9,20 @@ class ReviewerAgent:
     Agent responsible for reviewing and scoring generated content.
     """
 
-    def __init__(self, api: API):
+    def __init__(self, api: API, file_writer=None):
+        """
+        Initializes the agent.
+
+        Args:
+            api (API): The API generating the text.
+            file_writer (AsyncFileWriter, optional): Writer the prompt log is appended
+                through. Without one, the log is written directly.
+        """
         self.api = api
+        self.file_writer = file_writer
         self.role_description = self._load_role_description()
         self.review_structure = self._load_review_structure()
+        self.system_prompt = self._build_system_prompt()
 
     def _load_role_description(self) -> str:
         """
@@ -34,42 +45,105 @@ class ReviewerAgent:
             content = xml.read()  # Read the entire file content
         return prefix + content
 
+    async def _log_prompt(self, prompt):
+        """Appends a sent prompt to the prompt log."""
+        entry = f"Prompt Sent:\n{prompt_text(prompt)}\n\n"
+        if self.file_writer:
+            await self.file_writer.append("reviewer_sent_prompts.log", entry)
+        else:
+            with open("reviewer_sent_prompts.log", "a", encoding="utf-8") as log_file:
+                log_file.write(entry)
+
     def _load_instructions(self) -> str:
         instructions = "You must review the following book based on the given input."
         return instructions
 
-    async def review_book(self, book, input_prompt):
+    def _build_system_prompt(self) -> str:
+        """
+        Builds the static part of every prompt: instructions, role and review
+        structure. It is sent unchanged as the system message of every call, so the
+        provider can serve it from its prompt cache.
+        """
+        prompt = "<reviewer_prompt>"
+        prompt += (
+            f"<input_instructions>{self._load_instructions()}</input_instructions>"
+        )
+        prompt += f"<role_description>{self.role_description}</role_description>"
+        prompt += f"<output_structure>{self.review_structure}</output_structure>"
+        prompt += "</reviewer_prompt>"
+        return prompt
+
+    async def review_book(self, book, input_prompt, model=None):
         """
         Reviews a generated book and provides a score and feedback.
 
         Args:
-            book (str): The generated book text.
+            book (Book | str): The generated book, parsed or as XML text.
             input_prompt (str): The input prompt used for generating the book.
+            model (str, optional): The model to review with. Defaults to the API's default model.
 
         Returns:
              tuple: (score, feedback) where score is int and feedback is str
         """
-        prompt = "<reviewer_prompt>"
-        prompt += (
-            f"<input_instructions>{self._load_instructions()}</input_instructions>"
-        )
-        prompt += f"<input_prompt>{input_prompt}</input_prompt>"
-        prompt += (
-            f"<role_description>{self._load_role_description()}</role_description>"
-        )
-        prompt += (
-            f"<output_structure>{self._load_review_structure()}</output_structure>"
-        )
-        prompt += book
-        prompt += "</reviewer_prompt>"
+        prompt = [
+            {"role": "system", "content": self.system_prompt},
+            {
+                "role": "user",
+                "content": f"<input_prompt>{input_prompt}</input_prompt>{book}",
+            },
+        ]
 
         # Log the prompt to a file
-        with open("reviewer_sent_prompts.log", "a", encoding="utf-8") as log_file:
-            log_file.write(f"Prompt Sent:\n{prompt}\n\n")
+        await self._log_prompt(prompt)
+
+        response = await self.api.generate_text(prompt, model=model)
+        return response
+
+    async def review_chapter(
+        self, chapter, number, input_prompt, previous_summaries=None, model=None
+    ):
+        """
+        Reviews a single chapter of a book still being written.
 
-        response = await self.api.generate_text(prompt)
+        The chapter is reviewed in the same review structure as a whole book, so the
+        chapter reviews of a draft can be aggregated into one review of it.
+
+        Args:
+            chapter (str): The chapter's XML.
+            number (int): The chapter's number, starting at 1.
+            input_prompt (str): The input prompt used for generating the book.
+            previous_summaries (list, optional): Summaries of the chapters before it.
+            model (str, optional): The model to review with. Defaults to the API's default model.
+
+        Returns:
+            str: The review XML.
+        """
+        context = "".join(
+            f"<summary chapter=\"{n}\">{summary}</summary>"
+            for n, summary in enumerate(previous_summaries or [], start=1)
+        )
+        scope = (
+            f"Review only chapter {number} below; the rest of the book is still being "
+            "written. Rate every aspect for this chapter alone, judging aspects that "
+            "concern the whole book, such as its ending, by how well this chapter "
+            "serves them at its place in the story."
+        )
+        prompt = [
+            {"role": "system", "content": self.system_prompt},
+            {
+                "role": "user",
+                "content": f"<input_prompt>{input_prompt}</input_prompt>"
+                f"<previous_chapters>{context}</previous_chapters>"
+                f"<review_scope>{scope}</review_scope>{chapter}",
+            },
+        ]
+
+        await self._log_prompt(prompt)
+
+        response = await self.api.generate_text(prompt, model=model)
         return response
 
+    @traced("ReviewerAgent.parse_review")
     def parse_review(self, xml_review):
         """
         Parses the review XML and extracts scores and feedback details.
@@ -1,19 +1,77 @@
 # agents/writer/writer_agent.py
-from api.api import API
+from api.api import API, Completion, prompt_text
 from xml.etree import ElementTree
+import re
 import logging
 import asyncio
 
+# Start and end tags, plus comments and processing instructions to skip over
+_TAG = re.compile(
+    r"<!--.*?-->|<[?!].*?>|<(/?)([A-Za-z_][\w.-]*)[^<>]*?(/?)>", re.DOTALL
+)
+_CODE_FENCE = re.compile(r"^\s*```(?:xml)?\s*|\s*```\s*$")
+
+
+def _complete_prefix(text):
+    """
+    Cuts a truncated XML document back to the end of its last complete element.
+
+    Args:
+        text (str): The XML document, possibly cut off mid-element.
+
+    Returns:
+        tuple: The text up to the end of the last complete element, and the names of
+        the elements still open there, outermost first.
+    """
+    stack = []
+    cut, open_at_cut = 0, []
+    for match in _TAG.finditer(text):
+        closing, name, empty = match.groups()
+        if name is None:
+            continue
+        if closing:
+            if name not in stack:
+                break
+            while stack.pop() != name:
+                pass
+        elif not empty:
+            stack.append(name)
+            continue
+        cut, open_at_cut = match.end(), list(stack)
+    return text[:cut], open_at_cut
+
+
+def _is_complete(text) -> bool:
+    """Whether a text is a well-formed XML document."""
+    try:
+        ElementTree.fromstring(text)
+        return True
+    except ElementTree.ParseError:
+        return False
+
 
 class WriterAgent:
     """
     Agent responsible for generating book content.
     """
 
-    def __init__(self, api: API):
+    def __init__(self, api: API, file_writer=None, max_continuations=2):
+        """
+        Initializes the agent.
+
+        Args:
+            api (API): The API generating the text.
+            file_writer (AsyncFileWriter, optional): Writer the prompt log is appended
+                through. Without one, the log is written directly.
+            max_continuations (int): Continuation requests made for a book cut off by
+                the output token limit before closing it where it stopped.
+        """
         self.api = api
+        self.file_writer = file_writer
+        self.max_continuations = max_continuations
         self.role_description = self._load_role_description()
         self.book_structure = self._load_output_structure()
+        self.system_prompt = self._build_system_prompt()
         self.book_draft = False
 
     def _load_role_description(self) -> str:
@@ -37,58 +95,212 @@ class WriterAgent:
             content = xml.read()  # Read the entire file content
         return prefix + content
 
+    async def _log_prompt(self, prompt):
+        """Appends a sent prompt to the prompt log."""
+        entry = f"Prompt Sent:\n{prompt_text(prompt)}\n\n"
+        if self.file_writer:
+            await self.file_writer.append("writer_sent_prompts.log", entry)
+        else:
+            with open("writer_sent_prompts.log", "a", encoding="utf-8") as log_file:
+                log_file.write(entry)
+
+    def _build_system_prompt(self) -> str:
+        """
+        Builds the static part of every prompt: role, writing guidelines and output
+        structure. It is sent unchanged as the system message of every call, so the
+        provider can serve it from its prompt cache.
+        """
+        prompt = "<writer_prompt>"
+        prompt += f"<role_description>{self.role_description}</role_description>"
+        prompt += (
+            "<guidelines>"
+            "Write books with approximately 500 words per chapter. "
+            "Ensure the book contains at least 4 chapters and follows a clear narrative structure with a distinct beginning, middle, and end. "
+            "The beginning should introduce the setting, characters, and conflict. "
+            "The middle should develop the story, building tension and deepening the conflict. "
+            "The end should resolve the conflict and provide a satisfying conclusion, even if it leaves room for a sequel."
+            "</guidelines>"
+        )
+        prompt += f"<output_structure>{self.book_structure}</output_structure>"
+        prompt += "</writer_prompt>"
+        return prompt
+
     def _load_instructions(self) -> str:
         if not self.book_draft:
             self.book_draft = True
-            return (
-                "Write a book with approximately 500 words per chapter. "
-                "Ensure the book contains at least 4 chapters and follows a clear narrative structure with a distinct beginning, middle, and end. "
-                "The beginning should introduce the setting, characters, and conflict. "
-                "The middle should develop the story, building tension and deepening the conflict. "
-                "The end should resolve the conflict and provide a satisfying conclusion, even if it leaves room for a sequel."
-            )
+            return "Write a book on the theme above."
         return "Refine the book based on the feedback provided by the Reviewer, focusing on clarity, coherence, and depth."
 
-    async def generate_book(self, input, previous_books=None, previous_reviews=None):
+    async def generate_book(
+        self, input, previous_books=None, previous_reviews=None, model=None
+    ):
         """
         Generates a book based on a given input prompt, structured into chapters and sections.
 
         Args:
             input (str): The input prompt for the book.
-            previous_books (list, optional): A list of the previous book content for refinement. Defaults to None.
+            previous_books (list, optional): A list of the previous books (Book or XML text) for refinement. Defaults to None.
             previous_reviews (list, optional): A list of the previous review feedback for improvement. Defaults to None.
+            model (str, optional): The model to write with. Defaults to the API's default model.
 
         Returns:
             str: The generated book in XML format.
         """
         logging.info(f"Generating book with prompt: {input}")
-        # Create the root element
-        prompt = "<writer_prompt>"
-        # Add subelements
-        prompt += f"<input_instructions>{self._load_instructions()}</input_instructions>"
-        prompt += f"<theme>{input}</theme>"
-        prompt += f"<role_description>{self._load_role_description()}</role_description>"
-        prompt += f"<output_structure>{self._load_output_structure()}</output_structure>"
+        prompt = self._book_prompt(input, previous_books, previous_reviews)
+
+        # Log the prompt to a file
+        await self._log_prompt(prompt)
+
+        response = await self.api.generate_text(prompt, model=model)
+        return await self._complete_book(response, model=model)
+
+    async def stream_book(
+        self, input, previous_books=None, previous_reviews=None, model=None, on_text=None
+    ):
+        """
+        Generates a book like ``generate_book``, streaming it from the API.
+
+        Args:
+            input (str): The input prompt for the book.
+            previous_books (list, optional): The previous books for refinement.
+            previous_reviews (list, optional): The previous review feedback.
+            model (str, optional): The model to write with. Defaults to the API's default model.
+            on_text (callable, optional): Called with every piece of the book as it
+                                          arrives, before the book is complete.
+
+        Returns:
+            str: The generated book in XML format, as a ``Completion``.
+        """
+        logging.info(f"Streaming book with prompt: {input}")
+        prompt = self._book_prompt(input, previous_books, previous_reviews)
+        await self._log_prompt(prompt)
+
+        pieces = []
+        metadata = None
+        async for piece in self.api.stream_text(prompt, model=model):
+            if isinstance(piece, Completion):
+                metadata = piece
+            if piece:
+                pieces.append(piece)
+                if on_text:
+                    on_text(piece)
+        text = _CODE_FENCE.sub("", "".join(pieces))
+        if not text:
+            return None
+        response = Completion(
+            text,
+            getattr(metadata, "model", None),
+            getattr(metadata, "usage", None),
+            getattr(metadata, "finish_reason", None),
+        )
+        return await self._complete_book(response, model=model)
+
+    def _book_prompt(self, input, previous_books=None, previous_reviews=None) -> list:
+        """Builds the request to write or refine a book."""
+        # The variable parts follow the static system prompt, least variable first:
+        # the theme is the same for the whole run, the books change every epoch
+        request = f"<theme>{input}</theme>"
         if previous_books and previous_reviews:
             for i, (book, review) in enumerate(zip(previous_books, previous_reviews)):
-                if i == 0:
-                    prompt += f"<best_book>"
-                else:
-                    prompt += f"<last_book>"
-                prompt += f"<book_content>{book}</book_content>"
-                prompt += f"<review_content>{review}</review_content>"
-                if i == 0:
-                    prompt += f"</best_book>"
-                else:
-                    prompt += f"<last_book>"
-        prompt += "</writer_prompt>"
+                if book is None:
+                    continue
+                tag = "best_book" if i == 0 else "last_book"
+                request += f"<{tag}>"
+                request += f"<book_content>{book}</book_content>"
+                request += f"<review_content>{review}</review_content>"
+                request += f"</{tag}>"
+        request += f"<input_instructions>{self._load_instructions()}</input_instructions>"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": request},
+        ]
 
-        # Log the prompt to a file
-        with open("writer_sent_prompts.log", "a", encoding="utf-8") as log_file:
-            log_file.write(f"Prompt Sent:\n{prompt}\n\n")
+    def _is_truncated(self, book) -> bool:
+        """Whether a book was cut short, by the provider's account or its own XML."""
+        if getattr(book, "truncated", False):
+            return True
+        start = book.find("<book")
+        return start >= 0 and "</book>" not in book[start:]
+
+    async def _complete_book(self, book, model=None):
+        """
+        Completes a book cut off by the output token limit.
+
+        Rather than regenerating the book, the writer is asked to continue it from the
+        end of its last complete element, which costs one short call per missing
+        stretch. If the book is still incomplete after ``max_continuations`` calls,
+        its open elements are closed after the last complete one.
+
+        Args:
+            book (str): The writer's response, possibly an ``api.api.Completion``.
+            model (str, optional): The model to write with.
+
+        Returns:
+            str: The book, as a ``Completion`` with the combined usage if any
+            continuation was requested.
+        """
+        if not book or not self._is_truncated(book):
+            return book
+
+        text = _CODE_FENCE.sub("", str(book))
+        text = text[max(text.find("<book"), 0) :]
+        usage = dict(getattr(book, "usage", {}))
+        finish_reason = getattr(book, "finish_reason", None)
+        for attempt in range(1, self.max_continuations + 1):
+            prefix, open_elements = _complete_prefix(text)
+            if not open_elements:
+                break
+            logging.warning(
+                f"Book cut off inside <{open_elements[-1]}>, requesting continuation "
+                f"{attempt} of {self.max_continuations}..."
+            )
+            prompt = self._continuation_prompt(prefix, open_elements)
+            await self._log_prompt(prompt)
+            continuation = await self.api.generate_text(prompt, model=model)
+            if not continuation:
+                break
+            for key, value in getattr(continuation, "usage", {}).items():
+                if value is not None:
+                    usage[key] = (usage.get(key) or 0) + value
+            finish_reason = getattr(continuation, "finish_reason", None)
+            continuation = _CODE_FENCE.sub("", str(continuation)).lstrip()
+            # A model that starts over has rewritten the whole book
+            text = (
+                continuation
+                if continuation.startswith("<book")
+                else prefix + continuation
+            )
+            if not self._is_truncated(Completion(text, finish_reason=finish_reason)):
+                break
+
+        if not _is_complete(text):
+            prefix, open_elements = _complete_prefix(text)
+            closed = prefix + "".join(f"</{name}>" for name in reversed(open_elements))
+            if _is_complete(closed):
+                logging.warning(
+                    "Book still incomplete, closing it after its last complete element."
+                )
+                text = closed
+        return Completion(text, getattr(book, "model", None), usage, finish_reason)
 
-        response = await self.api.generate_text(prompt)
-        return response
+    def _continuation_prompt(self, prefix, open_elements) -> list:
+        """Builds the request to continue a book from the end of a partial text."""
+        closing = "".join(f"</{name}>" for name in reversed(open_elements))
+        prompt = "<continuation_prompt>"
+        prompt += (
+            "<input_instructions>Your previous response was cut off by the output length "
+            "limit. Continue the book exactly where the partial book below ends, in the same "
+            "style. Output only the XML that follows the partial book, without repeating "
+            f"any of it, and finish the book by closing the open elements with {closing}."
+            "</input_instructions>"
+        )
+        prompt += f"<partial_book>{prefix}</partial_book>"
+        prompt += "</continuation_prompt>"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,327 @@
+# agents/writer_chapter/chapter_writer_agent.py
+from api.api import API
+from book import Chapter
+from collections import deque
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+import os
+import json
+import functools
+import logging
+import asyncio
+
+
+def _extract_element(text, tag):
+    """
+    Parses the first <tag> element found in a model response.
+
+    Models sometimes wrap their XML in prose or code fences, so everything outside
+    the element is ignored.
+
+    Raises:
+        ValueError: If the response does not contain a well-formed element.
+    """
+    start = text.find(f"<{tag}>")
+    end = text.rfind(f"</{tag}>")
+    if start < 0 or end < 0:
+        raise ValueError(f"No <{tag}> element in the response.")
+    try:
+        return ElementTree.fromstring(text[start : end + len(tag) + 3])
+    except ElementTree.ParseError as e:
+        raise ValueError(f"Invalid <{tag}> element: {e}")
+
+
+class ChapterWriterAgent:
+    """
+    Agent writing long books one chapter at a time.
+
+    A single-shot book is capped by the model's output limit, so in long-book mode
+    the agent first writes a global outline and then each chapter in sequence. Every
+    chapter prompt holds the premise, the outline entries of the next few chapters and
+    the summaries of the last few chapters, so its size stays the same however long
+    the book gets. Completed chapters are appended to disk as they are written and
+    only their summaries are kept in memory, which also makes an interrupted book
+    resumable from its last completed chapter.
+    """
+
+    OUTLINE_FILE = "outline.json"
+    CHAPTERS_FILE = "chapters.jsonl"
+    PROMPT_LOG = "chapter_writer_sent_prompts.log"
+
+    def __init__(self, api: API, file_writer=None, summary_window=5, outline_window=3):
+        """
+        Initializes the agent.
+
+        Args:
+            api (API): The API generating the text.
+            file_writer (AsyncFileWriter, optional): Writer chapters and the prompt log
+                are appended through. Without one, files are written directly.
+            summary_window (int): Number of previous chapter summaries in each prompt.
+            outline_window (int): Number of outline entries, from the current chapter
+                on, in each prompt.
+        """
+        self.api = api
+        self.file_writer = file_writer
+        self.summary_window = summary_window
+        self.outline_window = outline_window
+        self.role_description = self._load_role_description()
+        self.chapter_structure = self._load_output_structure()
+
+    def _load_role_description(self) -> str:
+        """
+        Loads the role description for this agent from role.xml
+        """
+        tree = ElementTree.parse("agents/writer_chapter/role.xml")
+        return tree.getroot().find("description").text
+
+    def _load_output_structure(self) -> str:
+        """
+        Loads the structure of a single chapter from structure.xml
+        """
+        root = ElementTree.parse("agents/writer_chapter/structure.xml").getroot()
+        chapter = root.find(".//chapter")
+        prefix = """Output Structure Instructions:
+1. The LLM must adhere strictly to the schema provided.
+2. The LLM must use the XML format provided.
+3. The LLM must output exactly one <chapter> element.
+        """
+        return prefix + ElementTree.tostring(chapter, encoding="unicode")
+
+    async def _append(self, path, text, sync=False):
+        """Appends text to a file, through the file writer if there is one."""
+        if self.file_writer:
+            await self.file_writer.append(path, text)
+            if sync:
+                await self.file_writer.sync()
+        else:
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(text)
+                if sync:
+                    file.flush()
+                    os.fsync(file.fileno())
+
+    async def _io(self, function, *args):
+        """Runs a blocking file operation, on the file writer's thread if there is one."""
+        if self.file_writer:
+            return await self.file_writer.call(function, *args)
+        return function(*args)
+
+    def _write_outline(self, directory, outline):
+        with open(os.path.join(directory, self.OUTLINE_FILE), "w", encoding="utf-8") as file:
+            json.dump(outline, file)
+
+    async def _log_prompt(self, prompt):
+        """Appends a sent prompt to the prompt log."""
+        await self._append(self.PROMPT_LOG, f"Prompt Sent:\n{prompt}\n\n")
+
+    async def generate_outline(self, input, chapters, model=None) -> dict:
+        """
+        Writes the global outline of a long book.
+
+        Args:
+            input (str): The input prompt for the book.
+            chapters (int): Number of chapters to outline.
+            model (str, optional): The model to write with.
+
+        Returns:
+            dict: The book ``title``, its ``premise`` and one synopsis per chapter in
+            ``chapters``. Chapters the model did not outline get an empty synopsis.
+        """
+        prompt = "<outline_prompt>"
+        prompt += (
+            "<input_instructions>"
+            f"Outline a book of exactly {chapters} chapters with a clear narrative arc: "
+            "the beginning introduces the setting, characters and conflict, the middle "
+            "develops it, and the end resolves it. Give the book a title, a premise of a "
+            "few sentences and a one-sentence synopsis per chapter."
+            "</input_instructions>"
+        )
+        prompt += f"<chapter_count>{chapters}</chapter_count>"
+        prompt += f"<theme>{escape(input)}</theme>"
+        prompt += f"<role_description>{self.role_description}</role_description>"
+        prompt += (
+            "<output_structure><outline><title>Book Title</title><premise>Premise</premise>"
+            "<chapter><synopsis>One-sentence synopsis</synopsis></chapter>"
+            "<!-- One chapter element per chapter --></outline></output_structure>"
+        )
+        prompt += "</outline_prompt>"
+        await self._log_prompt(prompt)
+
+        root = _extract_element(await self.api.generate_text(prompt, model=model), "outline")
+        synopses = [
+            (chapter.findtext("synopsis") or "").strip()
+            for chapter in root.findall("chapter")
+        ][:chapters]
+        if len(synopses) < chapters:
+            logging.warning(
+                f"Outline covers {len(synopses)} of {chapters} chapters; "
+                "the rest will follow the premise."
+            )
+        return {
+            "title": (root.findtext("title") or "Untitled").strip(),
+            "premise": (root.findtext("premise") or "").strip(),
+            "chapters": synopses + [""] * (chapters - len(synopses)),
+        }
+
+    async def generate_chapter(self, input, outline, number, summaries, model=None):
+        """
+        Writes one chapter from the outline and the summaries of the previous chapters.
+
+        Args:
+            input (str): The input prompt for the book.
+            outline (dict): The outline returned by ``generate_outline``.
+            number (int): The chapter number, starting at 1.
+            summaries (iterable): (number, summary) of the most recent chapters.
+            model (str, optional): The model to write with.
+
+        Returns:
+            Chapter: The parsed chapter.
+
+        Raises:
+            ValueError: If the response does not contain a valid chapter.
+        """
+        total = len(outline["chapters"])
+        upcoming = "".join(
+            f'<chapter number="{n}">{escape(outline["chapters"][n - 1])}</chapter>'
+            for n in range(number, min(number + self.outline_window, total + 1))
+        )
+        previous = "".join(
+            f'<chapter number="{n}">{escape(summary)}</chapter>'
+            for n, summary in summaries
+        )
+        position = (
+            "This is the final chapter: resolve the conflict and conclude the book."
+            if number == total
+            else "Continue the story from the previous chapters."
+        )
+        prompt = "<chapter_writer_prompt>"
+        prompt += (
+            "<input_instructions>"
+            f"Write chapter {number} of {total}, approximately 500 words, following the "
+            f"outline. {position} Include a summary of the chapter, which later "
+            "chapters will build on."
+            "</input_instructions>"
+        )
+        prompt += f"<theme>{escape(input)}</theme>"
+        prompt += f"<role_description>{self.role_description}</role_description>"
+        prompt += f"<book_title>{escape(outline['title'])}</book_title>"
+        prompt += f"<premise>{escape(outline['premise'])}</premise>"
+        prompt += f"<outline>{upcoming}</outline>"
+        prompt += f"<previous_chapters>{previous}</previous_chapters>"
+        prompt += f"<output_structure>{self.chapter_structure}</output_structure>"
+        prompt += "</chapter_writer_prompt>"
+        await self._log_prompt(prompt)
+
+        response = await self.api.generate_text(prompt, model=model)
+        return Chapter.from_element(_extract_element(response, "chapter"))
+
+    def _load_progress(self, directory):
+        """
+        Reads the outline and progress of a book written to a directory.
+
+        Returns:
+            tuple: (outline or None, number of completed chapters, the most recent
+            summaries as (number, summary) pairs).
+        """
+        outline = None
+        outline_path = os.path.join(directory, self.OUTLINE_FILE)
+        if os.path.exists(outline_path):
+            with open(outline_path, "r", encoding="utf-8") as file:
+                outline = json.load(file)
+
+        completed = 0
+        summaries = deque(maxlen=self.summary_window)
+        chapters_path = os.path.join(directory, self.CHAPTERS_FILE)
+        if os.path.exists(chapters_path):
+            valid_bytes = 0
+            with open(chapters_path, "rb") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A chapter cut short by an interruption: write it again
+                        break
+                    completed = entry["number"]
+                    summaries.append((entry["number"], entry["summary"] or ""))
+                    valid_bytes += len(line)
+            if valid_bytes < os.path.getsize(chapters_path):
+                with open(chapters_path, "r+b") as file:
+                    file.truncate(valid_bytes)
+        return outline, completed, summaries
+
+    async def generate_book(self, input, chapters, directory, model=None):
+        """
+        Writes a long book chapter by chapter, resuming any earlier progress.
+
+        Args:
+            input (str): The input prompt for the book.
+            chapters (int): Number of chapters.
+            directory (str): Directory holding the outline and completed chapters.
+            model (str, optional): The model to write with.
+
+        Returns:
+            dict: The outline of the book.
+
+        Raises:
+            ValueError: If the directory holds a book on another theme or of another
+                        number of chapters.
+        """
+        await self._io(functools.partial(os.makedirs, exist_ok=True), directory)
+        outline, completed, summaries = await self._io(self._load_progress, directory)
+        if outline is None:
+            outline = await self.generate_outline(input, chapters, model=model)
+            outline.update(theme=input, chapter_count=chapters)
+            await self._io(self._write_outline, directory, outline)
+        elif (outline.get("theme"), outline.get("chapter_count")) != (input, chapters):
+            count = outline.get("chapter_count", len(outline["chapters"]))
+            raise ValueError(
+                f"'{directory}' holds a book of {count} chapters on the theme "
+                f"'{outline.get('theme')}'; choose another directory to write a "
+                "different book."
+            )
+        elif completed:
+            logging.info(f"Resuming after chapter {completed} of {len(outline['chapters'])}")
+
+        chapters_path = os.path.join(directory, self.CHAPTERS_FILE)
+        for number in range(completed + 1, len(outline["chapters"]) + 1):
+            chapter = await self.generate_chapter(
+                input, outline, number, summaries, model=model
+            )
+            entry = {
+                "number": number,
+                "summary": chapter.summary,
+                "xml": ElementTree.tostring(chapter.to_element(), encoding="unicode"),
+            }
+            await self._append(chapters_path, json.dumps(entry) + "\n", sync=True)
+            summaries.append((number, chapter.summary or ""))
+            logging.info(f"Chapter {number} of {len(outline['chapters'])} written")
+        return outline
+
+    def write_book_xml(self, directory, path):
+        """
+        Assembles the completed chapters into a book XML file, one chapter at a time.
+
+        Args:
+            directory (str): Directory the book was written to.
+            path (str): Path of the book XML file to write.
+
+        Returns:
+            str: The path written.
+        """
+        with open(os.path.join(directory, self.OUTLINE_FILE), "r", encoding="utf-8") as file:
+            outline = json.load(file)
+        with open(path, "w", encoding="utf-8") as book, open(
+            os.path.join(directory, self.CHAPTERS_FILE), "r", encoding="utf-8"
+        ) as chapters:
+            book.write(f"<book><title>{escape(outline['title'])}</title><chapters>")
+            for line in chapters:
+                book.write(json.loads(line)["xml"])
+            book.write("</chapters></book>")
+        return path
+
+
+if __name__ == "__main__":
+    from api.mock_api import MockAPI
+
+    writer = ChapterWriterAgent(MockAPI())
+    print(asyncio.run(writer.generate_book("A mystery in a haunted house", 6, "output/long_book")))
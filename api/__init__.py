@@ -0,0 +1,56 @@
+# api/__init__.py
+from lazy_imports import timed_import
+
+# Maps a provider name to the module and class implementing it. Modules are only
+# imported when their provider is selected, so unused SDKs never load.
+PROVIDERS = {
+    "openai": ("api.openai_api", "OpenAIAPI"),
+    "deepseek": ("api.deepseek_api", "DeepSeekAPI"),
+    "google": ("api.google_api", "GoogleAPI"),
+    "mock": ("api.mock_api", "MockAPI"),
+}
+
+
+def register_provider(name, module_name, class_name):
+    """
+    Registers an API provider.
+
+    Args:
+        name (str): The provider name used on the command line.
+        module_name (str): Dotted module path containing the API class.
+        class_name (str): Name of the API subclass within the module.
+    """
+    PROVIDERS[name] = (module_name, class_name)
+
+
+def load_provider(name):
+    """
+    Imports and returns the API class registered under the given name.
+
+    Args:
+        name (str): The provider name.
+
+    Returns:
+        type: The API subclass.
+
+    Raises:
+        ValueError: If no provider is registered under the name.
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Invalid API type: {name}")
+    module_name, class_name = PROVIDERS[name]
+    return getattr(timed_import(module_name), class_name)
+
+
+def create_api(name, api_key=None):
+    """
+    Creates an instance of the API registered under the given name.
+
+    Args:
+        name (str): The provider name.
+        api_key (str, optional): API key or path to a key file.
+
+    Returns:
+        API: The API instance.
+    """
+    return load_provider(name)(api_key=api_key)
@@ -1,10 +1,59 @@
 # api/api.py
 from abc import ABC, abstractmethod
 
+
+def prompt_text(prompt) -> str:
+    """
+    Returns the text of a prompt given either as a string or as chat messages.
+
+    Args:
+        prompt (str | list): A plain prompt, or a list of {"role", "content"} messages.
+
+    Returns:
+        str: The prompt itself, or the contents of its messages joined by newlines.
+    """
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(message["content"] for message in prompt)
+
+
+class Completion(str):
+    """
+    Text returned by an API call, carrying the response metadata.
+
+    Behaves exactly like a plain string, so callers that only need the text are
+    unaffected, while callers interested in usage, the model that answered or why
+    it stopped can read the extra attributes.
+
+    ``finish_reason`` is normalized across providers: "stop" for a natural end,
+    "length" when the output token limit cut the text short, or the provider's own
+    reason otherwise. None if the provider did not report one.
+    """
+
+    def __new__(cls, text, model=None, usage=None, finish_reason=None):
+        completion = super().__new__(cls, text)
+        completion.model = model
+        completion.usage = usage or {}
+        completion.finish_reason = finish_reason
+        return completion
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the output token limit cut the text short."""
+        return self.finish_reason == "length"
+
+
 class API(ABC):
     """
     Abstract base class for API interactions.
     """
+
+    MODEL_NAME = None
+    FAST_MODEL_NAME = None
+    # Seconds a single call may take when the caller gives no timeout. A whole book
+    # of up to 8192 tokens must fit in it.
+    DEFAULT_TIMEOUT = 600
+
     def __init__(self, api_key=None):
         """
         Initializes the API object.
@@ -16,6 +65,7 @@ class API(ABC):
         if not api_key:
             api_key = self._load_api_key_from_env()
         self.api_key = api_key
+        self.timeout = self.DEFAULT_TIMEOUT
 
     @abstractmethod
     def _load_api_key_from_env(self):
@@ -29,11 +79,36 @@ class API(ABC):
         """
         Abstract method to generate text from a given prompt.
 
+        Implementations give up after ``timeout`` seconds (defaulting to
+        ``self.timeout``), cancelling the request and raising ``TimeoutError``.
+
         Args:
-            prompt (str): The input prompt for text generation.
+            prompt (str | list): The input prompt for text generation, either a
+                                 string or a list of {"role", "content"} chat
+                                 messages. A leading "system" message holds the
+                                 static part of the prompt, which providers can
+                                 cache across calls.
             **kwargs: Additional keyword arguments for the API call.
 
         Returns:
             str: The generated text.
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def stream_text(self, prompt, **kwargs):
+        """
+        Generates text from a given prompt, yielding it as it is produced.
+
+        The pieces are plain strings that concatenate to the full text. The last one
+        is a ``Completion`` carrying the response metadata, empty unless the provider
+        does not stream, in which case the whole text comes as that single piece.
+        ``timeout`` bounds the wait for each piece rather than the whole response.
+
+        Args:
+            prompt (str | list): The input prompt, as for ``generate_text``.
+            **kwargs: Additional keyword arguments for the API call.
+
+        Yields:
+            str: The next piece of the generated text.
+        """
+        yield await self.generate_text(prompt, **kwargs)
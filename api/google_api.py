@@ -1,7 +1,8 @@
 # api/google_api.py
 import os
 import re
-from api.api import API
+import asyncio
+from api.api import API, Completion
 import google.generativeai as genai
 
 
@@ -11,6 +12,7 @@ class GoogleAPI(API):
     """
 
     MODEL_NAME = "models/gemini-2.0-flash-thinking-exp"
+    FAST_MODEL_NAME = "models/gemini-2.0-flash"
 
     def __init__(self, api_key=None):
         """
@@ -74,30 +76,98 @@ class GoogleAPI(API):
         else:
             raise ValueError("API key not found in environment variables.")
 
-    async def generate_text(self, prompt, timeout=10, **kwargs):
+    async def generate_text(self, prompt, model=None, timeout=None, **kwargs):
         """
         Generates text using the Google API.
 
         Args:
             prompt (str): The input prompt for text generation.
-            timeout (int): Timeout in seconds for the API call.
+            model (str, optional): The Gemini model to use. Defaults to MODEL_NAME.
+            timeout (float, optional): Timeout in seconds for the API call. Defaults
+                                       to ``self.timeout``.
             **kwargs: Additional keyword arguments for the API call.
 
         Returns:
             str: The generated text.
 
         Raises:
-             NotImplementedError: This method is not yet implemented for Google API.
+            TimeoutError: If the call took longer than ``timeout``.
         """
-        model = genai.GenerativeModel(self.MODEL_NAME)
+        model_name = model or self.MODEL_NAME
+        system_instruction, contents = _split_messages(prompt)
+        model = genai.GenerativeModel(
+            model_name, system_instruction=system_instruction
+        )
+        timeout = timeout or self.timeout
         try:
-            response = model.generate_content(prompt)
-            return extract_xml_from_markdown(response.text)
+            response = await asyncio.wait_for(
+                model.generate_content_async(
+                    contents, request_options={"timeout": timeout}
+                ),
+                timeout,
+            )
+            return Completion(
+                extract_xml_from_markdown(response.text),
+                model=model_name,
+                usage=_usage_from_response(response),
+                finish_reason=_finish_reason_from_response(response),
+            )
         except Exception as e:
             self.log_output({"error": str(e)}, self.LOG_FILE)
             print(f"Error generating text with Google API: {e}")
             raise
 
+    async def stream_text(self, prompt, model=None, timeout=None, **kwargs):
+        """
+        Generates text using the Google API, yielding it as it streams in.
+
+        Unlike ``generate_text``, the text is yielded as generated, so a Markdown
+        code fence around it is left for the caller to strip.
+
+        Args:
+            prompt (str | list): The input prompt, or a list of chat messages.
+            model (str, optional): The Gemini model to use. Defaults to MODEL_NAME.
+            timeout (float, optional): Timeout in seconds for each chunk. Defaults
+                                       to ``self.timeout``.
+            **kwargs: Additional keyword arguments for the API call.
+
+        Yields:
+            str: The next piece of the text, then an empty ``Completion`` carrying
+            the model, usage and finish reason.
+
+        Raises:
+            TimeoutError: If the next chunk took longer than ``timeout``.
+        """
+        model_name = model or self.MODEL_NAME
+        system_instruction, contents = _split_messages(prompt)
+        model = genai.GenerativeModel(
+            model_name, system_instruction=system_instruction
+        )
+        timeout = timeout or self.timeout
+        response = await asyncio.wait_for(
+            model.generate_content_async(
+                contents, stream=True, request_options={"timeout": timeout}
+            ),
+            timeout,
+        )
+        chunks = aiter(response)
+        last = None
+        while True:
+            try:
+                chunk = await asyncio.wait_for(anext(chunks), timeout)
+            except StopAsyncIteration:
+                break
+            last = chunk
+            if chunk.parts:
+                yield chunk.text
+        # The last chunk holds the usage and finish reason of the whole response
+        yield Completion(
+            "",
+            model=model_name,
+            usage=_usage_from_response(last) if last else {},
+            finish_reason=_finish_reason_from_response(last) if last else None,
+        )
+
     def list_models(self):
         print("List of models that support generateContent:\n")
         for m in genai.list_models():
@@ -109,6 +179,66 @@ class GoogleAPI(API):
         print(model_info)
 
 
+def _split_messages(prompt):
+    """
+    Converts a prompt to Gemini's system instruction and contents.
+
+    Args:
+        prompt (str | list): A plain prompt, or a list of {"role", "content"} messages.
+
+    Returns:
+        tuple: The system instruction (None if there is none) and the contents.
+    """
+    if isinstance(prompt, str):
+        return None, prompt
+    system = [m["content"] for m in prompt if m["role"] == "system"]
+    contents = [
+        {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+        for m in prompt
+        if m["role"] != "system"
+    ]
+    return "\n".join(system) or None, contents
+
+
+def _usage_from_response(response) -> dict:
+    """
+    Extracts the token counts from a Gemini response.
+
+    Args:
+        response: The GenerateContentResponse object.
+
+    Returns:
+        dict: The prompt, completion and cached prompt token counts, empty if not
+        reported.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "completion_tokens": getattr(usage, "candidates_token_count", None),
+        # Prompt tokens served from Gemini's implicit or explicit context cache
+        "cached_tokens": getattr(usage, "cached_content_token_count", None),
+    }
+
+
+def _finish_reason_from_response(response):
+    """
+    Reads why a Gemini response ended, in the terms of ``Completion.finish_reason``.
+
+    Args:
+        response: The GenerateContentResponse object.
+
+    Returns:
+        str: "stop", "length", the lower-cased Gemini reason, or None if not reported.
+    """
+    candidates = getattr(response, "candidates", None)
+    if not candidates or candidates[0].finish_reason is None:
+        return None
+    reason = getattr(candidates[0].finish_reason, "name", str(candidates[0].finish_reason))
+    return {"STOP": "stop", "MAX_TOKENS": "length"}.get(reason, reason.lower())
+
+
 def extract_xml_from_markdown(markdown_response: str) -> str:
     """
     Extract XML content from a Markdown response.
@@ -1,13 +1,17 @@
 # api/mock_api.py
-from api.api import API
+from api.api import API, Completion, prompt_text
 import asyncio
 import os
+import re
 
 class MockAPI(API):
     """
     Mock implementation of the API class for testing without real API calls.
     """
 
+    MODEL_NAME = "mock"
+    FAST_MODEL_NAME = "mock"
+
     def __init__(self, api_key=None):
         """
         Initializes the MockAPI object.
@@ -22,21 +26,38 @@ class MockAPI(API):
         """
         return "mock_api_key"
 
-    async def generate_text(self, prompt, timeout=10, **kwargs):
+    async def generate_text(self, prompt, timeout=None, **kwargs):
         """
         Mocks text generation based on the given prompt.
 
         :param prompt: The input prompt for the mock API.
-        :param timeout: Timeout for the mock response (default is 10 seconds).
+        :param timeout: Timeout for the mock response (ignored, mock responses are immediate).
         :param kwargs: Additional parameters (ignored in this mock implementation).
         :return: The mocked response (either a review or a book).
         """
+        prompt = prompt_text(prompt)
         try:
             if "<reviewer_prompt>" in prompt:
                 # Simulate reviewer response
                 with open("mock/review.txt", "r", encoding="utf-8") as file:
                     return file.read()
 
+            if "<outline_prompt>" in prompt:
+                # Simulate an outline with one synopsis per requested chapter
+                count = int(re.search(r"<chapter_count>(\d+)</chapter_count>", prompt).group(1))
+                chapters = "".join(
+                    f"<chapter><synopsis>Mock synopsis {n}</synopsis></chapter>"
+                    for n in range(1, count + 1)
+                )
+                return f"<outline><title>Mock Book</title><premise>Mock premise</premise>{chapters}</outline>"
+
+            if "<chapter_writer_prompt>" in prompt:
+                # Simulate a single chapter, cycling through the chapters of the mock book
+                with open("mock/book.txt", "r", encoding="utf-8") as file:
+                    chapters = re.findall(r"<chapter>.*?</chapter>", file.read(), re.DOTALL)
+                number = int(re.search(r"Write chapter (\d+)", prompt).group(1))
+                return chapters[(number - 1) % len(chapters)]
+
             if "<writer_prompt>" in prompt:
                 # Simulate writer response
                 with open("mock/book.txt", "r", encoding="utf-8") as file:
@@ -49,6 +70,23 @@ class MockAPI(API):
         except Exception as e:
             return f"An unexpected error occurred: {e}"
 
+    async def stream_text(self, prompt, timeout=None, chunk_size=256, **kwargs):
+        """
+        Mocks streaming by yielding the mocked response in pieces.
+
+        :param prompt: The input prompt for the mock API.
+        :param timeout: Timeout for each piece (ignored, mock responses are immediate).
+        :param chunk_size: Number of characters per piece.
+        :param kwargs: Additional parameters (ignored in this mock implementation).
+        :return: An async iterator over the pieces, ending with an empty Completion.
+        """
+        text = await self.generate_text(prompt, **kwargs)
+        for start in range(0, len(text), chunk_size):
+            yield text[start : start + chunk_size]
+            # Let other tasks run between pieces, as a real stream would
+            await asyncio.sleep(0)
+        yield Completion("", model=self.MODEL_NAME, finish_reason="stop")
+
 if __name__ == "__main__":
     # Example usage of MockAPI
     api = MockAPI("google_api.key")
@@ -1,7 +1,7 @@
 # api/openai_api.py
 import os
 import asyncio
-from api.api import API
+from api.api import API, Completion
 from openai import OpenAI
 
 
@@ -10,6 +10,9 @@ class OpenAIAPI(API):
     Concrete class for interactions with the OpenAI API.
     """
 
+    MODEL_NAME = "chatgpt-4o-latest"
+    FAST_MODEL_NAME = "gpt-4o-mini"
+
     def __init__(self, api_key=None):
         """
         Initializes the OpenAI API object.
@@ -74,52 +77,130 @@ class OpenAIAPI(API):
     async def generate_text(
         self,
         prompt,
-        model="chatgpt-4o-latest",
+        model=None,
         max_tokens=8192,
         temperature=1.0,
-        timeout=10,
+        timeout=None,
         **kwargs,
     ):
         """
         Generates text using the OpenAI API.
 
         Args:
-            prompt (str): The input prompt for text generation.
-            model (str): The OpenAI model to use.
+            prompt (str | list): The input prompt, or a list of chat messages.
+            model (str, optional): The OpenAI model to use. Defaults to MODEL_NAME.
             max_tokens (int): The maximum number of tokens for the generated text.
             temperature (float): The sampling temperature.
-            timeout (int): Timeout in seconds for the API call.
+            timeout (float, optional): Timeout in seconds for the API call. Defaults
+                                       to ``self.timeout``.
             **kwargs: Additional keyword arguments for the API call.
 
         Returns:
             str: The generated text, or None if an error occurred.
-        """
-        # Convert a plain string prompt into a "system" message.
-        # If `prompt` is a list, assume it's already in the correct chat format.
-        if isinstance(prompt, str):
-            messages = [{"role": "system", "content": prompt}]
-        else:
-            if not isinstance(prompt, list):
-                raise TypeError(
-                    "Prompt must be either a string or a list of messages (JSON)."
-                )
-            messages = prompt
 
+        Raises:
+            TimeoutError: If the call took longer than ``timeout``.
+        """
+        messages = _messages(prompt)
+        timeout = timeout or self.timeout
         try:
-            response = self.client.chat.completions.create(
+            model = model or self.MODEL_NAME
+            # The client is synchronous: call it on a worker thread so concurrent
+            # requests do not block the event loop. The client's own timeout ends
+            # the thread's request once the wait below has given up on it.
+            response = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.client.chat.completions.create,
+                    model=model,
+                    messages=messages,
+                    stream=False,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=timeout,
+                    **kwargs,
+                ),
+                timeout,
+            )
+            choice = response.choices[0]
+            return Completion(
+                choice.message.content,
                 model=model,
-                messages=messages,
-                stream=False,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs,
+                usage=_usage_from_response(response),
+                finish_reason=choice.finish_reason,
             )
-            generated_text = response.choices[0].message.content
-            return generated_text
+        except TimeoutError:
+            raise
         except Exception as e:
             print(f"An error occurred while generating text: {e}")
             return None
 
+    async def stream_text(
+        self,
+        prompt,
+        model=None,
+        max_tokens=8192,
+        temperature=1.0,
+        timeout=None,
+        **kwargs,
+    ):
+        """
+        Generates text using the OpenAI API, yielding it as it streams in.
+
+        Args:
+            prompt (str | list): The input prompt, or a list of chat messages.
+            model (str, optional): The OpenAI model to use. Defaults to MODEL_NAME.
+            max_tokens (int): The maximum number of tokens for the generated text.
+            temperature (float): The sampling temperature.
+            timeout (float, optional): Timeout in seconds for each chunk. Defaults
+                                       to ``self.timeout``.
+            **kwargs: Additional keyword arguments for the API call.
+
+        Yields:
+            str: The next piece of the text, then an empty ``Completion`` carrying
+            the model, usage and finish reason.
+
+        Raises:
+            TimeoutError: If the next chunk took longer than ``timeout``.
+        """
+        messages = _messages(prompt)
+        timeout = timeout or self.timeout
+        model = model or self.MODEL_NAME
+        stream = await asyncio.wait_for(
+            asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout,
+                **kwargs,
+            ),
+            timeout,
+        )
+        chunks = iter(stream)
+        usage, finish_reason = {}, None
+        try:
+            while True:
+                # Each chunk is read on a worker thread, like the request itself
+                chunk = await asyncio.wait_for(
+                    asyncio.to_thread(next, chunks, None), timeout
+                )
+                if chunk is None:
+                    break
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        yield choice.delta.content
+                # Requested above: the last chunk carries the usage, with no choices
+                if getattr(chunk, "usage", None):
+                    usage = _usage_from_response(chunk)
+        finally:
+            stream.close()
+        yield Completion("", model=model, usage=usage, finish_reason=finish_reason)
+
     def test_api(self):
         """
         A simple test method to verify the API setup by making a single request.
@@ -129,6 +210,41 @@ class OpenAIAPI(API):
         print("Test API result:", result)
 
 
+def _messages(prompt) -> list:
+    """
+    Converts a prompt to chat messages. A plain string becomes a single "system"
+    message; a list is assumed to be in the chat format already.
+    """
+    if isinstance(prompt, str):
+        return [{"role": "system", "content": prompt}]
+    if not isinstance(prompt, list):
+        raise TypeError("Prompt must be either a string or a list of messages (JSON).")
+    return prompt
+
+
+def _usage_from_response(response) -> dict:
+    """
+    Extracts the token counts from a chat completion response.
+
+    Args:
+        response: The chat completion response object.
+
+    Returns:
+        dict: The prompt, completion and cached prompt token counts, empty if not
+        reported.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        # Prompt tokens served from OpenAI's prefix cache
+        "cached_tokens": getattr(details, "cached_tokens", None),
+    }
+
+
 if __name__ == "__main__":
     # Example: Supply a path to a file containing your key,
     # or just ensure OPENAI_API_KEY is set in your environment.
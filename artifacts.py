@@ -0,0 +1,206 @@
+# artifacts.py
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import tempfile
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for the drafts, reviews and exports of every run.
+
+    Artifacts are stored once per distinct content under ``objects/``, keyed by the
+    SHA-256 of their content and sharded by the first two hex digits of the hash, so
+    identical drafts are never stored twice and no directory grows too large. Text
+    artifacts are gzip-compressed. Each run has its own directory under ``runs/``
+    holding a JSONL manifest of the artifacts it produced, so a run's artifacts can be
+    looked up without listing the object directories.
+
+    Objects are written to a temporary file and renamed into place, so concurrent
+    runs sharing a store never see partial files.
+    """
+
+    def __init__(self, root="output/artifacts", run_id=None):
+        """
+        Initializes the artifact store, creating its directories if needed.
+
+        Args:
+            root (str): Root directory of the store.
+            run_id (str, optional): Run whose manifest ``put`` appends to.
+        """
+        self.root = root
+        self.run_id = run_id
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        if run_id:
+            os.makedirs(os.path.join(root, "runs", run_id), exist_ok=True)
+        logging.info(f"ArtifactStore initialized at: {self.root}")
+
+    def _object_path(self, digest: str, compressed: bool) -> str:
+        filename = f"{digest}.gz" if compressed else digest
+        return os.path.join(self.root, "objects", digest[:2], filename)
+
+    def _manifest_path(self, run_id: str) -> str:
+        return os.path.join(self.root, "runs", run_id, "manifest.jsonl")
+
+    def path(self, digest: str) -> str:
+        """
+        Returns the path of a stored object.
+
+        Raises:
+            KeyError: If no object with this hash is stored.
+        """
+        for compressed in (True, False):
+            path = self._object_path(digest, compressed)
+            if os.path.exists(path):
+                return path
+        raise KeyError(digest)
+
+    def _write_object(self, digest: str, data: bytes, compressed: bool) -> bool:
+        """Writes an object unless it already exists; returns True if it was written."""
+        path = self._object_path(digest, compressed)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        payload = gzip.compress(data, mtime=0) if compressed else data
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(payload)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return True
+
+    def put(self, data, kind: str, epoch=None, name=None, compress=None) -> str:
+        """
+        Stores an artifact and records it in the run's manifest.
+
+        Args:
+            data (str | bytes): The artifact content. Strings are stored as UTF-8.
+            kind (str): Kind of artifact, e.g. "draft", "review" or "export".
+            epoch (int, optional): Epoch that produced the artifact.
+            name (str, optional): Human-readable name, e.g. the export file name.
+            compress (bool, optional): Whether to gzip the content. Defaults to
+                                       compressing text and storing bytes as is.
+
+        Returns:
+            str: The SHA-256 of the content, which identifies the artifact.
+        """
+        if compress is None:
+            compress = isinstance(data, str)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if not self._write_object(digest, data, compress):
+            logging.info(f"Artifact {digest[:12]} already stored, not writing it again")
+
+        if self.run_id:
+            entry = {
+                "kind": kind,
+                "epoch": epoch,
+                "name": name,
+                "hash": digest,
+                "size": len(data),
+                "timestamp": time.time(),
+            }
+            with open(
+                self._manifest_path(self.run_id), "a", encoding="utf-8"
+            ) as manifest:
+                manifest.write(json.dumps(entry) + "\n")
+        return digest
+
+    def put_file(self, path: str, kind: str, epoch=None, compress=False) -> str:
+        """
+        Stores the content of a file, such as an exported PDF.
+
+        Args:
+            path (str): The file to store.
+            kind (str): Kind of artifact.
+            epoch (int, optional): Epoch that produced the artifact.
+            compress (bool): Whether to gzip the content. Exports are usually
+                             compressed already.
+
+        Returns:
+            str: The SHA-256 of the content.
+        """
+        with open(path, "rb") as artifact_file:
+            data = artifact_file.read()
+        return self.put(data, kind, epoch, os.path.basename(path), compress)
+
+    def get(self, digest: str) -> bytes:
+        """
+        Reads a stored artifact.
+
+        Args:
+            digest (str): The SHA-256 returned by ``put``.
+
+        Returns:
+            bytes: The artifact content, decompressed.
+
+        Raises:
+            KeyError: If no object with this hash is stored.
+        """
+        path = self.path(digest)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as artifact_file:
+            return artifact_file.read()
+
+    def manifest(self, run_id=None, kind=None, epoch=None) -> list[dict]:
+        """
+        Lists the artifacts recorded for a run.
+
+        Args:
+            run_id (str, optional): The run. Defaults to this store's run.
+            kind (str, optional): Only list artifacts of this kind.
+            epoch (int, optional): Only list artifacts of this epoch.
+
+        Returns:
+            list[dict]: Manifest entries, in the order they were stored.
+        """
+        path = self._manifest_path(run_id or self.run_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as manifest:
+            entries = [json.loads(line) for line in manifest if line.strip()]
+        return [
+            entry
+            for entry in entries
+            if (kind is None or entry["kind"] == kind)
+            and (epoch is None or entry["epoch"] == epoch)
+        ]
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the artifact store")
+    parser.add_argument(
+        "command", choices=["list", "cat"], help="List a run's artifacts or print one"
+    )
+    parser.add_argument(
+        "target", help="Run ID (for 'list') or artifact hash (for 'cat')"
+    )
+    parser.add_argument("--kind", type=str, help="Only list artifacts of this kind")
+    parser.add_argument(
+        "--root", type=str, default="output/artifacts", help="Artifact store directory"
+    )
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root)
+    if args.command == "list":
+        for entry in store.manifest(args.target, kind=args.kind):
+            print(
+                f"{entry['hash'][:12]}  epoch {entry['epoch']}  {entry['kind']:<8} "
+                f"{entry['size']:>9} B  {entry['name'] or ''}"
+            )
+    else:
+        try:
+            sys.stdout.buffer.write(store.get(args.target))
+        except KeyError:
+            parser.error(f"no artifact with hash {args.target}")
@@ -0,0 +1,131 @@
+# benchmarks/export_benchmark.py
+"""
+Benchmarks PDF export on synthetic books of increasing length.
+
+Each measurement runs in a fresh interpreter so that the reported peak RSS belongs
+to that export alone. Run from the repository root:
+
+    python -m benchmarks.export_benchmark --chapters 10 100 300
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from xml.sax.saxutils import escape
+
+SENTENCE = (
+    "The lantern swung in the wind as the travellers crossed the old stone bridge, "
+    "each of them silently counting the days left before the winter closed the pass. "
+)
+
+
+def make_book(chapters, sections=4, sentences=40) -> str:
+    """
+    Builds a synthetic book XML document.
+
+    Args:
+        chapters (int): Number of chapters.
+        sections (int): Sections per chapter.
+        sentences (int): Sentences per section.
+
+    Returns:
+        str: The book XML.
+    """
+    parts = ["<book><title>Benchmark Book</title><chapters>"]
+    for c in range(chapters):
+        parts.append(f"<chapter><title>Chapter {c + 1}</title><content>")
+        for s in range(sections):
+            parts.append(
+                f"<section><title>Section {s + 1}</title>"
+                f"<text>{escape(SENTENCE * sentences)}</text></section>"
+            )
+        parts.append("</content><summary>Summary</summary><notes>Notes</notes></chapter>")
+    parts.append("</chapters></book>")
+    return "".join(parts)
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(mode, book_path, output_dir):
+    """Exports one book in the current process and prints the measurement as JSON."""
+    from exporter import PDFExporter
+
+    exporter = PDFExporter(output_dir=output_dir)
+    start = time.perf_counter()
+    if mode == "stream":
+        exporter.export_stream(book_path, "benchmark")
+    else:
+        with open(book_path, "r", encoding="utf-8") as book_file:
+            book_xml = book_file.read()
+        exporter.export(exporter.process_book(book_xml), "benchmark")
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+
+def measure(mode, book_path, output_dir) -> dict:
+    """Runs one export in a fresh interpreter and returns its measurement."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.export_benchmark",
+            "--child",
+            mode,
+            book_path,
+            output_dir,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF export benchmark")
+    parser.add_argument(
+        "--chapters",
+        type=int,
+        nargs="+",
+        default=[10, 100, 300],
+        help="Book lengths to benchmark, in chapters.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["list", "stream"],
+        choices=["list", "stream"],
+        help="Export modes to compare.",
+    )
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'chapters':>8} {'mode':>8} {'seconds':>9} {'peak RSS (MiB)':>15}")
+        for chapters in args.chapters:
+            book_path = os.path.join(workdir, f"book_{chapters}.xml")
+            with open(book_path, "w", encoding="utf-8") as book_file:
+                book_file.write(make_book(chapters))
+            for mode in args.modes:
+                result = measure(mode, book_path, workdir)
+                print(
+                    f"{chapters:>8} {mode:>8} {result['seconds']:>9.2f} "
+                    f"{result['peak_rss_mb']:>15.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
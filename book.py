@@ -0,0 +1,201 @@
+# book.py
+import hashlib
+from xml.etree import ElementTree as ET
+
+
+def _text(element, tag, default=None):
+    """Returns the text of a child element, or the default if it is missing."""
+    child = element.find(tag)
+    return child.text if child is not None else default
+
+
+class Section:
+    """
+    A titled block of text within a chapter.
+    """
+
+    __slots__ = ("title", "text", "_word_count")
+
+    def __init__(self, title=None, text=None):
+        self.title = title
+        self.text = text
+        self._word_count = None
+
+    @classmethod
+    def from_element(cls, element) -> "Section":
+        """Builds a section from a <section> element."""
+        return cls(_text(element, "title"), _text(element, "text"))
+
+    @property
+    def word_count(self) -> int:
+        """Number of words in the section text, computed once."""
+        if self._word_count is None:
+            self._word_count = len(self.text.split()) if self.text else 0
+        return self._word_count
+
+    def to_element(self):
+        """Serializes the section to a <section> element."""
+        element = ET.Element("section")
+        ET.SubElement(element, "title").text = self.title
+        ET.SubElement(element, "text").text = self.text
+        return element
+
+
+class Chapter:
+    """
+    A chapter of a book: its sections plus the writer's summary and notes.
+    """
+
+    __slots__ = ("title", "sections", "summary", "notes", "_hash", "_word_count")
+
+    def __init__(self, title="No Title", sections=None, summary=None, notes=None):
+        self.title = title
+        self.sections = sections if sections is not None else []
+        self.summary = summary
+        self.notes = notes
+        self._hash = None
+        self._word_count = None
+
+    @classmethod
+    def from_element(cls, element) -> "Chapter":
+        """Builds a chapter from a <chapter> element."""
+        content = element.find("content")
+        sections = (
+            [Section.from_element(s) for s in content.findall("section")]
+            if content is not None
+            else []
+        )
+        return cls(
+            _text(element, "title", "No Title"),
+            sections,
+            _text(element, "summary"),
+            _text(element, "notes"),
+        )
+
+    @property
+    def hash(self) -> str:
+        """SHA-256 of the chapter content, computed once."""
+        if self._hash is None:
+            digest = hashlib.sha256()
+            for field in [self.title, self.summary, self.notes] + [
+                value for s in self.sections for value in (s.title, s.text)
+            ]:
+                digest.update((field or "").encode("utf-8"))
+                digest.update(b"\x1f")
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    @property
+    def word_count(self) -> int:
+        """Number of words in the chapter's sections, computed once."""
+        if self._word_count is None:
+            self._word_count = sum(section.word_count for section in self.sections)
+        return self._word_count
+
+    def to_element(self):
+        """Serializes the chapter to a <chapter> element."""
+        element = ET.Element("chapter")
+        ET.SubElement(element, "title").text = self.title
+        content = ET.SubElement(element, "content")
+        content.extend(section.to_element() for section in self.sections)
+        ET.SubElement(element, "summary").text = self.summary
+        ET.SubElement(element, "notes").text = self.notes
+        return element
+
+
+class Book:
+    """
+    Typed, parsed representation of a book shared by the writer, reviewer and exporters.
+
+    A book is parsed from the writer's XML once and serialized at most once: the
+    original XML is kept and returned by ``to_xml``/``str`` as long as the book came
+    from XML, so passing a Book where a string used to go costs nothing. The parsed
+    element tree is not kept; checks that need the raw structure get it from
+    ``root``. Instances are treated as immutable once created.
+    """
+
+    __slots__ = ("title", "chapters", "_xml")
+
+    def __init__(self, title="Untitled", chapters=None, xml=None):
+        self.title = title
+        self.chapters = chapters if chapters is not None else []
+        self._xml = xml
+
+    @classmethod
+    def from_xml(cls, book_xml: str) -> "Book":
+        """
+        Parses a book from its XML representation.
+
+        Args:
+            book_xml (str): The XML-formatted book string.
+
+        Returns:
+            Book: The parsed book.
+
+        Raises:
+            ValueError: If the XML is malformed.
+        """
+        try:
+            root = ET.fromstring(book_xml)
+        except ET.ParseError as e:
+            raise ValueError(f"Invalid book format: {e}")
+        return cls.from_element(root, xml=str(book_xml))
+
+    @classmethod
+    def from_element(cls, root, xml=None) -> "Book":
+        """
+        Builds a book from its parsed root element.
+
+        Args:
+            root (Element): The <book> element.
+            xml (str, optional): The XML the element was parsed from.
+
+        Returns:
+            Book: The book.
+        """
+        chapters_element = root.find("chapters")
+        chapters = (
+            [Chapter.from_element(c) for c in chapters_element.findall("chapter")]
+            if chapters_element is not None
+            else []
+        )
+        return cls(_text(root, "title", "Untitled"), chapters, xml=xml)
+
+    @classmethod
+    def coerce(cls, book) -> "Book":
+        """Returns the book itself if it is already a Book, otherwise parses it."""
+        return book if isinstance(book, cls) else cls.from_xml(book)
+
+    @property
+    def word_count(self) -> int:
+        """Total number of words in all chapters."""
+        return sum(chapter.word_count for chapter in self.chapters)
+
+    @property
+    def chapter_hashes(self) -> list[str]:
+        """Hashes of every chapter, in order."""
+        return [chapter.hash for chapter in self.chapters]
+
+    @property
+    def root(self):
+        """
+        A new element tree of the book, parsed from the source XML if any, else built
+        from the model. It is not cached, so callers should hold on to it while they
+        need it.
+        """
+        if self._xml is not None:
+            return ET.fromstring(self._xml)
+        root = ET.Element("book")
+        ET.SubElement(root, "title").text = self.title
+        chapters = ET.SubElement(root, "chapters")
+        chapters.extend(chapter.to_element() for chapter in self.chapters)
+        return root
+
+    def to_xml(self) -> str:
+        """Serializes the book to XML, reusing the source XML when available."""
+        if self._xml is None:
+            self._xml = ET.tostring(self.root, encoding="unicode")
+        return self._xml
+
+    def __str__(self) -> str:
+        return self.to_xml()
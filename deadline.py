@@ -0,0 +1,103 @@
+# deadline.py
+import time
+import asyncio
+import logging
+
+
+class StageTimeout(TimeoutError):
+    """
+    Raised when a stage runs out of time, after its work has been cancelled.
+    """
+
+    def __init__(self, stage, seconds, run_deadline=False):
+        self.stage = stage
+        self.seconds = seconds
+        self.run_deadline = run_deadline
+        reason = "the run deadline" if run_deadline else "its time budget"
+        super().__init__(f"Stage '{stage}' cancelled after {seconds:.1f}s by {reason}.")
+
+
+class Deadline:
+    """
+    Time budget of a whole run, split into per-stage budgets.
+
+    Every stage awaited through ``run`` is cancelled when it exceeds its own budget
+    or the time left before the run deadline, whichever comes first. Cancellation
+    propagates into the stage, so its ``finally`` blocks run and any tasks it started
+    are cancelled with it before ``StageTimeout`` is raised.
+    """
+
+    def __init__(self, seconds=None, budgets=None):
+        """
+        Initializes the deadline, starting the clock.
+
+        Args:
+            seconds (float, optional): Time allowed for the whole run. None for no
+                                       run deadline.
+            budgets (dict, optional): Maps a stage name to its time allowed per run
+                                      of the stage, in seconds. Stages without a
+                                      budget are only bound by the run deadline.
+        """
+        self.seconds = seconds
+        self.budgets = {
+            stage: budget for stage, budget in (budgets or {}).items() if budget
+        }
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        """Seconds left before the run deadline, or None if there is none."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """Whether the run deadline has passed."""
+        return self.remaining() == 0.0
+
+    def timeout_for(self, stage):
+        """
+        Returns the time a stage may take now, or None if it is unbounded.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        limits = [
+            limit
+            for limit in (self.budgets.get(stage), self.remaining())
+            if limit is not None
+        ]
+        return min(limits) if limits else None
+
+    async def run(self, stage, awaitable):
+        """
+        Awaits a stage within its time limit.
+
+        Args:
+            stage (str): Name of the stage.
+            awaitable: The stage's coroutine.
+
+        Returns:
+            The stage's result.
+
+        Raises:
+            StageTimeout: If the stage was cancelled for running out of time.
+        """
+        timeout = self.timeout_for(stage)
+        budget = self.budgets.get(stage)
+        start = time.monotonic()
+        scope = asyncio.timeout(timeout)
+        try:
+            async with scope:
+                return await awaitable
+        except TimeoutError:
+            if not scope.expired():
+                # A timeout inside the stage, such as a single API call's
+                raise
+            elapsed = time.monotonic() - start
+            run_deadline = budget is None or timeout < budget
+            logging.warning(
+                f"Stage '{stage}' cancelled after {elapsed:.1f}s "
+                f"({'run deadline' if run_deadline else 'stage budget'} reached)"
+            )
+            raise StageTimeout(stage, elapsed, run_deadline) from None
@@ -0,0 +1,184 @@
+# ensemble.py
+import asyncio
+import logging
+import statistics
+from xml.sax.saxutils import escape, quoteattr
+
+
+class ReviewEnsemble:
+    """
+    Reviews a draft with several reviewers at once and aggregates their verdicts.
+
+    A single review is a noisy measurement, and a single slow response stalls the
+    epoch. The ensemble sends every review concurrently and decides as soon as a
+    quorum has answered, or earlier when the first answers clearly agree on the
+    verdict: at least ``early_agreement`` reviewers all scoring ``margin`` or more
+    above the threshold, or all ``margin`` or more below it. The early agreement is
+    never less than two answers nor less than a majority of the members, so a
+    single outlier cannot decide; when the quorum leaves no room for that, as with
+    three reviewers and the default quorum, there is no early verdict. Reviews still
+    pending at that point are cancelled.
+
+    Scores are aggregated with the median, so one outlier cannot swing the verdict.
+    """
+
+    def __init__(self, members, threshold, quorum=None, margin=10, early_agreement=2):
+        """
+        Initializes the ensemble.
+
+        Args:
+            members (list): (label, ReviewerAgent, model) of every reviewer. The model
+                            may be None for the API's default model.
+            threshold (int): The Filter threshold the verdict is about.
+            quorum (int, optional): Number of answers to wait for. Defaults to a
+                                    majority of the members.
+            margin (int): Distance from the threshold at which a score is a clear
+                          verdict.
+            early_agreement (int): Number of clear, agreeing answers that decide
+                                   before the quorum. Raised to two and to a
+                                   majority of the members if it is lower.
+        """
+        if not members:
+            raise ValueError("A review ensemble needs at least one reviewer.")
+        self.members = members
+        self.threshold = threshold
+        self.quorum = min(quorum or len(members) // 2 + 1, len(members))
+        self.margin = margin
+        early_agreement = max(early_agreement, 2, len(members) // 2 + 1)
+        # None when the quorum is reached first: there is no early verdict
+        self.early_agreement = (
+            early_agreement if early_agreement < self.quorum else None
+        )
+        logging.info(
+            f"ReviewEnsemble initialized: {', '.join(label for label, _, _ in members)} "
+            f"(quorum {self.quorum}, early agreement {self.early_agreement})"
+        )
+
+    def _decided(self, scores) -> bool:
+        """Whether the answers so far settle the verdict."""
+        if len(scores) >= self.quorum:
+            return True
+        if self.early_agreement is None or len(scores) < self.early_agreement:
+            return False
+        return (
+            min(scores) >= self.threshold + self.margin
+            or max(scores) < self.threshold - self.margin
+        )
+
+    async def _review(self, label, reviewer, model, book, input_prompt):
+        review = await reviewer.review_book(book, input_prompt, model=model)
+        return label, review, reviewer.parse_review(review)
+
+    async def review(self, book, input_prompt) -> dict:
+        """
+        Reviews a draft with the ensemble.
+
+        Args:
+            book (Book | str): The draft to review.
+            input_prompt (str): The input prompt used for generating the book.
+
+        Returns:
+            dict: ``review`` with the aggregated review XML, ``parsed`` with it parsed
+            as by ``ReviewerAgent.parse_review``, ``answers`` with the (label, review)
+            of every reviewer that answered, ``cancelled`` with the number of reviews
+            cut off, and ``early`` telling whether the verdict came before the quorum.
+
+        Raises:
+            ValueError: If no reviewer returned a valid review.
+        """
+        tasks = [
+            asyncio.create_task(
+                self._review(label, reviewer, model, book, input_prompt)
+            )
+            for label, reviewer, model in self.members
+        ]
+        answers = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    answers.append(await next_done)
+                except Exception as e:
+                    logging.warning(f"Ensemble reviewer failed: {e}")
+                    continue
+                scores = [parsed["overall_score"] for _, _, parsed in answers]
+                logging.info(
+                    f"Ensemble review {len(answers)}/{len(tasks)} from "
+                    f"{answers[-1][0]}: {scores[-1]}"
+                )
+                if self._decided(scores):
+                    break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if not answers:
+            raise ValueError("No reviewer in the ensemble returned a valid review.")
+        if pending:
+            logging.info(f"Cancelled {len(pending)} straggling review(s).")
+        parsed = aggregate_reviews([(label, parsed) for label, _, parsed in answers])
+        return {
+            "review": review_xml(parsed),
+            "parsed": parsed,
+            "answers": [(label, review) for label, review, _ in answers],
+            "cancelled": len(pending),
+            "early": len(answers) < self.quorum,
+        }
+
+
+def _median(values) -> int:
+    return int(round(statistics.median(values)))
+
+
+def aggregate_reviews(reviews, combine=_median) -> dict:
+    """
+    Combines (label, parsed review) pairs into one parsed review, with every
+    comment kept and attributed to its label.
+
+    Args:
+        reviews (list): (label, review parsed by ``ReviewerAgent.parse_review``).
+        combine (callable): Reduces a list of scores or ratings to one. Defaults to
+                            the median, which suits several opinions on one draft.
+
+    Returns:
+        dict: The combined review, in the structure of ``parse_review``.
+    """
+    categories = {}
+    aspects = {}
+    for label, review in reviews:
+        for name, score in review["categories"].items():
+            categories.setdefault(name, []).append(score)
+        for name, aspect in review["feedback"].items():
+            aspects.setdefault(name, []).append((label, aspect))
+    return {
+        "overall_score": combine([review["overall_score"] for _, review in reviews]),
+        "categories": {name: combine(scores) for name, scores in categories.items()},
+        "feedback": {
+            name: {
+                "rating": combine([aspect["rating"] for _, aspect in entries]),
+                "comment": "\n".join(
+                    f"[{label}] {aspect['comment'] or ''}" for label, aspect in entries
+                ),
+            }
+            for name, entries in aspects.items()
+        },
+    }
+
+
+def review_xml(parsed) -> str:
+    """Writes an aggregated review in the reviewer's XML format."""
+    categories = "".join(
+        f'<category name={quoteattr(name)} score="{score}" />'
+        for name, score in parsed["categories"].items()
+    )
+    aspects = "".join(
+        f'<aspect name={quoteattr(name)} rating="{aspect["rating"]}">'
+        f"<comment>{escape(aspect['comment'])}</comment></aspect>"
+        for name, aspect in parsed["feedback"].items()
+    )
+    return (
+        f"<review><score><overall>{parsed['overall_score']}</overall>"
+        f"<categories>{categories}</categories></score>"
+        f"<feedback>{aspects}</feedback></review>"
+    )
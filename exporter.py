@@ -1,29 +1,198 @@
 # exporter.py
 import os
+import re
+import html
+import json
+import time
+import glob
+import zipfile
+import hashlib
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from abc import ABC, abstractmethod
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, PageBreak
-from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
-from reportlab.lib.colors import black
+from types import MappingProxyType
 import logging
 from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+from lazy_imports import timed_import
+from profiling import Profiler, traced, wrap as profiled
+from book import Book, Chapter
+
+
+# Blank line, possibly holding whitespace, between two paragraphs
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# End of a sentence, including any closing quotes or brackets, followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?\u2026][\"'\u201d\u2019)\]]*(?=\s)")
+
+
+def _split_paragraphs(text: str, max_chars: int = 1200) -> list[str]:
+    """
+    Splits section text into paragraphs.
+
+    Blank lines in the text are paragraph breaks; a single line break, like XML
+    indentation, is just whitespace inside a paragraph, and all whitespace inside a
+    paragraph is collapsed. Paragraphs longer than ``max_chars`` are broken
+    at sentence ends, so no single paragraph has to be re-wrapped again and again
+    while ReportLab splits it across pages.
+
+    Args:
+        text (str): The raw section text.
+        max_chars (int): Soft limit on the length of a paragraph.
+
+    Returns:
+        list[str]: The paragraphs, as plain (unescaped) text.
+    """
+    paragraphs = []
+    for block in _PARAGRAPH_BREAK.split(text):
+        block = " ".join(block.split())
+        if not block:
+            continue
+        start = 0
+        last_end = 0
+        for match in _SENTENCE_END.finditer(block):
+            if match.end() - start > max_chars and last_end > start:
+                paragraphs.append(block[start:last_end].strip())
+                start = last_end
+            last_end = match.end()
+        paragraphs.append(block[start:].strip())
+    return paragraphs
 
 
 class Exporter(ABC):
     """
     Abstract base class for exporting content.
+
+    Parsing and formatting are shared by every format: ``process_book`` turns the
+    book XML into a list of content items once, and any exporter can write them.
     """
 
-    def __init__(self, output_dir="output"):
+    extension = None
+
+    def __init__(self, output_dir="output", author="AI Book Generator"):
         """
         Initializes the exporter object.
         """
         self.output_dir = output_dir
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        self.author = author
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _output_path(self, filename: str) -> str:
+        """Returns the path of an output file in this exporter's format."""
+        return os.path.join(self.output_dir, f"{filename}.{self.extension}")
+
+    def _format_text_from_book(self, book: Book) -> list[dict]:
+        """Formats a parsed book into a list of dictionaries,
+        ready for ReportLab's Platypus."""
+        formatted_content = []
+        # First Page (Cover)
+        formatted_content.append(self._format_cover(book.title))
+
+        for chapter in book.chapters:
+            formatted_content.extend(self._format_chapter(chapter))
+
+        return formatted_content
+
+    def _format_cover(self, title: str) -> dict:
+        """Formats the cover page item."""
+        return {"type": "cover", "title": title, "author": self.author}
+
+    def _format_chapter(self, chapter: Chapter) -> list[dict]:
+        """Formats a single parsed chapter into content items."""
+        formatted_content = [{"type": "chapter_title", "title": chapter.title}]
+        for section in chapter.sections:
+            if section.title:
+                formatted_content.append(
+                    {"type": "section_title", "title": section.title}
+                )
+            if section.text:
+                formatted_content.extend(
+                    {"type": "paragraph", "text": paragraph}
+                    for paragraph in _split_paragraphs(section.text)
+                )
+
+        #   if chapter.summary:
+        #      formatted_content.append({"type": "paragraph", "text": "Summary: " + chapter.summary})
+        #   if chapter.notes:
+        #      formatted_content.append({"type": "paragraph", "text": "Notes: " + chapter.notes})
+
+        return formatted_content
+
+    def _iter_book_content(self, source):
+        """
+        Parses a book incrementally and yields its content items one chapter at a time.
+
+        Each <chapter> element is formatted as soon as it has been read and then
+        dropped from the tree, so memory use does not grow with the book length.
+
+        Args:
+            source: Path or binary file object containing the book XML.
+
+        Yields:
+            dict: Content items in the same format as ``process_book`` returns.
+
+        Raises:
+            ValueError: If the XML is malformed.
+        """
+        cover_done = False
+        path = []
+        try:
+            for event, element in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    path.append(element)
+                    if element.tag == "chapter" and not cover_done:
+                        cover_done = True
+                        yield self._format_cover("Untitled")
+                    continue
+
+                path.pop()
+                if element.tag == "title" and len(path) == 1 and not cover_done:
+                    cover_done = True
+                    yield self._format_cover(element.text or "Untitled")
+                elif element.tag == "chapter":
+                    yield from self._format_chapter(Chapter.from_element(element))
+                    path[-1].remove(element)
+        except ET.ParseError as e:
+            logging.error(f"Error parsing book XML: {e}")
+            raise ValueError(f"Invalid book format: {e}")
+
+        if not cover_done:
+            yield self._format_cover("Untitled")
+
+    @traced("Exporter.process_book")
+    def process_book(self, book) -> list[dict]:
+        """
+        Processes a book and returns a list of dictionaries with extracted and formatted content
+
+        Args:
+            book (Book | str): The parsed book, or the XML-formatted book string.
+
+        Returns:
+            list[dict]: The processed content, ready for export
+        """
+        try:
+            formatted_text = self._format_text_from_book(Book.coerce(book))
+            return formatted_text
+        except ValueError as e:
+            logging.error(f"Error processing book: {e}")
+            return [{"type": "error", "text": f"Error: {e}"}]
+
+    def _split_into_fragments(self, content):
+        """
+        Splits content items into the cover and one fragment per chapter.
+
+        In the PDF every chapter starts on a new page, so fragments can be laid out
+        independently; the EPUB writes one document per fragment.
+
+        Returns:
+            list[list[dict]]: The cover fragment followed by one fragment per chapter.
+        """
+        fragments = [[]]
+        for item in content:
+            if item["type"] == "chapter_title":
+                fragments.append([])
+            fragments[-1].append(item)
+        return [fragment for fragment in fragments if fragment]
 
     @abstractmethod
     def export(self, content, filename):
@@ -31,172 +200,557 @@ class Exporter(ABC):
         Abstract method to export content to a file.
 
         Args:
-            content (str): The content to export.
-            filename (str): The name of the output file.
+            content (list[dict]): The content to export, as returned by ``process_book``.
+            filename (str): The name of the output file, without extension.
+
+        Returns:
+            str: Path of the written file.
         """
         pass
 
 
+@functools.lru_cache(maxsize=None)
+def _paragraph_styles():
+    """
+    Builds the paragraph styles used for PDF books, once per process.
+
+    The styles are new ``ParagraphStyle`` objects derived from ReportLab's sample
+    style sheet, so the sample styles themselves are never mutated. The mapping is
+    read-only and its styles must not be modified; they are shared by every export.
+
+    Returns:
+        MappingProxyType: Maps a role ("normal", "cover_title", ...) to its style.
+    """
+    timed_import("reportlab.platypus")
+    from reportlab.lib.units import inch
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+    from reportlab.lib.colors import black
+
+    sample = getSampleStyleSheet()
+    return MappingProxyType(
+        {
+            "normal": ParagraphStyle(
+                "BookNormal",
+                parent=sample["Normal"],
+                alignment=TA_JUSTIFY,
+                firstLineIndent=0.3 * inch,
+            ),
+            "error": ParagraphStyle("BookError", parent=sample["Normal"]),
+            "cover_title": ParagraphStyle(
+                "BookCoverTitle",
+                parent=sample["Title"],
+                fontSize=36,
+                leading=43,
+                alignment=TA_CENTER,
+            ),
+            "cover_author": ParagraphStyle(
+                "BookCoverAuthor", parent=sample["h2"], alignment=TA_CENTER
+            ),
+            "chapter_title": ParagraphStyle(
+                "BookChapterTitle", parent=sample["h2"], alignment=TA_CENTER
+            ),
+            "section_title": ParagraphStyle(
+                "BookSectionTitle", parent=sample["h3"], textColor=black
+            ),
+            "toc_entry": ParagraphStyle(
+                "BookTOCEntry", parent=sample["Normal"], spaceAfter=4
+            ),
+        }
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _style_signature() -> str:
+    """Returns a digest of every attribute of the paragraph styles, for cache keys."""
+    signature = [
+        (role, sorted((k, repr(v)) for k, v in vars(style).items() if k != "parent"))
+        for role, style in sorted(_paragraph_styles().items())
+    ]
+    return hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()
+
+
+class _LazyStory:
+    """
+    List-like view over a flowable generator, as consumed by ``BaseDocTemplate.build``.
+
+    ReportLab only ever looks at and removes items from the front of its story (and
+    peeks a few items ahead for keepWithNext), so a small buffer filled on demand
+    is enough and the full story never has to exist at once.
+    """
+
+    LOOKAHEAD = 16
+
+    def __init__(self, flowables):
+        self._source = iter(flowables)
+        self._buffer = []
+
+    def _fill(self, size):
+        while self._source is not None and len(self._buffer) < size:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill(self.LOOKAHEAD)
+        return len(self._buffer)
+
+    def _fill_for(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else float("inf"))
+        elif index >= 0:
+            self._fill(index + 1)
+
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._fill_for(index)
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+
+    def insert(self, index, flowable):
+        self._buffer.insert(index, flowable)
+
+
 class PDFExporter(Exporter):
     """
     Concrete class for exporting content to a PDF file.
     """
 
-    def __init__(self, output_dir="output", author="AI Book Generator"):
+    extension = "pdf"
+
+    def __init__(
+        self,
+        output_dir="output",
+        author="AI Book Generator",
+        render_cache_size=256,
+        toc=True,
+    ):
         """
         Initializes the PDFExporter object.
+
+        Args:
+            output_dir (str): Directory the PDFs are written to.
+            author (str): Author name shown on the cover.
+            render_cache_size (int): Maximum number of laid-out chapters kept for
+                                     incremental exports.
+            toc (bool): Add a table of contents after the cover.
         """
-        super().__init__(output_dir)
+        super().__init__(output_dir, author)
         logging.info("PDFExporter initialized.")
-        self.styles = getSampleStyleSheet()
-        self.normal_style = self.styles["Normal"]
-        self.author = author
-        self.page_number = 0  # Start at page 0
-        self.first_page = True  # Flag to indicate if is first page
+        self._page_templates = None
+        self._render_cache = OrderedDict()
+        self.render_cache_size = render_cache_size
+        self.render_cache_hits = 0
+        self.render_cache_misses = 0
+        self.toc = toc
+        self._chapter_pages = []  # Page number of every chapter, in drawing order
 
-    def _parse_book_xml(self, book_xml: str) -> dict:
-        """Parses the XML book structure and returns a dictionary."""
-        try:
-            root = ET.fromstring(book_xml)
-            book_data = {}
+    @property
+    def styles(self):
+        """The shared, read-only paragraph styles, built on first use."""
+        return _paragraph_styles()
 
-            # Get book title
-            title_element = root.find("title")
-            book_data["title"] = (
-                title_element.text if title_element is not None else "Untitled"
-            )
+    @property
+    def normal_style(self):
+        return self.styles["normal"]
 
-            # Extract chapters
-            chapters_data = []
-            chapters_element = root.find("chapters")
-            if chapters_element is not None:
-                for chapter_element in chapters_element.findall("chapter"):
-                    chapter_data = {}
-                    title_element = chapter_element.find("title")
-                    chapter_data["title"] = (
-                        title_element.text if title_element is not None else "No Title"
-                    )
+    def _get_page_templates(self):
+        """
+        Returns the page templates for this exporter, building them on first use.
 
-                    content_data = []
-                    content_element = chapter_element.find("content")
-                    if content_element is not None:
-                        for section_element in content_element.findall("section"):
-                            section_data = {}
-                            section_title = section_element.find("title")
-                            section_text = section_element.find("text")
-                            section_data["title"] = (
-                                section_title.text
-                                if section_title is not None
-                                else None
-                            )
-                            section_data["text"] = (
-                                section_text.text if section_text is not None else None
-                            )
-                            content_data.append(section_data)
-                    chapter_data["content"] = content_data
-
-                    summary_element = chapter_element.find("summary")
-                    chapter_data["summary"] = (
-                        summary_element.text if summary_element is not None else None
-                    )
-                    notes_element = chapter_element.find("notes")
-                    chapter_data["notes"] = (
-                        notes_element.text if notes_element is not None else None
-                    )
-                    chapters_data.append(chapter_data)
+        The templates are reused by every document this exporter builds, so repeated
+        exports skip the frame and template setup. Exports from the same exporter
+        must therefore not run concurrently.
+        """
+        if self._page_templates is None:
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.units import inch
+            from reportlab.platypus import Frame, PageTemplate
 
-            book_data["chapters"] = chapters_data
-            return book_data
+            width, height = letter
+            frame = Frame(
+                inch, inch, width - 2 * inch, height - 2 * inch, id="normal"
+            )
+            self._page_templates = [
+                PageTemplate(
+                    id="Book",
+                    frames=[frame],
+                    pagesize=letter,
+                    onPage=self._draw_page_number,
+                )
+            ]
+        return self._page_templates
 
-        except ET.ParseError as e:
-            logging.error(f"Error parsing book XML: {e}")
-            raise ValueError(f"Invalid book format: {e}")
+    def _frame_box(self):
+        """Returns the (x, top, width, height) of the content area of a page."""
+        frame = self._get_page_templates()[0].frames[0]
+        x = frame._x1 + frame._leftPadding
+        top = frame._y1 + frame._height - frame._topPadding
+        width = frame._width - frame._leftPadding - frame._rightPadding
+        height = top - (frame._y1 + frame._bottomPadding)
+        return x, top, width, height
 
-    def _format_text_from_book_data(self, book_data: dict) -> list[dict]:
-        """Formats the extracted book data into a list of dictionaries,
-        ready for ReportLab's Platypus."""
-        formatted_content = []
-        # First Page (Cover)
-        formatted_content.append(
-            {"type": "cover", "title": book_data["title"], "author": self.author}
-        )
+    def _draw_page_number(self, canvas, doc=None):
+        """Draws the page number in the footer of every page but the cover."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
 
-        for chapter in book_data.get("chapters", []):
-            formatted_content.append(
-                {"type": "chapter_title", "title": chapter["title"]}
-            )
-            for section in chapter["content"]:
-                if section["title"]:
-                    formatted_content.append(
-                        {"type": "section_title", "title": section["title"]}
-                    )
-                if section["text"]:
-                    formatted_content.append(
-                        {"type": "paragraph", "text": section["text"]}
-                    )
+        page = canvas.getPageNumber()
+        if page > 1:
+            canvas.saveState()
+            canvas.setFont("Helvetica", 9)
+            canvas.drawCentredString(letter[0] / 2, 0.6 * inch, str(page))
+            canvas.restoreState()
+
+    def _chapter_marker(self, title):
+        """
+        Returns a zero-size flowable recording where a chapter starts.
 
-        #   if chapter["summary"]:
-        #      formatted_content.append({"type": "paragraph", "text": "Summary: " + chapter['summary']})
-        #   if chapter["notes"]:
-        #      formatted_content.append({"type": "paragraph", "text": "Notes: " + chapter['notes']})
+        When drawn, it notes the current page in ``_chapter_pages`` and adds a
+        bookmark and an outline entry for the chapter, so page positions are known
+        from the one layout pass that draws the book.
+        """
+        from reportlab.platypus.flowables import CallerMacro
 
-        return formatted_content
+        def draw(marker):
+            canvas = marker.canv
+            self._chapter_pages.append(canvas.getPageNumber())
+            key = f"chapter-{len(self._chapter_pages)}"
+            canvas.bookmarkPage(key)
+            canvas.addOutlineEntry(title, key, level=0)
 
-    def process_book(self, book: str) -> list[dict]:
+        return CallerMacro(draw)
+
+    def _layout_toc(self, titles):
         """
-        Processes a book formatted in XML and returns a list of dictionaries with extracted and formatted content
+        Lays out the table of contents without its page numbers.
+
+        Entry heights only depend on the titles, so the number of TOC pages is
+        known before the book itself is laid out.
 
         Args:
-            book (str): The XML-formatted book string.
+            titles (list[str]): The chapter titles.
 
         Returns:
-            list[dict]: The processed content, ready for export
+            list[list[tuple]]: TOC pages, each a list of (paragraph, y, height, index)
+            placements relative to the top left of the page content area, where
+            index is the chapter number or None for the heading.
         """
-        try:
-            book_data = self._parse_book_xml(book)
-            formatted_text = self._format_text_from_book_data(book_data)
-            return formatted_text
-        except ValueError as e:
-            logging.error(f"Error processing book: {e}")
-            return [{"type": "error", "text": f"Error: {e}"}]
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
 
-    def _build_pdf(self, filepath, content):
-        """Builds the PDF document using ReportLab's Platypus."""
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
-        story = []
-        styles = getSampleStyleSheet()
-        normal_style = styles["Normal"]
-        normal_style.alignment = TA_JUSTIFY
-        normal_style.firstLineIndent = 0.3 * inch
-        title_style = styles["Title"]
-        title_style.alignment = TA_CENTER
-        cover_title_style = styles["Title"]
-        cover_title_style.fontSize = 36
-        cover_title_style.alignment = TA_CENTER
-        cover_author_style = styles["h2"]
-        cover_author_style.alignment = TA_CENTER
-        chapter_title_style = styles["h2"]
-        chapter_title_style.alignment = TA_CENTER
-        section_title_style = styles["h3"]
-        section_title_style.textColor = black
+        styles = self.styles
+        _, _, width, height = self._frame_box()
+        title_width = width - 0.75 * inch
+
+        heading = Paragraph("Contents", styles["chapter_title"])
+        heading_height = heading.wrap(width, height)[1]
+        pages = [[(heading, -heading_height, heading_height, None)]]
+        y = -heading_height - heading.getSpaceAfter()
+        for index, title in enumerate(titles):
+            entry = Paragraph(escape(title), styles["toc_entry"])
+            entry_height = entry.wrap(title_width, height)[1]
+            space_before = entry.getSpaceBefore() if pages[-1] else 0
+            if pages[-1] and y - space_before - entry_height < -height:
+                pages.append([])
+                y = space_before = 0
+            y -= space_before + entry_height
+            pages[-1].append((entry, y, entry_height, index))
+            y -= entry.getSpaceAfter()
+        return pages
+
+    def _toc_flowables(self, toc_pages):
+        """
+        Yields the flowables of the table of contents pages.
+
+        Each page only references a form XObject that is defined once the book has
+        been drawn and the chapter pages are known (see ``_draw_toc_forms``), so the
+        book is laid out once instead of twice as with ``multiBuild``.
+        """
+        from reportlab.platypus import PageBreak
+        from reportlab.platypus.flowables import CallerMacro
+
+        width = self._frame_box()[2]
+        for number, page in enumerate(toc_pages):
+
+            def draw(macro, number=number, page=page):
+                canvas = macro.canv
+                canvas.doForm(f"toc-{number}")
+                for _, y, height, index in page:
+                    if index is not None:
+                        canvas.linkRect(
+                            "", f"chapter-{index + 1}", (0, y, width, y + height)
+                        )
+
+            yield PageBreak()
+            yield CallerMacro(draw)
+
+    def _draw_toc_forms(self, canvas, toc_pages):
+        """Defines the TOC forms referenced by the TOC pages, with page numbers."""
+        _, _, width, height = self._frame_box()
+        style = self.styles["toc_entry"]
+        for number, page in enumerate(toc_pages):
+            canvas.beginForm(f"toc-{number}", 0, -height, width, 0)
+            canvas.setFont(style.fontName, style.fontSize)
+            for paragraph, y, paragraph_height, index in page:
+                paragraph.drawOn(canvas, 0, y)
+                if index is not None:
+                    canvas.drawRightString(
+                        width,
+                        y + paragraph_height - style.fontSize,
+                        str(self._chapter_pages[index]),
+                    )
+            canvas.endForm()
+
+    def _plan_toc(self, content):
+        """Returns the TOC pages for the content, or none if the TOC is disabled."""
+        titles = [item["title"] for item in content if item["type"] == "chapter_title"]
+        return self._layout_toc(titles) if self.toc and titles else []
+
+    def _make_doc_template(self, filepath, title=None):
+        """Creates a document template for one export using the shared page templates."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import BaseDocTemplate
+
+        return BaseDocTemplate(
+            filepath,
+            pagesize=letter,
+            pageTemplates=self._get_page_templates(),
+            title=title or "",
+            author=self.author,
+        )
+
+    def _iter_flowables(self, content, toc_pages=()):
+        """
+        Turns content items into ReportLab flowables, lazily.
+
+        Content items hold plain text, while ``Paragraph`` parses its input as markup,
+        so every text is escaped here; a stray "&" or "<" in the book cannot break the
+        layout.
+
+        Args:
+            content: Iterable of content items.
+            toc_pages (list): TOC pages from ``_layout_toc`` to add after the cover.
+
+        Yields:
+            Flowable: The flowables making up the book.
+        """
+        # ReportLab is imported here so that callers that never export a PDF
+        # (mock runs, unapproved runs) do not pay for loading it.
+        styles = self.styles
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, PageBreak
 
         for item in content:
             if item["type"] == "cover":
-                story.append(Spacer(1, 2 * inch))  # Add some space before the title
-                story.append(Paragraph(item["title"], cover_title_style))
-                story.append(Paragraph(self.author, cover_author_style))
-                self.first_page = False
+                yield Spacer(1, 2 * inch)  # Add some space before the title
+                yield Paragraph(escape(item["title"]), styles["cover_title"])
+                yield Paragraph(escape(self.author), styles["cover_author"])
+                yield from self._toc_flowables(toc_pages)
             elif item["type"] == "chapter_title":
-                story.append(PageBreak())
-                story.append(Paragraph(item["title"], chapter_title_style))
+                yield PageBreak()
+                yield self._chapter_marker(item["title"])
+                yield Paragraph(escape(item["title"]), styles["chapter_title"])
             elif item["type"] == "section_title":
-                story.append(Paragraph(item["title"], section_title_style))
+                yield Paragraph(escape(item["title"]), styles["section_title"])
             elif item["type"] == "paragraph":
-                story.append(Paragraph(item["text"], normal_style))
+                yield Paragraph(escape(item["text"]), styles["normal"])
             elif item["type"] == "error":
-                story.append(Paragraph(item["text"], styles["Normal"]))
+                yield Paragraph(escape(item["text"]), styles["error"])
+
+    @traced("PDFExporter._build_pdf")
+    def _build_pdf(self, filepath, content):
+        """Builds the PDF document using ReportLab's Platypus."""
+        title = next(
+            (item["title"] for item in content if item["type"] == "cover"), None
+        )
+        from reportlab.pdfgen.canvas import Canvas
+
+        doc = self._make_doc_template(filepath, title)
+        toc_pages = self._plan_toc(content)
+        self._chapter_pages = []
+        exporter = self
+
+        class TocCanvas(Canvas):
+            def save(self):
+                # Every page has been drawn, so the chapter pages are known
+                exporter._draw_toc_forms(self, toc_pages)
+                super().save()
+
+        doc.build(
+            list(self._iter_flowables(content, toc_pages)), canvasmaker=TocCanvas
+        )
+
+    def export_stream(self, source, filename: str):
+        """
+        Exports a book to PDF without ever holding the whole book in memory.
+
+        The XML is parsed incrementally, and flowables are created only as ReportLab
+        asks for them, so memory use stays roughly constant in the book length. Page
+        streams are compressed to keep the pending PDF output small as well. Chapters
+        are not known in advance, so the output has page numbers and bookmarks but no
+        table of contents.
+
+        Args:
+            source: Path or binary file object containing the book XML.
+            filename (str): The name of the output PDF file.
+        """
+        filepath = self._output_path(filename)
+        try:
+            doc = self._make_doc_template(filepath)
+            doc.pageCompression = 1
+            self._chapter_pages = []
+            doc.build(_LazyStory(self._iter_flowables(self._iter_book_content(source))))
+            logging.info(f"Content successfully exported to {filepath}")
+            return filepath
+
+        except (IOError, OSError) as e:
+            logging.error(f"File error during PDF export: {e}")
+            raise
+        except Exception as e:
+            logging.error(f"Error during PDF export: {e}")
+            raise
+
+    def _fragment_key(self, fragment) -> str:
+        """Hashes a fragment's content together with the style and page configuration."""
+        digest = hashlib.sha256()
+        digest.update(_style_signature().encode("utf-8"))
+        digest.update(self.author.encode("utf-8"))
+        digest.update(json.dumps(fragment, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _layout_pages(self, flowables):
+        """
+        Lays flowables out into pages of the book frame without drawing them.
+
+        Mirrors what a ``Frame`` does during ``doc.build``: space before is dropped at
+        the top of a page, flowables that do not fit are split, and a page break starts
+        a new page unless the current one is still empty.
+
+        Args:
+            flowables (list): The flowables to lay out.
+
+        Returns:
+            list[list[tuple]]: Pages, each a list of (flowable, x, y) placements.
+        """
+        from reportlab.platypus import PageBreak
+
+        x, top, width, height = self._frame_box()
+        bottom = top - height
+
+        pages = [[]]
+        y = top
+        queue = list(reversed(flowables))
+        while queue:
+            flowable = queue.pop()
+            at_top = not pages[-1]
+            if isinstance(flowable, PageBreak):
+                if not at_top:
+                    pages.append([])
+                    y = top
+                continue
 
-        doc.build(story)
+            space_before = 0 if at_top else flowable.getSpaceBefore()
+            available = y - bottom - space_before
+            _, height = flowable.wrap(width, available)
+            if height <= available + 1e-8 or (at_top and available <= 0):
+                y -= space_before + height
+                pages[-1].append((flowable, x, y))
+                y -= flowable.getSpaceAfter()
+                continue
+
+            parts = flowable.split(width, available)
+            if parts:
+                queue.extend(reversed(parts))
+            elif at_top:
+                # Too large for an empty page: place it anyway rather than loop forever
+                y -= height
+                pages[-1].append((flowable, x, y))
+            else:
+                pages.append([])
+                y = top
+                queue.append(flowable)
+        return [page for page in pages if page]
+
+    def _render_fragment(self, fragment):
+        """Returns the laid-out pages of a fragment, from the render cache if possible."""
+        key = self._fragment_key(fragment)
+        pages = self._render_cache.get(key)
+        if pages is not None:
+            self.render_cache_hits += 1
+            self._render_cache.move_to_end(key)
+            return pages
+
+        self.render_cache_misses += 1
+        pages = self._layout_pages(list(self._iter_flowables(fragment)))
+        self._render_cache[key] = pages
+        while len(self._render_cache) > self.render_cache_size:
+            self._render_cache.popitem(last=False)
+        return pages
+
+    def export_incremental(self, content: list[dict], filename: str):
+        """
+        Exports content to a PDF file, reusing the layout of unchanged chapters.
+
+        Each chapter is laid out once and cached under a hash of its content and the
+        style configuration; the document is then assembled page by page from the
+        cached and newly laid-out chapters, with page positions assigned at assembly.
+        Re-exporting a lightly edited book only lays out the edited chapters.
+
+        Args:
+            content (list[dict]): The content to export, as returned by ``process_book``.
+            filename (str): The name of the output PDF file.
+        """
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen.canvas import Canvas
+
+        filepath = self._output_path(filename)
+        try:
+            fragments = self._split_into_fragments(content)
+            toc_pages = self._plan_toc(content)
+            pages = []
+            for fragment in fragments:
+                pages.extend(self._render_fragment(fragment))
+                if fragment[0]["type"] == "cover":
+                    # TOC pages only reference forms, so they are cheap to lay out
+                    pages.extend(
+                        self._layout_pages(list(self._toc_flowables(toc_pages)))
+                    )
+            self._chapter_pages = []
+            canvas = Canvas(filepath, pagesize=letter)
+            canvas.setAuthor(self.author)
+            title = next(
+                (item["title"] for item in content if item["type"] == "cover"), None
+            )
+            if title:
+                canvas.setTitle(title)
+            for page in pages:
+                for flowable, x, y in page:
+                    flowable.drawOn(canvas, x, y)
+                self._draw_page_number(canvas)
+                canvas.showPage()
+            self._draw_toc_forms(canvas, toc_pages)
+            canvas.save()
+            logging.info(
+                f"Content successfully exported to {filepath} "
+                f"(render cache: {self.render_cache_hits} hits, "
+                f"{self.render_cache_misses} misses)"
+            )
+            return filepath
+
+        except (IOError, OSError) as e:
+            logging.error(f"File error during PDF export: {e}")
+            raise
+        except Exception as e:
+            logging.error(f"Error during PDF export: {e}")
+            raise
 
     def export(self, content: list[dict], filename: str):
         """
@@ -205,11 +759,15 @@ class PDFExporter(Exporter):
         Args:
             content (list[dict]): The content to export.
             filename (str): The name of the output PDF file.
+
+        Returns:
+            str: Path of the written PDF.
         """
-        filepath = os.path.join(self.output_dir, filename + ".pdf")
+        filepath = self._output_path(filename)
         try:
             self._build_pdf(filepath, content)
             logging.info(f"Content successfully exported to {filepath}")
+            return filepath
 
         except (IOError, OSError) as e:
             logging.error(f"File error during PDF export: {e}")
@@ -219,26 +777,471 @@ class PDFExporter(Exporter):
             raise
 
 
-if __name__ == "__main__":
-    import sys
+class MarkdownExporter(Exporter):
+    """
+    Concrete class for exporting content to a Markdown file.
+    """
 
-    logging.basicConfig(level=logging.INFO)
-    exporter = PDFExporter()
-    try:
-        with open(sys.argv[1], "r", encoding="utf-8") as book_file:
-            book_xml = book_file.read()
-    except FileNotFoundError:
-        logging.error(f"File not found error: {sys.argv[1]}")
-        sys.exit(1)
-    except Exception as e:
-        logging.error(f"Error reading file: {e}")
-        sys.exit(1)
+    extension = "md"
+
+    def export(self, content: list[dict], filename: str):
+        """
+        Exports content to a Markdown file.
+
+        Args:
+            content (list[dict]): The content to export.
+            filename (str): The name of the output file, without extension.
+
+        Returns:
+            str: Path of the written file.
+        """
+        lines = []
+        for item in content:
+            if item["type"] == "cover":
+                lines += [f"# {item['title']}", "", f"*{item['author']}*", ""]
+            elif item["type"] == "chapter_title":
+                lines += [f"## {item['title']}", ""]
+            elif item["type"] == "section_title":
+                lines += [f"### {item['title']}", ""]
+            elif item["type"] in ("paragraph", "error"):
+                lines += [item["text"].strip(), ""]
+
+        filepath = self._output_path(filename)
+        with open(filepath, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        logging.info(f"Content successfully exported to {filepath}")
+        return filepath
+
+
+class HTMLExporter(Exporter):
+    """
+    Concrete class for exporting content to a single, self-contained HTML file.
+    """
+
+    extension = "html"
+
+    STYLE = (
+        "body{max-width:40em;margin:2em auto;font-family:Georgia,serif;line-height:1.5}"
+        "h1,h2{text-align:center}h2{margin-top:3em}"
+        "p{text-align:justify;text-indent:1.5em}p.author{text-align:center;text-indent:0}"
+    )
+
+    def _body(self, content: list[dict]) -> str:
+        """Renders content items as HTML body markup."""
+        parts = []
+        for item in content:
+            if item["type"] == "cover":
+                parts.append(f"<h1>{html.escape(item['title'])}</h1>")
+                parts.append(f'<p class="author">{html.escape(item["author"])}</p>')
+            elif item["type"] == "chapter_title":
+                parts.append(f"<h2>{html.escape(item['title'])}</h2>")
+            elif item["type"] == "section_title":
+                parts.append(f"<h3>{html.escape(item['title'])}</h3>")
+            elif item["type"] in ("paragraph", "error"):
+                parts.append(f"<p>{html.escape(item['text'].strip())}</p>")
+        return "\n".join(parts)
+
+    def _document(self, title: str, body: str) -> str:
+        """Wraps body markup into a complete document."""
+        return (
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\"/>\n"
+            f"<title>{html.escape(title)}</title>\n<style>{self.STYLE}</style>\n"
+            f"</head>\n<body>\n{body}\n</body>\n</html>\n"
+        )
 
-    # Process the book and export to PDF
+    def export(self, content: list[dict], filename: str):
+        """
+        Exports content to an HTML file.
+
+        Args:
+            content (list[dict]): The content to export.
+            filename (str): The name of the output file, without extension.
+
+        Returns:
+            str: Path of the written file.
+        """
+        title = next(
+            (item["title"] for item in content if item["type"] == "cover"), filename
+        )
+        filepath = self._output_path(filename)
+        with open(filepath, "w", encoding="utf-8") as file:
+            file.write(self._document(title, self._body(content)))
+        logging.info(f"Content successfully exported to {filepath}")
+        return filepath
+
+
+class EPUBExporter(HTMLExporter):
+    """
+    Concrete class for exporting content to an EPUB 3 e-book.
+
+    The book is written directly as a zip container, one XHTML document per chapter
+    plus a navigation document, so no e-book library is needed.
+    """
+
+    extension = "epub"
+
+    def _document(self, title: str, body: str) -> str:
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" '
+            'xmlns:epub="http://www.idpf.org/2007/ops">\n'
+            f"<head>\n<title>{html.escape(title)}</title>\n"
+            f"<style>{self.STYLE}</style>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
+        )
+
+    def export(self, content: list[dict], filename: str):
+        """
+        Exports content to an EPUB file.
+
+        Args:
+            content (list[dict]): The content to export.
+            filename (str): The name of the output file, without extension.
+
+        Returns:
+            str: Path of the written file.
+        """
+        title = next(
+            (item["title"] for item in content if item["type"] == "cover"), filename
+        )
+        modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        identifier = "urn:sha256:" + hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        documents = []
+        for index, fragment in enumerate(self._split_into_fragments(content)):
+            heading = next(
+                (
+                    item["title"]
+                    for item in fragment
+                    if item["type"] in ("cover", "chapter_title")
+                ),
+                title,
+            )
+            document = self._document(heading, self._body(fragment))
+            documents.append((f"part{index:04d}.xhtml", heading, document))
+
+        nav_items = "".join(
+            f'<li><a href="{name}">{html.escape(heading)}</a></li>'
+            for name, heading, _ in documents
+        )
+        nav = self._document(
+            title, f'<nav epub:type="toc"><h1>Contents</h1><ol>{nav_items}</ol></nav>'
+        )
+        manifest = "".join(
+            f'<item id="p{i}" href="{name}" media-type="application/xhtml+xml"/>'
+            for i, (name, _, _) in enumerate(documents)
+        )
+        spine = "".join(f'<itemref idref="p{i}"/>' for i in range(len(documents)))
+        package = (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="uid">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="uid">{identifier}</dc:identifier>'
+            f"<dc:title>{html.escape(title)}</dc:title>"
+            f"<dc:creator>{html.escape(self.author)}</dc:creator>"
+            "<dc:language>en</dc:language>"
+            f'<meta property="dcterms:modified">{modified}</meta>'
+            "</metadata><manifest>"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            f"{manifest}</manifest><spine>{spine}</spine></package>"
+        )
+        container = (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" '
+            'media-type="application/oebps-package+xml"/></rootfiles></container>'
+        )
+
+        filepath = self._output_path(filename)
+        with zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED) as epub:
+            # The mimetype entry must come first and be stored uncompressed
+            epub.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+            epub.writestr("META-INF/container.xml", container)
+            epub.writestr("OEBPS/content.opf", package)
+            epub.writestr("OEBPS/nav.xhtml", nav)
+            for name, _, document in documents:
+                epub.writestr(f"OEBPS/{name}", document)
+        logging.info(f"Content successfully exported to {filepath}")
+        return filepath
+
+
+# Maps a format name to the exporter class writing it
+EXPORTERS = {
+    "pdf": PDFExporter,
+    "epub": EPUBExporter,
+    "html": HTMLExporter,
+    "md": MarkdownExporter,
+}
+
+
+def export_all(
+    book,
+    filename,
+    formats=("pdf", "epub", "html", "md"),
+    output_dir="output",
+    author="AI Book Generator",
+    pdf_exporter=None,
+):
+    """
+    Parses a book once and writes it in every requested format, concurrently.
+
+    Args:
+        book (Book | str): The parsed book, or the XML-formatted book string.
+        filename (str): The output file name, without extension.
+        formats (iterable): Format names, keys of ``EXPORTERS``. Surrounding
+                            whitespace and empty names are ignored.
+        output_dir (str): Directory the files are written to.
+        author (str): Author name shown on the cover.
+        pdf_exporter (PDFExporter, optional): Exporter writing the PDF with
+            ``export_incremental``, so the chapters it laid out in earlier calls,
+            such as exports of earlier drafts, are not laid out again.
+
+    Returns:
+        dict: Maps each format to the path of the written file.
+
+    Raises:
+        ValueError: If no format is given or a format is unknown.
+    """
+    formats = list(dict.fromkeys(name.strip() for name in formats if name.strip()))
+    if not formats:
+        raise ValueError("No export format given.")
+    unknown = [name for name in formats if name not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export formats: {unknown}")
+
+    exporters = {
+        name: EXPORTERS[name](output_dir=output_dir, author=author) for name in formats
+    }
+    exports = {name: exporter.export for name, exporter in exporters.items()}
+    if pdf_exporter is not None and "pdf" in exports:
+        exports["pdf"] = pdf_exporter.export_incremental
+    content = next(iter(exporters.values())).process_book(book)
+
+    with ThreadPoolExecutor(max_workers=len(exporters) or 1) as pool:
+        futures = {
+            name: pool.submit(profiled(f"export_{name}", export), content, filename)
+            for name, export in exports.items()
+        }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _expand_inputs(inputs) -> list[str]:
+    """
+    Expands directories and glob patterns into a sorted list of book files.
+
+    Args:
+        inputs (iterable): File paths, directories (all .txt and .xml files directly
+                           inside them) or glob patterns.
+
+    Returns:
+        list[str]: The book files, without duplicates.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for extension in ("txt", "xml"):
+                paths.update(glob.glob(os.path.join(item, f"*.{extension}")))
+        elif glob.has_magic(item):
+            paths.update(p for p in glob.glob(item) if os.path.isfile(p))
+        else:
+            paths.add(item)
+    return sorted(paths)
+
+
+def _export_signature(book_bytes: bytes, format: str, author: str) -> str:
+    """Hashes a book together with everything that affects its exported output."""
+    digest = hashlib.sha256(book_bytes)
+    digest.update(f"\x1f{format}\x1f{author}".encode("utf-8"))
+    if format == "pdf":
+        digest.update(_style_signature().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def export_file(
+    path,
+    output_dir="output",
+    format="pdf",
+    author="AI Book Generator",
+    force=False,
+    stream=False,
+):
+    """
+    Exports a single book file, skipping it if its output is already up to date.
+
+    The hash of the input and export settings is stored next to the output in a
+    ``.sha256`` file; when it matches and the output exists, nothing is rendered.
+
+    Args:
+        path (str): The book XML file.
+        output_dir (str): Directory the output is written to.
+        format (str): Output format, a key of ``EXPORTERS``.
+        author (str): Author name shown on the cover.
+        force (bool): Export even if the output is up to date.
+        stream (bool): Use the bounded-memory streaming PDF export.
+
+    Returns:
+        dict: The input path, status ("exported", "skipped" or "failed"), elapsed
+        seconds and error message, if any.
+    """
+    start = time.perf_counter()
     try:
-        processed_content = exporter.process_book(book_xml)
-        exporter.export(processed_content, "example_book")
-        print(f"PDF has been exported to the '{exporter.output_dir}' directory.")
+        exporter = EXPORTERS[format](output_dir=output_dir, author=author)
+        filename = os.path.splitext(os.path.basename(path))[0]
+        filepath = exporter._output_path(filename)
+        with open(path, "rb") as book_file:
+            book_bytes = book_file.read()
+
+        signature = _export_signature(book_bytes, format, author)
+        signature_path = filepath + ".sha256"
+        if not force and os.path.exists(filepath) and os.path.exists(signature_path):
+            with open(signature_path, "r", encoding="utf-8") as signature_file:
+                if signature_file.read().strip() == signature:
+                    return {
+                        "path": path,
+                        "status": "skipped",
+                        "seconds": time.perf_counter() - start,
+                        "error": None,
+                    }
+
+        if stream and format == "pdf":
+            exporter.export_stream(path, filename)
+        else:
+            book = Book.from_xml(book_bytes.decode("utf-8"))
+            exporter.export(exporter.process_book(book), filename)
+        with open(signature_path, "w", encoding="utf-8") as signature_file:
+            signature_file.write(signature)
+        return {
+            "path": path,
+            "status": "exported",
+            "seconds": time.perf_counter() - start,
+            "error": None,
+        }
+
     except Exception as e:
-        logging.error(f"Failed to process or export book: {e}")
+        return {
+            "path": path,
+            "status": "failed",
+            "seconds": time.perf_counter() - start,
+            "error": str(e),
+        }
+
+
+def batch_export(
+    inputs,
+    output_dir="output",
+    format="pdf",
+    author="AI Book Generator",
+    workers=None,
+    force=False,
+    stream=False,
+):
+    """
+    Exports many book files in parallel across processes.
+
+    Args:
+        inputs (iterable): Files, directories or glob patterns (see ``_expand_inputs``).
+        output_dir (str): Directory the outputs are written to.
+        format (str): Output format, a key of ``EXPORTERS``.
+        author (str): Author name shown on the cover.
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+        force (bool): Export even the books whose output is up to date.
+        stream (bool): Use the bounded-memory streaming PDF export.
+
+    Returns:
+        list[dict]: One result per book file, as returned by ``export_file``, sorted by path.
+    """
+    paths = _expand_inputs(inputs)
+    options = dict(
+        output_dir=output_dir, format=format, author=author, force=force, stream=stream
+    )
+    workers = min(workers or os.cpu_count() or 1, len(paths) or 1)
+    if workers == 1:
+        return [export_file(path, **options) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(functools.partial(export_file, **options), paths))
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    import contextlib
+
+    parser = argparse.ArgumentParser(description="Export book XML files")
+    parser.add_argument(
+        "inputs", nargs="+", help="Book files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default="output",
+        help="Directory to write the exports to.",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default="pdf",
+        choices=sorted(EXPORTERS),
+        help="Output format.",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Number of worker processes (default: CPU count)."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-export books whose output is up to date.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Use the bounded-memory streaming PDF export.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile CPU and memory use, exporting in this process (implies --workers 1).",
+    )
+    parser.add_argument(
+        "--profile_dir",
+        type=str,
+        default="output/profiles",
+        help="Directory the profiling reports are written to.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    profiler = None
+    if args.profile:
+        # Worker processes cannot be profiled from here
+        profiler = Profiler(args.profile_dir)
+        args.workers = 1
+    start = time.perf_counter()
+    with profiler.stage("batch_export") if profiler else contextlib.nullcontext():
+        results = batch_export(
+            args.inputs,
+            output_dir=args.output_dir,
+            format=args.format,
+            workers=args.workers,
+            force=args.force,
+            stream=args.stream,
+        )
+    if profiler:
+        profiler.close()
+        print(f"Profiling reports written to {profiler.directory}")
+    for result in results:
+        line = f"{result['status']:>8}  {result['seconds']:7.2f}s  {result['path']}"
+        if result["error"]:
+            line += f"  ({result['error']})"
+        print(line)
+
+    counts = {
+        status: sum(r["status"] == status for r in results)
+        for status in ("exported", "skipped", "failed")
+    }
+    print(
+        f"{len(results)} books in {time.perf_counter() - start:.2f}s: "
+        + ", ".join(f"{count} {status}" for status, count in counts.items())
+    )
+    if not results or counts["failed"]:
         sys.exit(1)
@@ -0,0 +1,169 @@
+# file_writer.py
+import os
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+
+class AsyncFileWriter:
+    """
+    Performs the pipeline's file I/O on a dedicated thread, off the event loop.
+
+    Coroutines hand their writes to the writer and carry on. The thread takes
+    whatever has been queued in one batch, appends through open file handles and
+    flushes each touched file once per batch, so many small log appends cost a single
+    write. Files are only fsynced when ``sync`` is called, at epoch boundaries.
+
+    At most ``max_pending`` appends may be queued; beyond that ``append`` waits for
+    the thread to catch up, so a slow disk slows producers down instead of letting
+    the queue grow without bound.
+    """
+
+    def __init__(self, max_pending=1024, batch_size=64):
+        """
+        Initializes the writer. The thread is started on first use.
+
+        Args:
+            max_pending (int): Maximum number of queued appends before ``append``
+                               waits.
+            batch_size (int): Maximum number of operations handled per batch.
+        """
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._slots = None
+        self._loop = None
+        self._files = {}
+
+    def _start(self):
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._thread = threading.Thread(
+                target=self._run, name="file-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _file(self, path):
+        handle = self._files.get(path)
+        if handle is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handle = self._files[path] = open(path, "a", encoding="utf-8")
+        return handle
+
+    def _run(self):
+        """Writer thread: handles queued operations in batches until stopped."""
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            touched = set()
+            for operation, *arguments in batch:
+                if operation == "append":
+                    path, text = arguments
+                    try:
+                        self._file(path).write(text)
+                        touched.add(path)
+                    except OSError as e:
+                        logging.error(f"Failed to append to {path}: {e}")
+                    finally:
+                        self._loop.call_soon_threadsafe(self._slots.release)
+                    continue
+
+                self._flush(touched)
+                touched = set()
+                future = arguments[-1]
+                # False if the caller was cancelled while the operation was queued
+                wanted = future.set_running_or_notify_cancel()
+                if operation == "call" and not wanted:
+                    continue
+                result = None
+                try:
+                    if operation == "call":
+                        function, args, kwargs, _ = arguments
+                        result = function(*args, **kwargs)
+                    elif operation == "sync":
+                        self._flush(self._files, fsync=True)
+                    elif operation == "stop":
+                        self._flush(self._files, fsync=True)
+                        for handle in self._files.values():
+                            handle.close()
+                        self._files.clear()
+                        running = False
+                except BaseException as e:
+                    if wanted:
+                        future.set_exception(e)
+                    else:
+                        logging.error(f"File writer {operation} failed: {e}")
+                    continue
+                if wanted:
+                    future.set_result(result)
+            self._flush(touched)
+
+    def _flush(self, paths, fsync=False):
+        for path in paths:
+            handle = self._files[path]
+            try:
+                handle.flush()
+                if fsync:
+                    os.fsync(handle.fileno())
+            except OSError as e:
+                logging.error(f"Failed to flush {path}: {e}")
+
+    def _submit(self, operation, *arguments):
+        self._start()
+        future = Future()
+        self._queue.put((operation, *arguments, future))
+        return asyncio.wrap_future(future)
+
+    async def append(self, path, text):
+        """
+        Queues text to be appended to a file.
+
+        Returns as soon as the text is queued; errors are logged by the writer thread.
+
+        Args:
+            path (str): The file to append to.
+            text (str): The text to append.
+        """
+        self._start()
+        await self._slots.acquire()
+        self._queue.put(("append", path, text))
+
+    async def call(self, function, *args, **kwargs):
+        """
+        Runs a blocking I/O function on the writer thread, after all queued writes.
+
+        If the caller is cancelled before the function has started, it is not run.
+
+        Args:
+            function (callable): The function to run.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The function's return value. Its exceptions are raised here.
+        """
+        return await self._submit("call", function, args, kwargs)
+
+    async def sync(self):
+        """Waits until every queued write is done and fsyncs the files written to."""
+        await self._submit("sync")
+
+    async def close(self):
+        """Writes and fsyncs everything queued, closes the files and stops the thread."""
+        if self._thread is None:
+            return
+        await self._submit("stop")
+        self._thread.join()
+        self._thread = None
@@ -1,4 +1,5 @@
 # filter.py
+import re
 import logging
 
 class Filter:
@@ -15,9 +16,27 @@ class Filter:
             feedback_keywords (list): A list of negative keywords that, if present in the feedback, will result in disapproval.
         """
         self.threshold = threshold
-        self.feedback_keywords = feedback_keywords if feedback_keywords else []
+        self._matcher = None
+        # Bumped on every change of the keywords; the matcher is compiled for one
+        # version at a time
+        self._keywords_version = 0
+        self._matcher_version = None
+        self.feedback_keywords = feedback_keywords
         logging.info(f"Filter initialized with threshold: {self.threshold}, negative keywords: {self.feedback_keywords}")
 
+    @property
+    def feedback_keywords(self):
+        """
+        A copy of the negative keywords. Change them by assigning a new list or with
+        ``add_negative_keywords`` and ``clear_negative_keywords``.
+        """
+        return list(self._feedback_keywords)
+
+    @feedback_keywords.setter
+    def feedback_keywords(self, keywords):
+        self._feedback_keywords = list(keywords) if keywords else []
+        self._keywords_version += 1
+
     def set_threshold(self, threshold):
       """
       Sets a new score threshold
@@ -29,7 +48,8 @@ class Filter:
         """
         Adds negative keywords to the filter criteria
         """
-        self.feedback_keywords.extend(keywords)
+        self._feedback_keywords.extend(keywords)
+        self._keywords_version += 1
         logging.info(f"Filter negative keywords updated. Current keywords: {self.feedback_keywords}")
     
     def clear_negative_keywords(self):
@@ -39,36 +59,114 @@ class Filter:
         self.feedback_keywords = []
         logging.info(f"Filter negative keywords cleared.")
 
+    def _keyword_matcher(self):
+        """
+        Returns a compiled pattern matching any negative keyword, case-insensitively.
+
+        All keywords are combined into a single alternation, so the feedback is
+        scanned once no matter how many keywords there are. The pattern is rebuilt
+        only after the keywords have changed.
+        """
+        if self._matcher_version != self._keywords_version:
+            # Longest first, so the reported keyword is the most specific match
+            alternatives = sorted({k.lower() for k in self._feedback_keywords if k}, key=len, reverse=True)
+            self._matcher = (
+                re.compile("|".join(map(re.escape, alternatives)), re.IGNORECASE)
+                if alternatives
+                else None
+            )
+            self._matcher_version = self._keywords_version
+        return self._matcher
+
+    @staticmethod
+    def _feedback_text(feedback):
+        """
+        Returns the text to match keywords against.
+
+        Args:
+            feedback (str | dict): The review text, or the parsed feedback mapping each
+                                   aspect to its rating and comment.
+
+        Returns:
+            str: The feedback text, with the aspect comments joined for parsed feedback.
+        """
+        if isinstance(feedback, dict):
+            return "\n".join(
+                (aspect.get("comment") or "") if isinstance(aspect, dict) else str(aspect)
+                for aspect in feedback.values()
+            )
+        return feedback or ""
+
+    def find_negative_keyword(self, feedback):
+        """
+        Finds the first negative keyword in the feedback.
+
+        Args:
+            feedback (str | dict): The review text or the parsed feedback.
+
+        Returns:
+            str: The matched text, or None if no negative keyword is present.
+        """
+        return self._search(self._keyword_matcher(), feedback)
+
+    @classmethod
+    def _search(cls, matcher, feedback):
+        """Returns the first text of the feedback matched by a keyword matcher, or None."""
+        if matcher is None:
+            return None
+        match = matcher.search(cls._feedback_text(feedback))
+        return match.group(0) if match else None
+
     def is_approved(self, score, feedback):
         """
         Checks if content is approved based on the given score and feedback.
 
         Args:
             score (int): The score of the content.
-            feedback (str): The feedback provided by the reviewer.
+            feedback (str | dict): The feedback provided by the reviewer, either as text
+                                   or as the parsed aspect feedback.
 
         Returns:
             bool: True if the score meets or exceeds the threshold and no negative keywords are found in the feedback, False otherwise.
         """
+        return self._is_approved(score, feedback, self._keyword_matcher())
+
+    def approve_many(self, candidates):
+        """
+        Checks a batch of candidates in one call.
+
+        The keyword matcher is looked up, and compiled if needed, once for the whole
+        batch.
+
+        Args:
+            candidates (iterable): (score, feedback) pairs, as taken by ``is_approved``.
+
+        Returns:
+            list[bool]: Whether each candidate is approved, in order.
+        """
+        matcher = self._keyword_matcher()
+        return [
+            self._is_approved(score, feedback, matcher)
+            for score, feedback in candidates
+        ]
+
+    def _is_approved(self, score, feedback, matcher):
+        """Checks a candidate as ``is_approved`` does, with the given keyword matcher."""
         if not isinstance(score, int):
             logging.error(f"Invalid score type: {type(score)}. Score must be an int.")
             return False
 
         if score < 0:
-             logging.error("Score must be a positive number.")
-             return False
+            logging.error("Score must be a positive number.")
+            return False
 
         if score >= self.threshold:
-            if self.feedback_keywords:
-              for keyword in self.feedback_keywords:
-                if keyword.lower() in feedback.lower():
-                    logging.info(f"Book disapproved due to negative keyword '{keyword}' in feedback.")
-                    return False
-              logging.info(f"Book approved with score: {score} and feedback: {feedback}")
-              return True
-            else:
-               logging.info(f"Book approved with score: {score}")
-               return True
-
-        logging.info(f"Book not approved with score: {score} and feedback: {feedback}")
-        return False
\ No newline at end of file
+            keyword = self._search(matcher, feedback)
+            if keyword is not None:
+                logging.info(f"Book disapproved due to negative keyword '{keyword}' in feedback.")
+                return False
+            logging.info(f"Book approved with score: {score}")
+            return True
+
+        logging.info(f"Book not approved with score: {score}")
+        return False
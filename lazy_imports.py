@@ -0,0 +1,45 @@
+# lazy_imports.py
+import sys
+import time
+import importlib
+
+# Seconds spent importing each module loaded through timed_import, in load order.
+IMPORT_TIMES = {}
+
+
+def timed_import(module_name: str):
+    """
+    Imports a module on first use and records how long the import took.
+
+    Args:
+        module_name (str): Dotted name of the module to import.
+
+    Returns:
+        module: The imported module.
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+
+def format_import_report(extra=None) -> str:
+    """
+    Formats the recorded import times as a small table, slowest first.
+
+    Args:
+        extra (dict, optional): Additional named timings (in seconds) to include.
+
+    Returns:
+        str: The report.
+    """
+    timings = dict(IMPORT_TIMES)
+    timings.update(extra or {})
+    width = max((len(name) for name in timings), default=0)
+    lines = ["Startup import times:"]
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -1,18 +1,37 @@
 # main.py
+import time
+
+_IMPORT_START = time.perf_counter()
+
 from agents.writer.writer_agent import WriterAgent
 from agents.reviewer.reviewer_agent import ReviewerAgent
-from api.openai_api import OpenAIAPI
-from api.google_api import GoogleAPI
-from api.mock_api import MockAPI
-from exporter import PDFExporter
+from agents.writer_chapter.chapter_writer_agent import ChapterWriterAgent
+from api import PROVIDERS, create_api
+from exporter import PDFExporter, EXPORTERS, export_all
 from filter import Filter
+from scoring import ScoringEngine
+from book import Book
+from metrics import MetricsStore
+from artifacts import ArtifactStore
+from file_writer import AsyncFileWriter
+from router import ModelRouter
+from quality_gate import QualityGate
+from similarity import DraftTracker
+from ensemble import ReviewEnsemble
+from pipeline import PipelinedReview
+from theme_index import ThemeIndex
+from deadline import Deadline, StageTimeout
+from profiling import Profiler
+import profiling
+from lazy_imports import format_import_report
+import os
 import random
-import time
 import argparse
-import os
 import asyncio
 import logging
 
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
@@ -39,85 +58,134 @@ def get_input():
 
 
 def create_api_instance(api_type, api_key):
-    if api_type == "openai":
-        return OpenAIAPI(api_key=api_key)
-    elif api_type == "google":
-        return GoogleAPI(api_key=api_key)
-    elif api_type == "mock":
-        return MockAPI(api_key=api_key)
-    else:
-        raise ValueError(f"Invalid API type: {api_type}")
+    """
+    Creates the API instance for the selected provider, importing only its backend.
+
+    Args:
+        api_type (str): Name of a provider registered in ``api.PROVIDERS``.
+        api_key (str): API key or path to a key file.
+
+    Returns:
+        API: The API instance.
+
+    Raises:
+        ValueError: If the provider is unknown.
+    """
+    return create_api(api_type, api_key)
 
 
 async def generate_book(
-    writer, book, review, input_prompt, log_filename, exporter, epoch
+    writer, book, review, input_prompt, exporter, epoch, record, model=None
 ):
     """
-    Generates and reviews a book, with a timeout for API calls.
+    Generates a book. API calls time out after the API's ``timeout``; the caller
+    bounds the whole stage with a ``Deadline``.
 
     Args:
         writer: Writer agent responsible for generating the book.
         book: The current book iteration. Book is None in the first.
-        feedback: Feedback from the current book iteration. feedback is None in the first.
+        review: Review of the current book iteration. review is None in the first.
         input_prompt: The prompt for the writer agent.
-        log_filename: Path to the log file.
         exporter: Exporter instance for saving books.
         epoch: Current iteration or epoch.
+        record (dict): Metrics of the current epoch, updated in place.
+        model (str, optional): The model to write with.
 
     Returns:
-        tuple: Generated book, review score, and feedback.
+        Book | str: The generated book, parsed once here so later stages can share it,
+        or the raw text if it is not valid XML. None if an error occurred.
     """
     try:
         # Generate Book
-        book = await writer.generate_book(input_prompt, book, review)
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        book_filename = f"book_{timestamp}_epoch{epoch + 1}.txt"
-
-        # Save book content
-        book_path = os.path.join(exporter.output_dir, book_filename)
-        with open(book_path, "w", encoding="utf-8") as file:
-            file.write(book)
-        logging.info(f"Book content saved to: {book_path}")
+        start = time.perf_counter()
+        book = await writer.generate_book(input_prompt, book, review, model=model)
+        record["writer_latency"] = time.perf_counter() - start
+        _record_completion(record, "writer", book)
+        if not book:
+            raise ValueError("The writer returned no book.")
+        try:
+            book = Book.from_xml(book)
+        except ValueError as e:
+            logging.warning(f"Generated book is not valid XML, keeping raw text: {e}")
         return book
 
     except Exception as e:
         error_message = f"An error occurred during iteration {epoch + 1}: {e}"
         logging.error(error_message)
+        record["error"] = error_message
+        return None
 
-        # Log error to review log
-        with open(log_filename, "a", encoding="utf-8") as log_file:
-            log_file.write(f"Epoch: {epoch + 1}, Error: {error_message}\n")
 
-        return None, 0, error_message
+async def save_book(book, artifacts, file_writer, epoch):
+    """
+    Saves the text of a draft to the artifact store, off the event loop.
+
+    Args:
+        book: The draft to save.
+        artifacts (ArtifactStore): The store of the current run.
+        file_writer (AsyncFileWriter): Writer performing the file I/O.
+        epoch: Current iteration or epoch.
+
+    Returns:
+        str: Content hash of the saved draft.
+    """
+    digest = await file_writer.call(artifacts.put, str(book), "draft", epoch + 1)
+    logging.info(f"Book content saved as artifact {digest[:12]}")
+    return digest
+
+
+def export_draft(exporter, book, filename):
+    """
+    Exports a draft as a PDF, laying out only the chapters that changed since the
+    exporter's earlier exports.
 
+    Args:
+        exporter (PDFExporter): The run's exporter, whose render cache carries over.
+        book (Book): The draft to export.
+        filename (str): The output file name, without extension.
 
-async def review_book(reviewer, book, input_prompt, log_filename, exporter, epoch):
+    Returns:
+        str: Path of the exported PDF.
     """
-    Generates and reviews a book, with a timeout for API calls.
+    return exporter.export_incremental(exporter.process_book(book), filename)
+
+
+async def review_book(
+    reviewer, book, input_prompt, exporter, epoch, record, model=None
+):
+    """
+    Reviews a book. API calls time out after the API's ``timeout``; the caller
+    bounds the whole stage with a ``Deadline``.
 
     Args:
         reviewer: Reviewer agent responsible for reviewing the book.
+        book: The book to review.
         input_prompt: The prompt for the writer agent.
-        log_filename: Path to the log file.
         exporter: Exporter instance for saving books.
         epoch: Current iteration or epoch.
+        record (dict): Metrics of the current epoch, updated in place.
+        model (str, optional): The model to review with.
 
     Returns:
-        tuple: Generated book, review score, and feedback.
+        tuple: Review, review score, and feedback.
     """
     try:
         # Review Book
-        review = await reviewer.review_book(book, input_prompt)
+        start = time.perf_counter()
+        review = await reviewer.review_book(book, input_prompt, model=model)
+        record["reviewer_latency"] = (
+            record.get("reviewer_latency") or 0
+        ) + time.perf_counter() - start
+        _record_completion(record, "reviewer", review)
         review_parsed = reviewer.parse_review(review)
         score = review_parsed.get("overall_score", 0)
-        score_cat = review_parsed.get("categories", 0)
         feedback = review_parsed.get("feedback", "No feedback provided")
 
-        # Log review
-        with open(log_filename, "a", encoding="utf-8") as log_file:
-            log_file.write(
-                f"Epoch: {epoch + 1}, Score: {score}, Score Categories: {score_cat}, Feedback: {feedback}\n"
-            )
+        record["overall_score"] = score
+        record["categories"] = review_parsed.get("categories", {})
+        record["aspects"] = {
+            name: aspect["rating"] for name, aspect in feedback.items()
+        }
 
         logging.info(f"Review Score: {score}")
         return review, score, feedback
@@ -125,14 +193,267 @@ async def review_book(reviewer, book, input_prompt, log_filename, exporter, epoc
     except Exception as e:
         error_message = f"An error occurred during iteration {epoch + 1}: {e}"
         logging.error(error_message)
+        record["error"] = error_message
+        return None, 0, error_message
+
+
+async def review_with_ensemble(ensemble, book, input_prompt, epoch, record):
+    """
+    Reviews a book with a reviewer ensemble.
 
-        # Log error to review log
-        with open(log_filename, "a", encoding="utf-8") as log_file:
-            log_file.write(f"Epoch: {epoch + 1}, Error: {error_message}\n")
+    Args:
+        ensemble (ReviewEnsemble): The ensemble reviewing the book.
+        book: The book to review.
+        input_prompt: The prompt for the writer agent.
+        epoch: Current iteration or epoch.
+        record (dict): Metrics of the current epoch, updated in place.
 
+    Returns:
+        tuple: Aggregated review, review score, and feedback.
+    """
+    try:
+        start = time.perf_counter()
+        result = await ensemble.review(book, input_prompt)
+        record["reviewer_latency"] = time.perf_counter() - start
+        for _, answer in result["answers"]:
+            _record_completion(record, "reviewer", answer)
+        parsed = result["parsed"]
+        score = parsed["overall_score"]
+        feedback = parsed["feedback"]
+
+        record["reviewer_model"] = (
+            f"ensemble({'+'.join(label for label, _ in result['answers'])})"
+        )
+        record["overall_score"] = score
+        record["categories"] = parsed["categories"]
+        record["aspects"] = {name: aspect["rating"] for name, aspect in feedback.items()}
+
+        logging.info(
+            f"Ensemble Review Score: {score} from {len(result['answers'])} reviewers"
+            + (" (early verdict)" if result["early"] else "")
+        )
+        return result["review"], score, feedback
+
+    except Exception as e:
+        error_message = f"An error occurred during iteration {epoch + 1}: {e}"
+        logging.error(error_message)
+        record["error"] = error_message
         return None, 0, error_message
 
 
+async def write_and_review_book(
+    pipeline, book, review, input_prompt, epoch, record
+):
+    """
+    Writes a book and reviews its chapters while it is being written.
+
+    Args:
+        pipeline (PipelinedReview): The pipeline writing and reviewing the book.
+        book: The current book iteration. Book is None in the first.
+        review: Review of the current book iteration. review is None in the first.
+        input_prompt: The prompt for the writer agent.
+        epoch: Current iteration or epoch.
+        record (dict): Metrics of the current epoch, updated in place.
+
+    Returns:
+        tuple: The generated book, parsed as by ``generate_book`` (None if an error
+        occurred), and its review, review score and feedback (None if no chapter
+        could be reviewed). A draft whose chapters failed the quality gate gets the
+        gate's review.
+    """
+    try:
+        result = await pipeline.run(input_prompt, book, review)
+        book = result["book"]
+        record["writer_latency"] = result["writer_latency"]
+        # Only the review time not hidden behind the writing adds to the epoch
+        record["reviewer_latency"] = result["review_latency"]
+        _record_completion(record, "writer", result["completion"])
+        for _, answer in result["answers"]:
+            _record_completion(record, "reviewer", answer)
+        if not book:
+            raise ValueError("The writer returned no book.")
+        if result["gate_review"]:
+            return book, _gate_verdict(pipeline.reviewer, result["gate_review"], record)
+
+        parsed = result["parsed"]
+        if parsed is None:
+            logging.warning("No chapter review succeeded, reviewing the whole book.")
+            return book, None
+        feedback = parsed["feedback"]
+        record["overall_score"] = parsed["overall_score"]
+        record["categories"] = parsed["categories"]
+        record["aspects"] = {name: aspect["rating"] for name, aspect in feedback.items()}
+        logging.info(
+            f"Pipelined Review Score: {parsed['overall_score']} "
+            f"from {len(result['answers'])} chapters"
+        )
+        return book, (result["review"], parsed["overall_score"], feedback)
+
+    except Exception as e:
+        error_message = f"An error occurred during iteration {epoch + 1}: {e}"
+        logging.error(error_message)
+        record["error"] = error_message
+        return None, None
+
+
+def build_ensemble(spec, api, api_type, file_writer, threshold, quorum=None):
+    """
+    Builds a reviewer ensemble from a command-line specification.
+
+    Args:
+        spec (str): Comma-separated reviewers, each a provider name optionally
+                    followed by ":model", e.g. "openai:gpt-4o-mini,deepseek,deepseek".
+        api: The API of the run, reused for reviewers of the same provider.
+        api_type (str): Provider name of ``api``.
+        file_writer (AsyncFileWriter): Writer the reviewers log their prompts through.
+        threshold (int): The Filter threshold.
+        quorum (int, optional): Number of answers to wait for.
+
+    Returns:
+        ReviewEnsemble: The ensemble.
+
+    Raises:
+        ValueError: If a provider is unknown or has no credentials.
+    """
+    reviewers = {api_type: ReviewerAgent(api, file_writer)}
+    members = []
+    for entry in spec.split(","):
+        provider, _, model = entry.strip().partition(":")
+        if provider not in reviewers:
+            provider_api = create_api(provider)
+            provider_api.timeout = api.timeout
+            reviewers[provider] = ReviewerAgent(provider_api, file_writer)
+        members.append((entry.strip(), reviewers[provider], model or None))
+    return ReviewEnsemble(members, threshold, quorum=quorum)
+
+
+def gate_book(quality_gate, reviewer, book, record):
+    """
+    Runs the local quality gate on a draft before it is reviewed.
+
+    Args:
+        quality_gate (QualityGate): The gate to run.
+        reviewer: Reviewer agent, used to parse the gate's review.
+        book: The draft to check.
+        record (dict): Metrics of the current epoch, updated in place.
+
+    Returns:
+        tuple: Review, review score, and feedback if the draft failed the gate,
+        otherwise None.
+    """
+    review = quality_gate.review(book)
+    if review is None:
+        return None
+    return _gate_verdict(reviewer, review, record)
+
+
+def _gate_verdict(reviewer, review, record):
+    """Records a quality gate review in the epoch metrics and returns its verdict."""
+    review_parsed = reviewer.parse_review(review)
+    feedback = review_parsed["feedback"]
+    record["reviewer_model"] = "quality-gate"
+    record["overall_score"] = review_parsed["overall_score"]
+    record["aspects"] = {name: aspect["rating"] for name, aspect in feedback.items()}
+    return review, review_parsed["overall_score"], feedback
+
+
+async def write_long_book(
+    api, file_writer, input_prompt, chapters, directory, exporter, model=None
+):
+    """
+    Writes a long book chapter by chapter and exports it, without reviewing it.
+
+    Progress is kept in ``directory``, so running again with the same theme, number
+    of chapters and directory resumes after the last completed chapter.
+
+    Args:
+        api: The API writing the book.
+        file_writer (AsyncFileWriter): Writer performing the file I/O.
+        input_prompt: The theme of the book.
+        chapters (int): Number of chapters.
+        directory (str): Directory holding the outline and completed chapters.
+        exporter (PDFExporter): Exporter for the finished book.
+        model (str, optional): The model to write with.
+
+    Returns:
+        str: Path of the exported PDF.
+    """
+    writer = ChapterWriterAgent(api, file_writer)
+    await writer.generate_book(input_prompt, chapters, directory, model=model)
+    book_path = await file_writer.call(
+        writer.write_book_xml, directory, os.path.join(directory, "book.xml")
+    )
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    # Layout is CPU-heavy: it runs on its own thread, not the file writer's
+    path = await asyncio.to_thread(
+        exporter.export_stream, book_path, f"book_long_{timestamp}"
+    )
+    logging.info(f"Long book exported to {path}")
+    return path
+
+
+def _model_pair(value):
+    """Parses a "fast,strong" or single-model argument into a tuple of models."""
+    models = tuple(model.strip() for model in value.split(","))
+    if len(models) > 2 or not all(models):
+        raise argparse.ArgumentTypeError(
+            f"expected one model or a fast,strong pair, got '{value}'"
+        )
+    return models
+
+
+def _export_formats(value):
+    """Parses a comma-separated list of export formats, ignoring whitespace."""
+    formats = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in EXPORTERS]
+    if not formats or unknown:
+        raise argparse.ArgumentTypeError(
+            f"expected formats among {', '.join(EXPORTERS)}, got '{value}'"
+        )
+    return formats
+
+
+def _score_map(value):
+    """Parses a "name=value,name=value" argument into a mapping of score names."""
+    scores = {}
+    for item in value.split(","):
+        name, _, number = item.partition("=")
+        try:
+            scores[name.strip()] = float(number)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"expected name=value pairs, got '{item.strip()}'"
+            )
+    return scores
+
+
+def _parsed_scores(reviewer, review, score):
+    """Parses a review for the scoring engine, falling back to its overall score."""
+    try:
+        return reviewer.parse_review(review)
+    except (TypeError, ValueError):
+        return {"overall_score": int(score)}
+
+
+def _record_completion(record, role, completion):
+    """
+    Copies the model and token usage of an API completion into the epoch metrics.
+    Token counts accumulate, so a confirmatory review adds to the first pass.
+
+    Args:
+        record (dict): Metrics of the current epoch, updated in place.
+        role (str): Either "writer" or "reviewer".
+        completion: The text returned by the API, possibly an ``api.api.Completion``.
+    """
+    record[f"{role}_model"] = getattr(completion, "model", None) or record.get(
+        f"{role}_model"
+    )
+    usage = getattr(completion, "usage", {})
+    for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+        if usage.get(key) is not None:
+            record[f"{role}_{key}"] = (record.get(f"{role}_{key}") or 0) + usage[key]
+
+
 async def main():
     """
     Main function to run the AI book generator.
@@ -142,8 +463,8 @@ async def main():
         "--api",
         type=str,
         default="google",
-        choices=["openai", "google", "mock"],
-        help="API to use (openai, google)",
+        choices=sorted(PROVIDERS),
+        help=f"API to use ({', '.join(sorted(PROVIDERS))})",
     )
     parser.add_argument("--api_key", type=str, help="API key for the selected API")
     parser.add_argument(
@@ -152,60 +473,487 @@ async def main():
         default=5,
         help="Maximum iterations for book generation.",
     )
+    parser.add_argument(
+        "--metrics_db",
+        type=str,
+        default="output/metrics.db",
+        help="SQLite database recording the metrics of every epoch.",
+    )
+    parser.add_argument(
+        "--artifacts_dir",
+        type=str,
+        default="output/artifacts",
+        help="Content-addressed store for the drafts, reviews and exports of every run.",
+    )
+    parser.add_argument(
+        "--export_formats",
+        type=_export_formats,
+        default="pdf",
+        help=f"Comma-separated formats for the approved book ({', '.join(EXPORTERS)}).",
+    )
+    parser.add_argument(
+        "--score_weights",
+        type=_score_map,
+        help="Weights of the scores the best draft is chosen by, e.g. "
+        "'overall=1,aspect:Creativity=0.5,category:Literary_Merit=0.5' "
+        "(default: the overall score).",
+    )
+    parser.add_argument(
+        "--score_minimums",
+        type=_score_map,
+        help="Lowest scores, on their own scales, a draft needs to be approved, "
+        "e.g. 'aspect:Grammar=6'.",
+    )
+    parser.add_argument(
+        "--score_threshold",
+        type=float,
+        default=0,
+        help="Lowest weighted score, between 0 and 1, a draft needs to be approved.",
+    )
+    parser.add_argument(
+        "--export_drafts",
+        action="store_true",
+        help="Export every draft as a PDF preview; unchanged chapters keep their layout between drafts and the approved book.",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Use a fast model for drafts and first-pass reviews, escalating to the strong model near the threshold.",
+    )
+    parser.add_argument(
+        "--writer_models",
+        type=_model_pair,
+        help="Comma-separated fast,strong models for the writer, or one model for "
+        "both (with --cascade).",
+    )
+    parser.add_argument(
+        "--reviewer_models",
+        type=_model_pair,
+        help="Comma-separated fast,strong models for the reviewer, or one model for "
+        "both (with --cascade).",
+    )
+    parser.add_argument(
+        "--escalation_margin",
+        type=int,
+        default=10,
+        help="Distance from the filter threshold at which the strong model takes over.",
+    )
+    parser.add_argument(
+        "--writer_margin",
+        type=int,
+        help="Escalation margin of the writer (default: --escalation_margin).",
+    )
+    parser.add_argument(
+        "--reviewer_margin",
+        type=int,
+        help="Escalation margin of the reviewer (default: --escalation_margin).",
+    )
+    parser.add_argument(
+        "--review_ensemble",
+        type=str,
+        help="Review every draft concurrently with these comma-separated reviewers, "
+        "each a provider with an optional :model (e.g. openai:gpt-4o-mini,deepseek,google).",
+    )
+    parser.add_argument(
+        "--quorum",
+        type=int,
+        help="Number of ensemble reviews to wait for (default: a majority).",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Review each chapter as soon as the writer has streamed it, "
+        "overlapping the review with the writing.",
+    )
+    parser.add_argument(
+        "--theme_index",
+        type=str,
+        default="output/theme_index.db",
+        help="Index of approved books by theme, used to warm-start runs on similar themes.",
+    )
+    parser.add_argument(
+        "--warm_start_similarity",
+        type=float,
+        default=0.7,
+        help="Theme similarity (0-1) from which a run starts from an earlier approved "
+        "book (above 1 to never warm-start).",
+    )
+    parser.add_argument(
+        "--no_quality_gate",
+        "--no-quality-gate",
+        action="store_true",
+        help="Send every draft to the reviewer, even ones failing the local checks.",
+    )
+    parser.add_argument(
+        "--duplicate_threshold",
+        type=float,
+        default=0.95,
+        help="Similarity to an earlier draft from which its review is reused instead of reviewing again.",
+    )
+    parser.add_argument(
+        "--stagnation_patience",
+        type=int,
+        default=2,
+        help="Stop after this many near-duplicate drafts in a row (0 to never stop).",
+    )
+    parser.add_argument(
+        "--call_timeout",
+        type=float,
+        help="Seconds a single API call may take before it is cancelled "
+        "(default: the API's, 600).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Seconds the whole run may take; work still running then is cancelled.",
+    )
+    parser.add_argument(
+        "--write_budget",
+        type=float,
+        help="Seconds each draft may take, continuations included.",
+    )
+    parser.add_argument(
+        "--review_budget",
+        type=float,
+        help="Seconds each review may take, confirmations and ensembles included.",
+    )
+    parser.add_argument(
+        "--long_book",
+        type=int,
+        metavar="CHAPTERS",
+        help="Write a book of this many chapters one chapter at a time, skipping the review loop.",
+    )
+    parser.add_argument(
+        "--long_book_dir",
+        type=str,
+        default="output/long_book",
+        help="Directory holding a long book's progress; an interrupted book resumes from it.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile CPU and memory use of every stage and report slow event loop callbacks.",
+    )
+    parser.add_argument(
+        "--profile_dir",
+        type=str,
+        default="output/profiles",
+        help="Directory the profiling reports are written to, one subdirectory per run.",
+    )
+    parser.add_argument(
+        "--slow_callback_ms",
+        type=float,
+        default=100,
+        help="Report callbacks blocking the event loop for longer than this (with --profile).",
+    )
+    parser.add_argument(
+        "--profile_startup",
+        "--profile-startup",
+        action="store_true",
+        help="Report module import times once the API is ready.",
+    )
     args = parser.parse_args()
+    scoring = None
+    if args.score_weights or args.score_minimums or args.score_threshold:
+        try:
+            scoring = ScoringEngine(
+                args.score_weights, args.score_minimums, args.score_threshold
+            )
+        except ValueError as e:
+            parser.error(str(e))
 
     logging.basicConfig(level=logging.INFO)
     logging.info("Starting AI Book Generator...")
 
     input_prompt = get_input()
     logging.info(f"Initial Input: {input_prompt}\n")
+    deadline = Deadline(
+        args.deadline, {"write": args.write_budget, "review": args.review_budget}
+    )
 
     try:
         api = create_api_instance(args.api, args.api_key)
     except ValueError as e:
         logging.error(f"Failed to create API instance: {e}")
         return
+    if args.call_timeout:
+        api.timeout = args.call_timeout
+
+    if args.profile_startup:
+        logging.info(format_import_report({"main (module imports)": _IMPORT_TIME}))
+
+    run_id = MetricsStore.new_run_id()
+    logging.info(f"Run ID: {run_id}")
+    profiler = None
+    if args.profile:
+        profiler = Profiler(args.profile_dir, run_id, args.slow_callback_ms / 1000)
+        profiler.watch_event_loop()
 
     # Initialize agents and tools
-    writer = WriterAgent(api)
-    reviewer = ReviewerAgent(api)
+    file_writer = AsyncFileWriter()
     exporter = PDFExporter()
+    if args.long_book:
+        try:
+            with profiling.stage("long_book"):
+                await deadline.run(
+                    "long_book",
+                    write_long_book(
+                        api,
+                        file_writer,
+                        input_prompt,
+                        args.long_book,
+                        args.long_book_dir,
+                        exporter,
+                    ),
+                )
+        except StageTimeout as e:
+            logging.error(f"{e} Run again with the same --long_book_dir to resume.")
+        except ValueError as e:
+            logging.error(f"Cannot write the long book: {e}")
+        finally:
+            await file_writer.close()
+            if profiler:
+                profiler.close()
+        logging.info("\nBook generation process finished.")
+        return
+
+    writer = WriterAgent(api, file_writer)
+    reviewer = ReviewerAgent(api, file_writer)
     filter = Filter(threshold=86)
+    quality_gate = None if args.no_quality_gate else QualityGate()
+    ensemble = None
+    if args.review_ensemble:
+        try:
+            ensemble = build_ensemble(
+                args.review_ensemble,
+                api,
+                args.api,
+                file_writer,
+                filter.threshold,
+                args.quorum,
+            )
+        except ValueError as e:
+            logging.error(f"Failed to create the review ensemble: {e}")
+            await file_writer.close()
+            return
+    drafts = DraftTracker(
+        threshold=args.duplicate_threshold, patience=args.stagnation_patience
+    )
 
-    log_filename = "review_log.txt"
+    router = None
+    if args.cascade:
+        overrides = {}
+        for role, models in (
+            ("writer", args.writer_models),
+            ("reviewer", args.reviewer_models),
+        ):
+            if models:
+                overrides[role] = models
+        router = ModelRouter.for_api(
+            api,
+            filter.threshold,
+            args.escalation_margin,
+            overrides,
+            {"writer": args.writer_margin, "reviewer": args.reviewer_margin},
+        )
+
+    metrics = MetricsStore(args.metrics_db)
+    artifacts = ArtifactStore(args.artifacts_dir, run_id)
+
+    theme_index = ThemeIndex(args.theme_index)
 
     previous_books = [None, None]
     previous_reviews = [None, None]
+    seed = theme_index.seed(input_prompt, args.warm_start_similarity)
+    if seed:
+        logging.info(
+            f"Starting from the book approved with score {seed['score']} for the "
+            f"similar theme '{seed['theme']}' (similarity {seed['similarity']:.2f})"
+        )
+        try:
+            previous_books[0] = Book.from_xml(seed["book"])
+        except ValueError:
+            previous_books[0] = seed["book"]
+        # The seed guides the first draft; best_score stays 0, so the run's own
+        # first reviewed draft takes its place
+        previous_reviews[0] = seed["review"]
 
     approved = False
     book = None
     score = None
     best_score = 0
+    candidates = []  # (epoch, book, review, parsed review) of every reviewed draft
     review = None
     for epoch in range(args.max_iterations):
+        if deadline.expired:
+            logging.warning("Run deadline reached, not starting another epoch.")
+            break
         logging.info(f"\n--- Epoch {epoch + 1} ---")
+        record = {
+            "run_id": run_id,
+            "epoch": epoch + 1,
+            "provider": args.api,
+            "writer_model": (
+                router.writer_model(best_score) if router else api.MODEL_NAME
+            ),
+            "reviewer_model": router.reviewer_model() if router else api.MODEL_NAME,
+        }
         try:
-            generate_book
             # Generate and review the book
-            book = await generate_book(
-                writer,
-                previous_books,
-                previous_reviews,
-                input_prompt,
-                log_filename,
-                exporter,
-                epoch,
-            )
-            # Generate and review the book
-            review, score, feedback = await review_book(
-                reviewer, book, input_prompt, log_filename, exporter, epoch
-            )
+            pipelined = None
+            if args.pipeline:
+                # The chapter reviews run inside the write stage and its budget
+                pipeline = PipelinedReview(
+                    writer,
+                    reviewer,
+                    writer_model=record["writer_model"],
+                    reviewer_model=record["reviewer_model"],
+                    gate=quality_gate,
+                )
+                with profiling.stage("write"):
+                    book, pipelined = await deadline.run(
+                        "write",
+                        write_and_review_book(
+                            pipeline,
+                            previous_books,
+                            previous_reviews,
+                            input_prompt,
+                            epoch,
+                            record,
+                        ),
+                    )
+            else:
+                with profiling.stage("write"):
+                    book = await deadline.run(
+                        "write",
+                        generate_book(
+                            writer,
+                            previous_books,
+                            previous_reviews,
+                            input_prompt,
+                            exporter,
+                            epoch,
+                            record,
+                            model=record["writer_model"],
+                        ),
+                    )
             if not book:
                 logging.warning("No book generated, skipping this iteration.")
                 continue
 
+            match = drafts.compare(book, epoch + 1)
+            if match["epoch"] is not None:
+                record["similarity"] = match["similarity"]
+            # A pipelined draft's review is already paid for: it is kept even for
+            # a near-duplicate, and a stagnant run stops after the epoch
+            if match["stagnant"] and not pipelined:
+                logging.info(
+                    f"Stopping: the last {drafts.patience} drafts were near-duplicates "
+                    "of earlier ones."
+                )
+                break
+
+            reused = (
+                not pipelined and match["duplicate"] and match["review"] is not None
+            )
+            if reused:
+                logging.info(
+                    f"Draft is a near-duplicate of epoch {match['epoch']}, "
+                    "reusing its review."
+                )
+                review, score, feedback = match["review"]
+                record["reviewer_model"] = "reused"
+                record["overall_score"] = int(score)
+            else:
+                await save_book(book, artifacts, file_writer, epoch)
+                if args.export_drafts and isinstance(book, Book):
+                    try:
+                        # Off the file writer's thread, which the small writes share
+                        path = await asyncio.to_thread(
+                            profiling.wrap("export_draft", export_draft),
+                            exporter,
+                            book,
+                            f"book_draft_{run_id}",
+                        )
+                        logging.info(f"Draft exported to {path}")
+                    except Exception as e:
+                        logging.warning(f"Could not export the draft: {e}")
+                gated = None
+                if quality_gate and not pipelined:
+                    # The pipeline gated a pipelined draft by chapter and as a whole
+                    with profiling.stage("quality_gate"):
+                        gated = gate_book(quality_gate, reviewer, book, record)
+                if pipelined:
+                    review, score, feedback = pipelined
+                elif gated:
+                    review, score, feedback = gated
+                elif ensemble:
+                    with profiling.stage("review"):
+                        review, score, feedback = await deadline.run(
+                            "review",
+                            review_with_ensemble(
+                                ensemble, book, input_prompt, epoch, record
+                            ),
+                        )
+                else:
+                    with profiling.stage("review"):
+                        review, score, feedback = await deadline.run(
+                            "review",
+                            review_book(
+                                reviewer,
+                                book,
+                                input_prompt,
+                                exporter,
+                                epoch,
+                                record,
+                                model=record["reviewer_model"],
+                            ),
+                        )
+                # Pipelined and ensemble reviews come from the fast model too, so a
+                # score near the threshold is confirmed on every path
+                if not gated and router and router.needs_confirmation(int(score)):
+                    logging.info(
+                        f"Score {score} is near the threshold, confirming review..."
+                    )
+                    record["reviewer_model"] = router.reviewer_model(confirm=True)
+                    with profiling.stage("review"):
+                        review, score, feedback = await deadline.run(
+                            "review",
+                            review_book(
+                                reviewer,
+                                book,
+                                input_prompt,
+                                exporter,
+                                epoch,
+                                record,
+                                model=record["reviewer_model"],
+                            ),
+                        )
+            if review is not None:
+                drafts.set_review((review, score, feedback))
+                if not reused:
+                    await file_writer.call(
+                        artifacts.put, str(review), "review", epoch + 1
+                    )
+
             # Update history with current book and review
-            if int(score) > best_score:
+            scored = True
+            if scoring:
+                # Every draft of the run is ranked again in one vectorized pass
+                candidates.append(
+                    (epoch + 1, book, review, _parsed_scores(reviewer, review, score))
+                )
+                result = scoring.evaluate([parsed for *_, parsed in candidates])
+                best_epoch, previous_books[0], previous_reviews[0], _ = candidates[
+                    int(result["ranking"][0])
+                ]
+                best_score = max(best_score, int(score))
+                scored = bool(result["approved"][-1])
+                logging.info(
+                    f"Weighted score: {result['scores'][-1]:.3f}, "
+                    f"best draft so far: epoch {best_epoch}"
+                )
+            elif int(score) > best_score:
                 best_score = int(score)
                 previous_books[0] = book
                 previous_reviews[0] = review
@@ -214,25 +962,62 @@ async def main():
             previous_reviews[1] = review
 
             # Filter and export if approved
-            if filter.is_approved(int(score), review):
+            if scored and filter.is_approved(int(score), feedback):
                 logging.info("Book approved!")
+                approved = record["approved"] = True
                 timestamp = time.strftime("%Y%m%d-%H%M%S")
                 final_filename = f"book_final_{timestamp}"
-                processed_content = exporter.process_book(book)
-                exporter.export(processed_content, final_filename)
-                logging.info(f"Book exported to {exporter.output_dir}/{final_filename}.pdf")
+                paths = await asyncio.to_thread(
+                    profiling.wrap("export", export_all),
+                    book,
+                    final_filename,
+                    formats=args.export_formats,
+                    output_dir=exporter.output_dir,
+                    author=exporter.author,
+                    pdf_exporter=exporter,
+                )
+                for path in paths.values():
+                    await file_writer.call(
+                        artifacts.put_file, path, "export", epoch + 1
+                    )
+                await file_writer.call(
+                    theme_index.add, input_prompt, book, review, int(score), run_id
+                )
+                logging.info(f"Book exported to {', '.join(paths.values())}")
                 break  # Stop iterating if the book is approved
 
             # Update input prompt with feedback for next iteration
             logging.info(f"Current book score: {score}")
+            if match["stagnant"]:
+                logging.info(
+                    f"Stopping: the last {drafts.patience} drafts were near-duplicates "
+                    "of earlier ones."
+                )
+                break
             logging.info("Book not approved, refining prompt for the next iteration...")
 
+        except StageTimeout as e:
+            record["cancelled"] = e.stage
+            record["error"] = str(e)
+            if e.run_deadline:
+                logging.error(f"Run deadline reached during epoch {epoch + 1}: {e}")
+                break
+            continue
         except Exception as e:
             logging.error(f"An error occurred during epoch {epoch + 1}: {e}")
+            record["error"] = str(e)
             if approved:
                 break
             continue
+        finally:
+            await file_writer.call(metrics.record_epoch, record)
+            await file_writer.sync()
 
+    await file_writer.close()
+    metrics.close()
+    theme_index.close()
+    if profiler:
+        profiler.close()
     logging.info("\nBook generation process finished.")
 
 
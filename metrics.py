@@ -0,0 +1,253 @@
+# metrics.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+
+
+class MetricsStore:
+    """
+    Indexed store for per-epoch run metrics.
+
+    Every epoch of every run is written to a SQLite database, with category scores
+    and aspect ratings normalized into their own table so they can be aggregated
+    directly in SQL. Each record is also appended to a JSONL mirror for tooling
+    that prefers plain files.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS epochs (
+            run_id TEXT NOT NULL,
+            epoch INTEGER NOT NULL,
+            timestamp REAL NOT NULL,
+            provider TEXT,
+            writer_model TEXT,
+            reviewer_model TEXT,
+            overall_score INTEGER,
+            approved INTEGER NOT NULL DEFAULT 0,
+            writer_prompt_tokens INTEGER,
+            writer_completion_tokens INTEGER,
+            reviewer_prompt_tokens INTEGER,
+            reviewer_completion_tokens INTEGER,
+            writer_latency REAL,
+            reviewer_latency REAL,
+            error TEXT,
+            similarity REAL,
+            cancelled TEXT,
+            writer_cached_tokens INTEGER,
+            reviewer_cached_tokens INTEGER,
+            PRIMARY KEY (run_id, epoch)
+        );
+        CREATE TABLE IF NOT EXISTS scores (
+            run_id TEXT NOT NULL,
+            epoch INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value INTEGER,
+            PRIMARY KEY (run_id, epoch, kind, name)
+        );
+        CREATE INDEX IF NOT EXISTS idx_epochs_approved ON epochs (approved, run_id);
+        CREATE INDEX IF NOT EXISTS idx_scores_name ON scores (kind, name);
+    """
+
+    COLUMNS = (
+        "run_id",
+        "epoch",
+        "timestamp",
+        "provider",
+        "writer_model",
+        "reviewer_model",
+        "overall_score",
+        "approved",
+        "writer_prompt_tokens",
+        "writer_completion_tokens",
+        "reviewer_prompt_tokens",
+        "reviewer_completion_tokens",
+        "writer_latency",
+        "reviewer_latency",
+        "error",
+        "similarity",
+        "cancelled",
+        "writer_cached_tokens",
+        "reviewer_cached_tokens",
+    )
+
+    def __init__(self, db_path="output/metrics.db", jsonl_path=None):
+        """
+        Initializes the metrics store, creating the database if needed.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            jsonl_path (str, optional): Path to the JSONL mirror. Defaults to the
+                database path with a ``.jsonl`` extension.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.jsonl_path = jsonl_path or os.path.splitext(db_path)[0] + ".jsonl"
+        # Records may be written from a file-writer thread; access is serialized there
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(self.SCHEMA)
+        logging.info(f"MetricsStore initialized at: {self.db_path}")
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Returns a fresh, unique run identifier."""
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def record_epoch(self, record: dict):
+        """
+        Records the metrics of a single epoch.
+
+        Args:
+            record (dict): The epoch metrics. ``run_id`` and ``epoch`` are required;
+                any of the other ``COLUMNS`` may be given, plus ``categories`` and
+                ``aspects`` mapping names to scores and ratings.
+        """
+        row = {column: record.get(column) for column in self.COLUMNS}
+        row["timestamp"] = row["timestamp"] or time.time()
+        row["approved"] = int(bool(row["approved"]))
+        categories = record.get("categories") or {}
+        aspects = record.get("aspects") or {}
+
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO epochs ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                [row[column] for column in self.COLUMNS],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                [
+                    (row["run_id"], row["epoch"], "category", name, value)
+                    for name, value in categories.items()
+                ]
+                + [
+                    (row["run_id"], row["epoch"], "aspect", name, value)
+                    for name, value in aspects.items()
+                ],
+            )
+
+        with open(self.jsonl_path, "a", encoding="utf-8") as mirror:
+            mirror.write(
+                json.dumps(dict(row, categories=categories, aspects=aspects)) + "\n"
+            )
+
+    def epochs(self, run_id: str) -> list[dict]:
+        """Returns the recorded epochs of a run, in order."""
+        cursor = self.connection.execute(
+            "SELECT * FROM epochs WHERE run_id = ? ORDER BY epoch", (run_id,)
+        )
+        return [dict(row) for row in cursor]
+
+    def summary(self) -> dict:
+        """
+        Aggregates the whole history.
+
+        Returns:
+            dict: Run and approval counts, mean epochs-to-approval, mean scores, mean
+            latencies and the fraction of prompt tokens served from provider caches.
+        """
+        row = self.connection.execute(
+            """
+            WITH runs AS (
+                SELECT run_id,
+                       MIN(CASE WHEN approved THEN epoch END) AS approved_epoch
+                FROM epochs GROUP BY run_id
+            )
+            SELECT
+                (SELECT COUNT(*) FROM runs) AS runs,
+                (SELECT COUNT(approved_epoch) FROM runs) AS approved_runs,
+                (SELECT AVG(approved_epoch) FROM runs) AS mean_epochs_to_approval,
+                (SELECT AVG(overall_score) FROM epochs) AS mean_score,
+                (SELECT AVG(writer_latency) FROM epochs) AS mean_writer_latency,
+                (SELECT AVG(reviewer_latency) FROM epochs) AS mean_reviewer_latency,
+                (
+                    SELECT CAST(
+                        SUM(COALESCE(writer_cached_tokens, 0)
+                            + COALESCE(reviewer_cached_tokens, 0)) AS REAL
+                    ) / NULLIF(
+                        SUM(COALESCE(writer_prompt_tokens, 0)
+                            + COALESCE(reviewer_prompt_tokens, 0)), 0
+                    )
+                    FROM epochs
+                ) AS cached_prompt_ratio
+            """
+        ).fetchone()
+        return dict(row)
+
+    def score_deltas(self) -> list[dict]:
+        """
+        Computes the mean change in overall score from one epoch to the next.
+
+        Returns:
+            list[dict]: One entry per epoch number with the mean delta against the
+            previous epoch of the same run and the number of runs contributing.
+        """
+        cursor = self.connection.execute(
+            """
+            SELECT epoch, AVG(delta) AS mean_delta, COUNT(delta) AS runs
+            FROM (
+                SELECT epoch,
+                       overall_score - LAG(overall_score) OVER (
+                           PARTITION BY run_id ORDER BY epoch
+                       ) AS delta
+                FROM epochs WHERE overall_score IS NOT NULL
+            )
+            WHERE delta IS NOT NULL
+            GROUP BY epoch ORDER BY epoch
+            """
+        )
+        return [dict(row) for row in cursor]
+
+    def category_means(self) -> list[dict]:
+        """Returns the mean value of every category score and aspect rating."""
+        cursor = self.connection.execute(
+            "SELECT kind, name, AVG(value) AS mean, COUNT(*) AS samples "
+            "FROM scores GROUP BY kind, name ORDER BY kind, name"
+        )
+        return [dict(row) for row in cursor]
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
+
+
+def _print_rows(rows):
+    for row in rows:
+        print(", ".join(f"{key}: {value}" for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the run metrics store")
+    parser.add_argument(
+        "command",
+        choices=["summary", "deltas", "categories", "run"],
+        help="Aggregate to print",
+    )
+    parser.add_argument("run_id", nargs="?", help="Run to print (for 'run')")
+    parser.add_argument(
+        "--db", type=str, default="output/metrics.db", help="Metrics database path"
+    )
+    args = parser.parse_args()
+
+    store = MetricsStore(args.db)
+    try:
+        if args.command == "summary":
+            _print_rows([store.summary()])
+        elif args.command == "deltas":
+            _print_rows(store.score_deltas())
+        elif args.command == "categories":
+            _print_rows(store.category_means())
+        elif args.command == "run":
+            if not args.run_id:
+                parser.error("the 'run' command requires a run_id")
+            _print_rows(store.epochs(args.run_id))
+    finally:
+        store.close()
@@ -0,0 +1,249 @@
+# pipeline.py
+import time
+import asyncio
+import logging
+import statistics
+from xml.etree import ElementTree
+
+from book import Book
+from ensemble import aggregate_reviews, review_xml
+
+
+class ChapterStream:
+    """
+    Picks complete chapters out of a book as its XML streams in.
+
+    Text before the ``<book>`` element, such as a Markdown code fence, is skipped.
+    If the stream stops being well-formed XML, no further chapters are reported;
+    the caller falls back to the finished book for those.
+    """
+
+    def __init__(self):
+        self._parser = None
+        self._pending = ""
+        self.done = False
+
+    def feed(self, text) -> list:
+        """
+        Feeds the next piece of the book.
+
+        Args:
+            text (str): The piece, in the order it was generated.
+
+        Returns:
+            list: The ``<chapter>`` elements completed by this piece, in order.
+        """
+        if self.done:
+            return []
+        if self._parser is None:
+            self._pending += text
+            start = self._pending.find("<book")
+            if start < 0:
+                return []
+            text, self._pending = self._pending[start:], ""
+            self._parser = ElementTree.XMLPullParser(events=("end",))
+        chapters = []
+        try:
+            self._parser.feed(text)
+            # A syntax error is raised here, after the events that preceded it
+            for _, element in self._parser.read_events():
+                if element.tag == "chapter":
+                    chapters.append(element)
+                elif element.tag == "book":
+                    self.done = True
+                    break
+        except ElementTree.ParseError as e:
+            logging.warning(
+                f"Streamed book is not valid XML, pausing chapter reviews: {e}"
+            )
+            self.done = True
+        return chapters
+
+
+def _mean(values) -> int:
+    return int(round(statistics.fmean(values)))
+
+
+class PipelinedReview:
+    """
+    Writes a draft and reviews it chapter by chapter while it is being written.
+
+    Every chapter goes to its own review call as soon as its closing tag has
+    streamed in, so reviewing overlaps writing and the draft's review is ready
+    about one chapter review after its last token. The chapter reviews are
+    averaged into one review of the draft in the reviewer's XML format, with each
+    comment labelled by its chapter.
+
+    Chapters that could not be picked out of the stream, such as those written by
+    a continuation of a truncated draft, are reviewed once the draft is complete.
+
+    With a quality gate, every chapter is checked before its review is requested,
+    and the complete draft is checked as a whole once it has been written. The
+    first failure stops the pipeline: no further review is requested, the pending
+    ones are cancelled, and the draft gets the gate's review.
+    """
+
+    def __init__(
+        self, writer, reviewer, writer_model=None, reviewer_model=None, gate=None
+    ):
+        """
+        Initializes the pipeline.
+
+        Args:
+            writer (WriterAgent): The agent writing the draft.
+            reviewer (ReviewerAgent): The agent reviewing its chapters.
+            writer_model (str, optional): The model to write with.
+            reviewer_model (str, optional): The model to review with.
+            gate (QualityGate, optional): Checks every chapter before it is reviewed.
+        """
+        self.writer = writer
+        self.reviewer = reviewer
+        self.writer_model = writer_model
+        self.reviewer_model = reviewer_model
+        self.gate = gate
+
+    async def run(self, input_prompt, previous_books=None, previous_reviews=None):
+        """
+        Writes and reviews a draft.
+
+        Args:
+            input_prompt (str): The theme of the book.
+            previous_books (list, optional): The previous books for refinement.
+            previous_reviews (list, optional): The previous review feedback.
+
+        Returns:
+            dict: ``book`` with the draft, parsed into a ``Book`` if it is valid XML,
+            ``completion`` with the writer's response and its metadata, ``review``
+            with the aggregated review XML (None if no chapter was reviewed),
+            ``parsed`` with it parsed as by ``ReviewerAgent.parse_review``,
+            ``gate_review`` with the quality gate's review if a chapter failed it,
+            ``answers`` with the (label, review) of every chapter review,
+            ``writer_latency`` and ``review_latency``, the time spent reviewing after
+            the draft was complete.
+        """
+        stream = ChapterStream()
+        tasks = []
+        summaries = []
+        gate_issues = {}
+
+        def review_chapter(element):
+            if gate_issues:
+                return
+            number = len(tasks) + 1
+            if self.gate:
+                gate_issues.update(self.gate.check_chapter(element, number))
+                if gate_issues:
+                    logging.info(
+                        f"Chapter {number} failed the quality gate, "
+                        "stopping the chapter reviews."
+                    )
+                    for task in tasks:
+                        task.cancel()
+                    return
+            logging.info(f"Chapter {number} complete, sending it for review.")
+            tasks.append(
+                asyncio.create_task(
+                    self.reviewer.review_chapter(
+                        ElementTree.tostring(element, encoding="unicode"),
+                        number,
+                        input_prompt,
+                        list(summaries),
+                        model=self.reviewer_model,
+                    )
+                )
+            )
+            summaries.append((element.findtext("summary") or "").strip())
+
+        def on_text(text):
+            for element in stream.feed(text):
+                review_chapter(element)
+
+        try:
+            start = time.perf_counter()
+            completion = await self.writer.stream_book(
+                input_prompt,
+                previous_books,
+                previous_reviews,
+                model=self.writer_model,
+                on_text=on_text,
+            )
+            writer_latency = time.perf_counter() - start
+            book = completion
+            streamed = len(tasks)
+            if completion:
+                # Parsed once here; the caller reuses this Book
+                try:
+                    book = Book.from_xml(completion)
+                except ValueError as e:
+                    logging.warning(
+                        f"Cannot review the rest of the draft by chapter: {e}"
+                    )
+                    if self.gate:
+                        gate_issues.setdefault("Structure", []).append(
+                            f"The book is not valid XML: {e}."
+                        )
+                else:
+                    if self.gate and not gate_issues:
+                        # Checks of the whole book, such as the chapter count and
+                        # repetition across chapters, need the complete draft
+                        gate_issues.update(self.gate.check(book))
+                        if gate_issues:
+                            logging.info(
+                                "The complete draft failed the quality gate, "
+                                "cancelling the chapter reviews."
+                            )
+                            for task in tasks:
+                                task.cancel()
+                    if len(book.chapters) > streamed:
+                        for element in list(book.root.iter("chapter"))[streamed:]:
+                            review_chapter(element)
+            if len(tasks) > streamed:
+                logging.info(
+                    f"Reviewing {len(tasks) - streamed} chapter(s) missed while streaming."
+                )
+            start = time.perf_counter()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            review_latency = time.perf_counter() - start
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if gate_issues:
+            return {
+                "book": book,
+                "completion": completion,
+                "review": None,
+                "parsed": None,
+                "gate_review": self.gate.issues_review(gate_issues),
+                "answers": [],
+                "writer_latency": writer_latency,
+                "review_latency": review_latency,
+            }
+
+        answers, parsed_reviews = [], []
+        for number, result in enumerate(results, start=1):
+            label = f"Chapter {number}"
+            if isinstance(result, BaseException):
+                logging.warning(f"Review of chapter {number} failed: {result}")
+                continue
+            try:
+                parsed_reviews.append((label, self.reviewer.parse_review(result)))
+                answers.append((label, result))
+            except ValueError as e:
+                logging.warning(f"Review of chapter {number} is invalid: {e}")
+
+        parsed = (
+            aggregate_reviews(parsed_reviews, combine=_mean) if parsed_reviews else None
+        )
+        return {
+            "book": book,
+            "completion": completion,
+            "review": review_xml(parsed) if parsed else None,
+            "parsed": parsed,
+            "gate_review": None,
+            "answers": answers,
+            "writer_latency": writer_latency,
+            "review_latency": review_latency,
+        }
@@ -0,0 +1,253 @@
+# profiling.py
+import io
+import os
+import time
+import asyncio
+import logging
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from lazy_imports import timed_import
+
+# The profiler of the current run, if profiling is enabled. Functions decorated with
+# ``traced`` only take memory snapshots while it is set.
+_ACTIVE = None
+
+
+class Profiler:
+    """
+    Opt-in CPU and memory profiling of a run, reported to a per-run directory.
+
+    Each pipeline stage runs under cProfile, with the statistics of every run of the
+    stage accumulated; a stage nested in another on the same thread is counted in
+    the outer one. Functions decorated with ``traced`` get a tracemalloc snapshot
+    before and after every call. Asyncio debug mode logs every callback that blocks
+    the event loop for longer than ``slow_callback``.
+
+    On ``close`` the directory receives, for every stage, ``<stage>.prof`` (loadable
+    with ``pstats`` or snakeviz) and ``<stage>.txt`` with the functions taking the
+    most cumulative time, plus ``memory.txt`` and ``slow_callbacks.log``.
+    """
+
+    def __init__(self, output_dir="output/profiles", run_id=None, slow_callback=0.1):
+        """
+        Initializes the profiler and makes it the active one.
+
+        Args:
+            output_dir (str): Directory holding the reports of every run.
+            run_id (str, optional): Subdirectory of this run. Defaults to a timestamp.
+            slow_callback (float): Seconds a callback may block the event loop before
+                                   it is reported.
+        """
+        global _ACTIVE
+        self.directory = os.path.join(
+            output_dir, run_id or time.strftime("%Y%m%d-%H%M%S")
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self.slow_callback = slow_callback
+        self._stats = {}
+        self._memory = []
+        self._lock = threading.Lock()
+        # tracemalloc's peak is process-wide, so memory blocks run one at a time
+        self._memory_lock = threading.RLock()
+        self._memory_depth = 0
+        self._local = threading.local()
+        self._log_handler = None
+        # Leave the profilers' own allocations out of the memory report
+        self._ignored_files = {tracemalloc.__file__, __file__}
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        _ACTIVE = self
+        logging.info(f"Profiling enabled, reports go to: {self.directory}")
+
+    def watch_event_loop(self, loop=None):
+        """
+        Reports callbacks blocking the event loop for longer than ``slow_callback``.
+
+        Args:
+            loop (AbstractEventLoop, optional): The loop. Defaults to the running one.
+        """
+        loop = loop or asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_callback
+        self._log_handler = logging.FileHandler(
+            os.path.join(self.directory, "slow_callbacks.log"), encoding="utf-8"
+        )
+        self._log_handler.setLevel(logging.WARNING)
+        self._log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logging.getLogger("asyncio").addHandler(self._log_handler)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profiles the code in the ``with`` block as a run of a stage.
+
+        Only the calling thread is profiled; work handed to another thread should be
+        wrapped with ``wrap`` instead.
+
+        Args:
+            name (str): Name of the stage, e.g. "write" or "review".
+        """
+        if getattr(self._local, "stage", None):
+            yield
+            return
+        profile = timed_import("cProfile").Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler is active on this interpreter
+            logging.debug(f"Not profiling stage {name}: {e}")
+            yield
+            return
+        self._local.stage = name
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.stage = None
+            with self._lock:
+                if name in self._stats:
+                    self._stats[name].add(profile)
+                else:
+                    self._stats[name] = timed_import("pstats").Stats(profile)
+
+    def wrap(self, name, function):
+        """
+        Returns a function running ``function`` as a run of a stage, on whichever
+        thread calls it.
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    @contextmanager
+    def memory(self, label):
+        """
+        Records the memory allocated by the code in the ``with`` block.
+
+        Resetting tracemalloc's peak affects the whole process, so blocks on other
+        threads wait until this one is done. A block nested in another on the same
+        thread does not reset the peak; its peak is the outer block's so far.
+
+        Args:
+            label (str): Name of the measured code in the report.
+        """
+        with self._memory_lock:
+            before = tracemalloc.take_snapshot()
+            start, _ = tracemalloc.get_traced_memory()
+            if not self._memory_depth:
+                tracemalloc.reset_peak()
+            self._memory_depth += 1
+            try:
+                yield
+            finally:
+                self._memory_depth -= 1
+                current, peak = tracemalloc.get_traced_memory()
+                differences = tracemalloc.take_snapshot().compare_to(before, "lineno")
+                top = [
+                    difference
+                    for difference in differences
+                    if difference.traceback[0].filename not in self._ignored_files
+                ][:5]
+                with self._lock:
+                    self._memory.append((label, current - start, peak - start, top))
+
+    def report(self) -> dict:
+        """
+        Writes the reports of the stages and memory snapshots recorded so far.
+
+        Returns:
+            dict: Maps each stage to its total profiled seconds.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            memory = list(self._memory)
+
+        totals = {}
+        for name, stage_stats in stats.items():
+            stage_stats.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+            text = io.StringIO()
+            stage_stats.stream = text
+            stage_stats.sort_stats("cumulative").print_stats(30)
+            with open(
+                os.path.join(self.directory, f"{name}.txt"), "w", encoding="utf-8"
+            ) as report:
+                report.write(text.getvalue())
+            totals[name] = stage_stats.total_tt
+
+        with open(
+            os.path.join(self.directory, "memory.txt"), "w", encoding="utf-8"
+        ) as report:
+            for label, retained, peak, top in memory:
+                report.write(
+                    f"{label}: peak {peak / 1024:.1f} KiB, "
+                    f"retained {retained / 1024:.1f} KiB\n"
+                )
+                for difference in top:
+                    report.write(f"    {difference}\n")
+        return totals
+
+    def close(self):
+        """Writes the reports and stops profiling."""
+        global _ACTIVE
+        totals = self.report()
+        if totals:
+            logging.info(
+                "Profiled stages: "
+                + ", ".join(
+                    f"{name} {seconds:.2f}s" for name, seconds in totals.items()
+                )
+            )
+        if self._log_handler:
+            logging.getLogger("asyncio").removeHandler(self._log_handler)
+            self._log_handler.close()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if _ACTIVE is self:
+            _ACTIVE = None
+
+
+def traced(label):
+    """
+    Decorator recording the memory allocated by every call of a function while a
+    ``Profiler`` is active. Without one it adds a single global lookup per call.
+
+    Args:
+        label (str): Name of the function in the memory report.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _ACTIVE
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.memory(label):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def stage(name):
+    """
+    Context manager profiling a stage with the active profiler, if there is one.
+
+    Args:
+        name (str): Name of the stage.
+    """
+    profiler = _ACTIVE
+    return profiler.stage(name) if profiler else nullcontext()
+
+
+def wrap(name, function):
+    """Wraps a function with the active profiler's ``wrap``, if there is one."""
+    profiler = _ACTIVE
+    return profiler.wrap(name, function) if profiler else function
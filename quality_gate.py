@@ -0,0 +1,236 @@
+# quality_gate.py
+import re
+import logging
+from collections import Counter
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from book import Book, Chapter
+
+_WORD = re.compile(r"\w+(?:'\w+)?")
+
+
+def _load_schema(template) -> dict:
+    """
+    Reads the required child elements of every element from a structure template.
+
+    Args:
+        template (Element): Root of the XML structure template given to the writer.
+
+    Returns:
+        dict: Maps an element tag to the tags of its required children, in order.
+    """
+    schema = {}
+
+    def visit(element):
+        children = [child.tag for child in element if isinstance(child.tag, str)]
+        if children:
+            required = schema.setdefault(element.tag, [])
+            required.extend(
+                tag for tag in dict.fromkeys(children) if tag not in required
+            )
+        for child in element:
+            if isinstance(child.tag, str):
+                visit(child)
+
+    visit(template)
+    return schema
+
+
+class QualityGate:
+    """
+    Fast, local checks run on a draft before it is sent to the reviewer.
+
+    Drafts that are structurally broken or badly undersized are almost certain to be
+    rejected, so instead of paying for a review they go straight back to the writer
+    with machine-generated feedback in the reviewer's own XML format.
+    """
+
+    def __init__(
+        self,
+        structure_path="agents/writer/structure.xml",
+        min_chapters=4,
+        target_words=500,
+        min_word_ratio=0.3,
+        ngram_size=4,
+        max_repetition=0.2,
+    ):
+        """
+        Initializes the quality gate.
+
+        Args:
+            structure_path (str): The writer's output structure template.
+            min_chapters (int): Minimum number of chapters, as asked of the writer.
+            target_words (int): Target number of words per chapter.
+            min_word_ratio (float): Fraction of the target below which a chapter is
+                                    considered badly undersized.
+            ngram_size (int): Length of the word n-grams checked for repetition.
+            max_repetition (float): Highest allowed fraction of repeated n-grams.
+        """
+        template = ET.parse(structure_path).getroot()
+        self.schema = _load_schema(template)
+        self.root_tag = template.tag
+        self.min_chapters = min_chapters
+        self.target_words = target_words
+        self.min_word_ratio = min_word_ratio
+        self.ngram_size = ngram_size
+        self.max_repetition = max_repetition
+        logging.info(f"QualityGate initialized with schema from: {structure_path}")
+
+    def _structure_issues(self, element, path) -> list[str]:
+        """Lists the required elements missing below an element, recursively."""
+        issues = [
+            f"{path} is missing <{tag}>."
+            for tag in self.schema.get(element.tag, [])
+            if element.find(tag) is None
+        ]
+        counts = Counter()
+        for child in element:
+            counts[child.tag] += 1
+            if child.tag in self.schema:
+                child_path = f"{path}/{child.tag}[{counts[child.tag]}]"
+                issues.extend(self._structure_issues(child, child_path))
+        return issues
+
+    def _length_issues(self, chapter: Chapter, number) -> list[str]:
+        """Lists the undersized parts of a chapter."""
+        issues = []
+        min_words = int(self.target_words * self.min_word_ratio)
+        if chapter.word_count < min_words:
+            issues.append(
+                f"Chapter {number} has {chapter.word_count} words; "
+                f"aim for about {self.target_words}."
+            )
+        for section_number, section in enumerate(chapter.sections, 1):
+            if not (section.text or "").strip():
+                issues.append(f"Section {section_number} of chapter {number} is empty.")
+        return issues
+
+    def _repetition(self, book: Book):
+        """Returns the fraction of repeated word n-grams and the most repeated one."""
+        words = [
+            word.lower()
+            for chapter in book.chapters
+            for section in chapter.sections
+            for word in _WORD.findall(section.text or "")
+        ]
+        ngrams = Counter(zip(*(words[i:] for i in range(self.ngram_size))))
+        total = sum(ngrams.values())
+        if not total:
+            return 0.0, None
+        ngram, count = ngrams.most_common(1)[0]
+        return 1 - len(ngrams) / total, (" ".join(ngram), count)
+
+    def check(self, book) -> dict:
+        """
+        Runs every check on a draft.
+
+        Args:
+            book (Book | str): The parsed book, or the writer's raw output.
+
+        Returns:
+            dict: Maps an aspect ("Structure", "Length", "Repetition") to the list of
+            issues found for it. Aspects without issues are omitted.
+        """
+        issues = {}
+        try:
+            # The tree is parsed once, and a Book is built from it if not given
+            if isinstance(book, Book):
+                root = book.root
+            else:
+                root = ET.fromstring(book)
+                book = Book.from_element(root, xml=str(book))
+        except ET.ParseError as e:
+            return {"Structure": [f"The book is not valid XML: {e}."]}
+
+        if root.tag != self.root_tag:
+            issues.setdefault("Structure", []).append(
+                f"The root element must be <{self.root_tag}>, not <{root.tag}>."
+            )
+        else:
+            structure = self._structure_issues(root, self.root_tag)
+            if structure:
+                issues["Structure"] = structure
+
+        length = []
+        if len(book.chapters) < self.min_chapters:
+            length.append(
+                f"The book has {len(book.chapters)} chapters; "
+                f"at least {self.min_chapters} are required."
+            )
+        for number, chapter in enumerate(book.chapters, 1):
+            length.extend(self._length_issues(chapter, number))
+        if length:
+            issues["Length"] = length
+
+        repetition, most_repeated = self._repetition(book)
+        if repetition > self.max_repetition:
+            phrase, count = most_repeated
+            issues["Repetition"] = [
+                f"{repetition:.0%} of the {self.ngram_size}-word phrases are repeats; "
+                f'"{phrase}" alone appears {count} times.'
+            ]
+        return issues
+
+    def check_chapter(self, element, number) -> dict:
+        """
+        Runs the checks that apply to a single chapter, such as one still streaming.
+
+        Args:
+            element (Element): The <chapter> element.
+            number (int): The chapter's number, starting at 1.
+
+        Returns:
+            dict: Maps an aspect ("Structure", "Length") to the list of issues found
+            for it. Aspects without issues are omitted.
+        """
+        issues = {}
+        structure = self._structure_issues(
+            element, f"{self.root_tag}/chapters[1]/chapter[{number}]"
+        )
+        if structure:
+            issues["Structure"] = structure
+        length = self._length_issues(Chapter.from_element(element), number)
+        if length:
+            issues["Length"] = length
+        return issues
+
+    def review(self, book):
+        """
+        Checks a draft and writes the findings as a review.
+
+        Args:
+            book (Book | str): The parsed book, or the writer's raw output.
+
+        Returns:
+            str: A review XML with an overall score of 0 and one aspect per failed
+            check, in the format ``ReviewerAgent.parse_review`` reads, or None if the
+            draft passed every check.
+        """
+        return self.issues_review(self.check(book))
+
+    def issues_review(self, issues):
+        """
+        Writes the issues found by ``check`` or ``check_chapter`` as a review.
+
+        Args:
+            issues (dict): Maps an aspect to its list of issues.
+
+        Returns:
+            str: The review XML, or None if there are no issues.
+        """
+        if not issues:
+            return None
+
+        aspects = "".join(
+            f'<aspect name={quoteattr(aspect)} rating="0">'
+            f"<comment>{escape(' '.join(messages))}</comment></aspect>"
+            for aspect, messages in issues.items()
+        )
+        logging.info(
+            f"Draft failed the quality gate: {', '.join(issues)}; skipping the review."
+        )
+        return (
+            "<review><score><overall>0</overall><categories/></score>"
+            f"<feedback>{aspects}</feedback></review>"
+        )
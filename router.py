@@ -0,0 +1,140 @@
+# router.py
+import logging
+
+
+class RoleRoute:
+    """
+    Model choice for a single agent role.
+    """
+
+    def __init__(self, fast_model, strong_model, escalation_margin=10):
+        """
+        Initializes the route.
+
+        Args:
+            fast_model (str): Cheap, low-latency model used for early drafts and first-pass reviews.
+            strong_model (str): Expensive model reserved for finalists.
+            escalation_margin (int): How close to the filter threshold a score must be
+                                     before the strong model is used.
+        """
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.escalation_margin = escalation_margin
+
+    @property
+    def cascades(self) -> bool:
+        """True if the fast and strong models actually differ."""
+        return bool(self.fast_model) and self.fast_model != self.strong_model
+
+
+class ModelRouter:
+    """
+    Routes writer and reviewer calls between a fast and a strong model.
+
+    Drafts are written with the fast model until the best score so far comes within
+    the writer's escalation margin of the filter threshold. Reviews always start on
+    the fast model; a draft scoring within the reviewer's margin of the threshold gets
+    a confirmatory review from the strong model, whose verdict is the one that counts.
+    """
+
+    def __init__(self, routes, threshold):
+        """
+        Initializes the router.
+
+        Args:
+            routes (dict): Maps a role ("writer", "reviewer") to its RoleRoute.
+            threshold (int): The Filter threshold scores are compared against.
+        """
+        self.routes = routes
+        self.threshold = threshold
+        logging.info(
+            "ModelRouter initialized: "
+            + ", ".join(
+                f"{role}={route.fast_model}->{route.strong_model} (margin {route.escalation_margin})"
+                for role, route in routes.items()
+            )
+        )
+
+    @classmethod
+    def for_api(cls, api, threshold, escalation_margin=10, overrides=None, margins=None):
+        """
+        Builds a router using the API's default fast and strong models for every role.
+
+        Args:
+            api: The API instance whose MODEL_NAME/FAST_MODEL_NAME are the defaults.
+            threshold (int): The Filter threshold.
+            escalation_margin (int): Default margin for every role.
+            overrides (dict, optional): Maps a role to a (fast_model, strong_model)
+                                        tuple, or to a 1-tuple of a single model used
+                                        for both, which disables the cascade.
+            margins (dict, optional): Maps a role to its own escalation margin.
+
+        Returns:
+            ModelRouter: The configured router.
+
+        Raises:
+            ValueError: If an override does not hold one or two models.
+        """
+        overrides = overrides or {}
+        margins = margins or {}
+        routes = {}
+        for role in ("writer", "reviewer"):
+            models = tuple(overrides.get(role, (api.FAST_MODEL_NAME, api.MODEL_NAME)))
+            if len(models) not in (1, 2) or not all(models):
+                raise ValueError(
+                    f"The {role} needs one model or a fast,strong pair, got {models}."
+                )
+            fast_model, strong_model = models if len(models) == 2 else models * 2
+            margin = margins.get(role)
+            routes[role] = RoleRoute(
+                fast_model,
+                strong_model,
+                escalation_margin if margin is None else margin,
+            )
+        return cls(routes, threshold)
+
+    def _near_threshold(self, route, score) -> bool:
+        return score is not None and score >= self.threshold - route.escalation_margin
+
+    def writer_model(self, best_score=None) -> str:
+        """
+        Selects the model for the next draft.
+
+        Args:
+            best_score (int, optional): Best review score reached so far in the run.
+
+        Returns:
+            str: The model name.
+        """
+        route = self.routes["writer"]
+        if route.cascades and not self._near_threshold(route, best_score):
+            return route.fast_model
+        return route.strong_model
+
+    def reviewer_model(self, confirm=False) -> str:
+        """
+        Selects the model for a review.
+
+        Args:
+            confirm (bool): True for the final confirmatory review.
+
+        Returns:
+            str: The model name.
+        """
+        route = self.routes["reviewer"]
+        if route.cascades and not confirm:
+            return route.fast_model
+        return route.strong_model
+
+    def needs_confirmation(self, score) -> bool:
+        """
+        Checks whether a first-pass review must be confirmed by the strong model.
+
+        Args:
+            score (int): Score given by the fast reviewer.
+
+        Returns:
+            bool: True if the score is close enough to the threshold to matter.
+        """
+        route = self.routes["reviewer"]
+        return route.cascades and self._near_threshold(route, score)
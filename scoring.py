@@ -0,0 +1,164 @@
+# scoring.py
+import logging
+
+from lazy_imports import timed_import
+
+
+class ScoringEngine:
+    """
+    Weighted, vectorized scoring of parsed reviews.
+
+    A batch of reviews (as returned by ``ReviewerAgent.parse_review``) is turned into
+    a matrix with one row per candidate and one column per score: ``overall``, every
+    category score as ``category:<name>`` and every aspect rating as
+    ``aspect:<name>``, so a category and an aspect of the same name stay apart.
+    Weights and minimums are applied to the whole matrix at once, so ranking many
+    drafts costs about as much as ranking one. numpy is only imported once an
+    engine is created.
+    """
+
+    # Full scale of each kind of score in the review structure, used to bring every
+    # column to 0-1 before weighting
+    SCALES = {"overall": 100.0, "category": 100.0, "aspect": 10.0}
+
+    def __init__(self, weights=None, minimums=None, threshold=0):
+        """
+        Initializes the scoring engine.
+
+        Args:
+            weights (dict, optional): Maps a score name ("overall", "category:<name>"
+                                      or "aspect:<name>") to its weight. Defaults to
+                                      the overall score alone.
+            minimums (dict, optional): Maps a score name to the lowest value, on the
+                                       score's own scale, a candidate may have and
+                                       still be approved. A candidate missing a
+                                       constrained score fails.
+            threshold (float): Lowest weighted score, between 0 and 1, a candidate
+                               may have and still be approved.
+
+        Raises:
+            ValueError: If a weight or minimum names no known kind of score.
+        """
+        for name in list(weights or {}) + list(minimums or {}):
+            kind, _, label = name.partition(":")
+            if name != "overall" and (kind not in ("category", "aspect") or not label):
+                raise ValueError(
+                    f"Unknown score '{name}': expected 'overall', "
+                    "'category:<name>' or 'aspect:<name>'."
+                )
+        self._np = timed_import("numpy")
+        self.weights = weights if weights else {"overall": 1.0}
+        self.minimums = minimums if minimums else {}
+        self.threshold = threshold
+        logging.info(
+            f"ScoringEngine initialized with weights: {self.weights}, "
+            f"minimums: {self.minimums}, threshold: {self.threshold}"
+        )
+
+    @staticmethod
+    def _scores(review) -> dict:
+        """Flattens a parsed review into a mapping of score name to value."""
+        scores = {"overall": review.get("overall_score")}
+        scores.update(
+            (f"category:{name}", value)
+            for name, value in (review.get("categories") or {}).items()
+        )
+        feedback = review.get("feedback")
+        if isinstance(feedback, dict):
+            scores.update(
+                (f"aspect:{name}", aspect.get("rating"))
+                for name, aspect in feedback.items()
+                if isinstance(aspect, dict)
+            )
+        return scores
+
+    @classmethod
+    def _scale(cls, name) -> float:
+        """Full scale of the score with the given column name."""
+        return cls.SCALES[name.partition(":")[0]]
+
+    def matrix(self, reviews, columns=None):
+        """
+        Builds the score matrix of a batch of parsed reviews.
+
+        Args:
+            reviews (list[dict]): Parsed reviews.
+            columns (list[str], optional): Score names to use as columns. Defaults to
+                                           every name found in the reviews, sorted.
+
+        Returns:
+            tuple: (matrix, columns), where matrix is a float array of shape
+            (len(reviews), len(columns)) with NaN for missing scores.
+        """
+        np = self._np
+        rows = [self._scores(review) for review in reviews]
+        if columns is None:
+            columns = sorted({name for row in rows for name in row})
+        index = {name: j for j, name in enumerate(columns)}
+        matrix = np.full((len(rows), len(columns)), np.nan)
+        for i, row in enumerate(rows):
+            for name, value in row.items():
+                if name in index and value is not None:
+                    matrix[i, index[name]] = value
+        return matrix, list(columns)
+
+    def evaluate(self, reviews) -> dict:
+        """
+        Scores, ranks and approves a batch of parsed reviews.
+
+        The weighted score of a candidate is the weighted mean of the scores it has,
+        each divided by its full scale first, so it lies between 0 and 1. Missing
+        scores are left out rather than counted as zero.
+
+        Args:
+            reviews (list[dict]): Parsed reviews, one per candidate.
+
+        Returns:
+            dict: ``scores`` (weighted score per candidate between 0 and 1, NaN if it
+            has none of the weighted scores), ``ranking`` (candidate indices, best
+            first), ``approved`` (bool per candidate) and ``columns`` (names of the
+            matrix columns).
+        """
+        np = self._np
+        columns = sorted(set(self.weights) | set(self.minimums))
+        matrix, columns = self.matrix(reviews, columns)
+        weights = np.array([self.weights.get(name, 0.0) for name in columns])
+        minimums = np.array([self.minimums.get(name, np.nan) for name in columns])
+
+        scales = np.array([self._scale(name) for name in columns])
+
+        present = ~np.isnan(matrix)
+        weight_sums = (present * weights).sum(axis=1)
+        weighted = np.where(present, matrix / scales, 0.0) @ weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = np.where(weight_sums > 0, weighted / weight_sums, np.nan)
+
+        meets_minimums = np.all(np.isnan(minimums) | (matrix >= minimums), axis=1)
+        approved = meets_minimums & (
+            np.nan_to_num(scores, nan=-np.inf) >= self.threshold
+        )
+        ranking = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+
+        return {
+            "scores": scores,
+            "ranking": ranking,
+            "approved": approved,
+            "columns": columns,
+        }
+
+    def best(self, reviews):
+        """
+        Returns the index of the best approved candidate.
+
+        Args:
+            reviews (list[dict]): Parsed reviews, one per candidate.
+
+        Returns:
+            int: Index of the highest-scoring approved candidate, or None if no
+            candidate is approved.
+        """
+        result = self.evaluate(reviews)
+        for index in result["ranking"]:
+            if result["approved"][index]:
+                return int(index)
+        return None
@@ -0,0 +1,199 @@
+# similarity.py
+import re
+import zlib
+import logging
+
+from book import Book
+from lazy_imports import timed_import
+
+_WORD = re.compile(r"\w+(?:'\w+)?")
+# Largest prime below 2**32: products of 32-bit values modulo it never overflow
+_PRIME = 4294967291
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles, for estimating the Jaccard similarity of texts.
+
+    Every shingle is hashed once, and all permutations are applied to all shingles
+    in a single vectorized step. numpy is only imported once a hasher is created,
+    so importing this module stays cheap.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        """
+        Initializes the hasher.
+
+        Args:
+            num_perm (int): Number of hash permutations; the estimate's standard error
+                            is about 1 / sqrt(num_perm).
+            shingle_size (int): Number of words per shingle.
+            seed (int): Seed of the permutations. Signatures are only comparable
+                        between hashers with the same seed and num_perm.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._np = np = timed_import("numpy")
+        rng = np.random.default_rng(seed)
+        self._prime = np.uint64(_PRIME)
+        self._a = rng.integers(1, self._prime, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self._prime, num_perm, dtype=np.uint64)
+
+    def _shingles(self, text):
+        """Returns the 32-bit hashes of the distinct word shingles of a text."""
+        np = self._np
+        words = [word.lower() for word in _WORD.findall(text or "")]
+        size = min(self.shingle_size, len(words))
+        shingles = (
+            {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+            if size
+            else set()
+        )
+        return np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            np.ndarray: ``num_perm`` unsigned integers. Empty texts get a signature of
+            maximal values, which only matches other empty texts.
+        """
+        np = self._np
+        hashes = self._shingles(text)
+        if not hashes.size:
+            return np.full(self.num_perm, self._prime, dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % self._prime
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(a, b) -> float:
+        """Estimates the Jaccard similarity of the texts behind two signatures."""
+        return float((a == b).mean())
+
+
+def _chapter_text(chapter) -> str:
+    return "\n".join(
+        part
+        for section in chapter.sections
+        for part in (section.title, section.text)
+        if part
+    )
+
+
+class DraftTracker:
+    """
+    Remembers the drafts of a run to spot near-duplicates and stagnation.
+
+    Each draft is reduced to a book-level signature and one signature per chapter,
+    so comparing a new draft against every earlier one is cheap however long the
+    run. A draft at least ``threshold`` similar to an earlier reviewed draft can
+    reuse that review; ``patience`` near-duplicates in a row mean the run has
+    stagnated.
+    """
+
+    def __init__(self, hasher=None, threshold=0.95, patience=2):
+        """
+        Initializes the tracker.
+
+        Args:
+            hasher (MinHasher, optional): Hasher computing the signatures.
+            threshold (float): Book similarity from which a draft is a near-duplicate.
+            patience (int): Consecutive near-duplicates after which the run is
+                            considered stagnant. 0 never reports stagnation.
+        """
+        self.hasher = hasher or MinHasher()
+        self.threshold = threshold
+        self.patience = patience
+        self.drafts = []
+        self.duplicate_streak = 0
+
+    def _signatures(self, book):
+        """Returns the book signature and the chapter signatures of a draft."""
+        try:
+            book = Book.coerce(book)
+        except ValueError:
+            return self.hasher.signature(str(book)), []
+        chapters = [_chapter_text(chapter) for chapter in book.chapters]
+        return (
+            self.hasher.signature("\n".join(chapters)),
+            [self.hasher.signature(text) for text in chapters],
+        )
+
+    def compare(self, book, epoch) -> dict:
+        """
+        Compares a draft against every earlier draft, and records it.
+
+        Args:
+            book (Book | str): The new draft.
+            epoch (int): The epoch the draft was written in.
+
+        Returns:
+            dict: ``similarity`` to the closest earlier draft (0.0 if there is none),
+            ``epoch`` of that draft, ``chapters`` with the similarity of each chapter
+            to the same chapter of that draft, ``review`` with that draft's
+            (review, score, feedback) or None, ``duplicate`` and ``stagnant``.
+        """
+        signature, chapters = self._signatures(book)
+        result = {
+            "similarity": 0.0,
+            "epoch": None,
+            "chapters": [],
+            "review": None,
+            "duplicate": False,
+            "stagnant": False,
+        }
+        if self.drafts:
+            similarities = [
+                MinHasher.similarity(signature, draft["signature"])
+                for draft in self.drafts
+            ]
+            best = max(range(len(similarities)), key=similarities.__getitem__)
+            closest = self.drafts[best]
+            result["similarity"] = similarities[best]
+            result["epoch"] = closest["epoch"]
+            result["chapters"] = [
+                MinHasher.similarity(a, b)
+                for a, b in zip(chapters, closest["chapters"])
+            ]
+            result["review"] = closest["review"]
+            result["duplicate"] = result["similarity"] >= self.threshold
+
+        self.duplicate_streak = self.duplicate_streak + 1 if result["duplicate"] else 0
+        result["stagnant"] = (
+            bool(self.patience) and self.duplicate_streak >= self.patience
+        )
+        self.drafts.append(
+            {
+                "epoch": epoch,
+                "signature": signature,
+                "chapters": chapters,
+                "review": None,
+            }
+        )
+        if result["epoch"] is not None:
+            logging.info(
+                f"Draft similarity: {result['similarity']:.2f} to epoch {result['epoch']}"
+                + (
+                    f", chapters: {', '.join(f'{s:.2f}' for s in result['chapters'])}"
+                    if result["chapters"]
+                    else ""
+                )
+            )
+        return result
+
+    def set_review(self, review):
+        """
+        Attaches a review to the latest draft, so near-duplicates can reuse it.
+
+        Args:
+            review (tuple): (review, score, feedback) of the latest draft.
+        """
+        self.drafts[-1]["review"] = review
@@ -0,0 +1,42 @@
+# tests/test_artifacts.py
+import os
+import pytest
+from artifacts import ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(root=str(tmp_path / "artifacts"), run_id="run-1")
+
+
+def test_put_get_and_deduplicate(store):
+    draft = "<book><title>T</title></book>" * 100
+    digest = store.put(draft, "draft", epoch=1)
+    assert store.put(draft, "draft", epoch=2) == digest
+    assert store.get(digest) == draft.encode("utf-8")
+
+    path = store.path(digest)
+    assert path.endswith(".gz")
+    assert os.path.basename(os.path.dirname(path)) == digest[:2]
+    assert os.path.getsize(path) < len(draft)
+    assert len(os.listdir(os.path.dirname(path))) == 1
+
+    with pytest.raises(KeyError):
+        store.get("0" * 64)
+
+
+def test_manifest_and_binary_files(store, tmp_path):
+    pdf = tmp_path / "book.pdf"
+    pdf.write_bytes(b"%PDF-1.4 binary")
+    store.put("review", "review", epoch=1)
+    digest = store.put_file(str(pdf), "export", epoch=1)
+    assert not store.path(digest).endswith(".gz")
+    assert store.get(digest) == b"%PDF-1.4 binary"
+
+    assert [e["kind"] for e in store.manifest()] == ["review", "export"]
+    (entry,) = store.manifest(kind="export")
+    assert entry["name"] == "book.pdf" and entry["hash"] == digest
+
+    other_run = ArtifactStore(root=store.root, run_id="run-2")
+    assert other_run.manifest() == []
+    assert other_run.get(digest) == b"%PDF-1.4 binary"
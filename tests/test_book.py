@@ -0,0 +1,53 @@
+# tests/test_book.py
+import pytest
+from book import Book, Chapter, Section
+
+
+@pytest.fixture
+def book_xml():
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def test_parse_book(book_xml):
+    book = Book.from_xml(book_xml)
+    assert book.title == "Shadow of Doubt, Heart of Truth"
+    assert len(book.chapters) > 0
+    assert book.chapters[0].title == "The Interview Room"
+    assert book.chapters[0].sections[0].title == "First Encounter"
+    assert book.word_count == sum(c.word_count for c in book.chapters) > 0
+
+
+def test_serialize_reuses_source(book_xml):
+    book = Book.from_xml(book_xml)
+    assert book.to_xml() is book.to_xml()
+    assert str(book) == book_xml
+
+
+def test_round_trip_built_book():
+    book = Book(
+        "Built",
+        [Chapter("One", [Section("Start", "Some words here & there")], "Sum", "Note")],
+    )
+    parsed = Book.from_xml(book.to_xml())
+    assert parsed.title == "Built"
+    assert parsed.chapters[0].sections[0].text == "Some words here & there"
+    assert parsed.chapter_hashes == book.chapter_hashes
+
+
+def test_chapter_hash_changes_with_content():
+    first = Chapter("One", [Section("A", "text")])
+    second = Chapter("One", [Section("A", "text!")])
+    assert first.hash == Chapter("One", [Section("A", "text")]).hash
+    assert first.hash != second.hash
+
+
+def test_invalid_xml():
+    with pytest.raises(ValueError):
+        Book.from_xml("<book><chapters>")
+
+
+def test_slots_prevent_per_instance_dict():
+    assert not hasattr(Section(), "__dict__")
+    assert not hasattr(Chapter(), "__dict__")
+    assert not hasattr(Book(), "__dict__")
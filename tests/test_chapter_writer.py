@@ -0,0 +1,91 @@
+# tests/test_chapter_writer.py
+import re
+import json
+import asyncio
+import pytest
+from xml.etree import ElementTree as ET
+from agents.writer_chapter.chapter_writer_agent import ChapterWriterAgent
+
+
+class FakeAPI:
+    """Writes numbered chapters and can fail on a given chapter."""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.prompts = []
+
+    async def generate_text(self, prompt, model=None):
+        self.prompts.append(prompt)
+        if "<outline_prompt>" in prompt:
+            count = int(re.search(r"<chapter_count>(\d+)<", prompt).group(1))
+            chapters = "".join(
+                f"<chapter><synopsis>Synopsis {n}</synopsis></chapter>"
+                for n in range(1, count + 1)
+            )
+            return f"```xml\n<outline><title>Long</title><premise>P</premise>{chapters}</outline>\n```"
+        number = int(re.search(r"Write chapter (\d+)", prompt).group(1))
+        if number == self.fail_at:
+            raise TimeoutError("API timed out")
+        return (
+            f"<chapter><title>Chapter {number}</title><content><section>"
+            f"<title>S</title><text>Text {number}</text></section></content>"
+            f"<summary>Summary {number}</summary><notes/></chapter>"
+        )
+
+
+@pytest.fixture
+def agent_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ChapterWriterAgent, "PROMPT_LOG", str(tmp_path / "prompts.log")
+    )
+    return lambda api: ChapterWriterAgent(api, summary_window=2, outline_window=2)
+
+
+def test_prompt_holds_only_recent_summaries(tmp_path, agent_factory):
+    api = FakeAPI()
+    asyncio.run(agent_factory(api).generate_book("Theme", 6, str(tmp_path / "book")))
+
+    last = api.prompts[-1]
+    assert "Write chapter 6 of 6" in last
+    assert "Summary 4" in last and "Summary 5" in last
+    assert "Summary 3" not in last
+    assert "Synopsis 6" in last and "Synopsis 5" not in last
+    # The prompt does not grow with the number of chapters written
+    assert abs(len(api.prompts[3]) - len(api.prompts[5])) < 50
+
+
+def test_resumes_after_last_completed_chapter(tmp_path, agent_factory):
+    directory = str(tmp_path / "book")
+    with pytest.raises(TimeoutError):
+        asyncio.run(agent_factory(FakeAPI(fail_at=4)).generate_book("Theme", 5, directory))
+    # Simulate a chapter cut short while being appended
+    with open(tmp_path / "book" / "chapters.jsonl", "a", encoding="utf-8") as file:
+        file.write('{"number": 4, "summ')
+
+    api = FakeAPI()
+    agent = agent_factory(api)
+    asyncio.run(agent.generate_book("Theme", 5, directory))
+    assert len(api.prompts) == 2
+    assert "Write chapter 4 of 5" in api.prompts[0]
+    assert "Summary 3" in api.prompts[0]
+
+    with open(tmp_path / "book" / "chapters.jsonl", encoding="utf-8") as file:
+        numbers = [json.loads(line)["number"] for line in file]
+    assert numbers == [1, 2, 3, 4, 5]
+
+    root = ET.parse(agent.write_book_xml(directory, str(tmp_path / "book.xml"))).getroot()
+    assert root.findtext("title") == "Long"
+    assert [c.findtext("title") for c in root.iter("chapter")] == [
+        f"Chapter {n}" for n in range(1, 6)
+    ]
+
+
+def test_refuses_to_resume_another_book(tmp_path, agent_factory):
+    directory = str(tmp_path / "book")
+    asyncio.run(agent_factory(FakeAPI()).generate_book("Theme", 3, directory))
+
+    api = FakeAPI()
+    for theme, chapters in (("Other theme", 3), ("Theme", 4)):
+        with pytest.raises(ValueError, match="choose another directory"):
+            asyncio.run(agent_factory(api).generate_book(theme, chapters, directory))
+    assert api.prompts == []
@@ -0,0 +1,41 @@
+# tests/test_deadline.py
+import time
+import asyncio
+import pytest
+from deadline import Deadline, StageTimeout
+
+
+def test_stage_budget_cancels_and_cleans_up():
+    cleaned_up = []
+
+    async def slow_stage():
+        try:
+            await asyncio.sleep(5)
+        finally:
+            cleaned_up.append(True)
+
+    deadline = Deadline(budgets={"write": 0.01})
+    with pytest.raises(StageTimeout) as error:
+        asyncio.run(deadline.run("write", slow_stage()))
+    assert error.value.stage == "write" and not error.value.run_deadline
+    assert cleaned_up == [True]
+    assert not deadline.expired and deadline.timeout_for("review") is None
+
+
+def test_run_deadline_bounds_every_stage():
+    deadline = Deadline(0.05, {"review": 10})
+    assert deadline.timeout_for("review") <= 0.05
+    with pytest.raises(StageTimeout) as error:
+        asyncio.run(deadline.run("review", asyncio.sleep(5)))
+    assert error.value.run_deadline
+    time.sleep(0.01)
+    assert deadline.expired
+
+
+def test_timeouts_inside_a_stage_are_not_stage_timeouts():
+    async def call_times_out():
+        await asyncio.wait_for(asyncio.sleep(5), 0.01)
+
+    with pytest.raises(TimeoutError) as error:
+        asyncio.run(Deadline(10).run("write", call_times_out()))
+    assert not isinstance(error.value, StageTimeout)
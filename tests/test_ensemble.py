@@ -0,0 +1,131 @@
+# tests/test_ensemble.py
+import asyncio
+import pytest
+from ensemble import ReviewEnsemble
+from agents.reviewer.reviewer_agent import ReviewerAgent
+
+
+def review_xml(score, rating):
+    return (
+        f"<review><score><overall>{score}</overall><categories>"
+        f'<category name="Literary_Merit" score="{score // 10}" /></categories></score>'
+        f'<feedback><aspect name="Coherence" rating="{rating}">'
+        f"<comment>Rated {rating}</comment></aspect></feedback></review>"
+    )
+
+
+class FakeAPI:
+    def __init__(self, delay, review):
+        self.delay = delay
+        self.review = review
+        self.cancelled = False
+
+    async def generate_text(self, prompt, model=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.review, Exception):
+            raise self.review
+        return self.review
+
+
+def make_members(tmp_path, monkeypatch, specs):
+    monkeypatch.chdir(tmp_path)  # Keep the prompt log out of the repository
+    monkeypatch.setattr(
+        ReviewerAgent, "_load_role_description", lambda self: "Reviewer"
+    )
+    monkeypatch.setattr(ReviewerAgent, "_load_review_structure", lambda self: "")
+    apis = [FakeAPI(delay, review) for delay, review in specs]
+    members = [(f"r{i}", ReviewerAgent(api), None) for i, api in enumerate(apis)]
+    return apis, members
+
+
+def test_quorum_takes_median_and_cancels_stragglers(tmp_path, monkeypatch):
+    apis, members = make_members(
+        tmp_path,
+        monkeypatch,
+        [
+            (0.01, review_xml(80, 4)),
+            (0.02, review_xml(90, 8)),
+            (0.03, review_xml(95, 6)),
+            (5, review_xml(10, 1)),
+        ],
+    )
+    ensemble = ReviewEnsemble(members, threshold=86, quorum=3, early_agreement=3)
+    result = asyncio.run(ensemble.review("<book/>", "Theme"))
+
+    assert result["parsed"]["overall_score"] == 90
+    assert result["parsed"]["feedback"]["Coherence"]["rating"] == 6
+    assert result["cancelled"] == 1 and apis[3].cancelled
+    assert not result["early"]
+    parsed = ReviewerAgent.parse_review(None, result["review"])
+    assert parsed["overall_score"] == 90
+    assert "[r0] Rated 4" in parsed["feedback"]["Coherence"]["comment"]
+
+
+def test_clear_verdict_comes_early(tmp_path, monkeypatch):
+    apis, members = make_members(
+        tmp_path,
+        monkeypatch,
+        [
+            (0.01, review_xml(20, 2)),
+            (0.02, ValueError("provider down")),
+            (0.03, review_xml(30, 3)),
+            (0.04, review_xml(25, 2)),
+            (5, review_xml(99, 9)),
+        ],
+    )
+    ensemble = ReviewEnsemble(members, threshold=86, quorum=5, margin=10)
+    result = asyncio.run(ensemble.review("<book/>", "Theme"))
+
+    assert ensemble.early_agreement == 3
+    assert result["early"] and result["cancelled"] == 1
+    assert [label for label, _ in result["answers"]] == ["r0", "r2", "r3"]
+    assert result["parsed"]["overall_score"] == 25
+
+
+def test_single_outlier_cannot_decide(tmp_path, monkeypatch):
+    apis, members = make_members(
+        tmp_path,
+        monkeypatch,
+        [
+            (0.01, review_xml(99, 9)),
+            (0.02, review_xml(20, 2)),
+            (5, review_xml(20, 2)),
+        ],
+    )
+    ensemble = ReviewEnsemble(members, threshold=86, margin=10, early_agreement=1)
+    result = asyncio.run(ensemble.review("<book/>", "Theme"))
+
+    assert ensemble.quorum == 2 and ensemble.early_agreement is None
+    assert not result["early"] and result["cancelled"] == 1
+    assert [label for label, _ in result["answers"]] == ["r0", "r1"]
+    assert result["parsed"]["overall_score"] < 86
+
+
+def test_unclear_answer_waits_for_the_quorum(tmp_path, monkeypatch):
+    _, members = make_members(
+        tmp_path,
+        monkeypatch,
+        [
+            (0.01, review_xml(90, 8)),
+            (0.02, review_xml(80, 6)),
+            (5, review_xml(99, 9)),
+        ],
+    )
+    result = asyncio.run(
+        ReviewEnsemble(members, threshold=86, margin=10).review("<book/>", "Theme")
+    )
+
+    assert not result["early"] and result["cancelled"] == 1
+    assert result["parsed"]["overall_score"] == 85
+
+
+def test_all_reviewers_failing_raises(tmp_path, monkeypatch):
+    _, members = make_members(
+        tmp_path, monkeypatch, [(0, ValueError("down")), (0, review_xml(0, 0)[:20])]
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(ReviewEnsemble(members, threshold=86).review("<book/>", "Theme"))
@@ -1,5 +1,6 @@
 # tests/test_exporter.py
 import os
+import re
 import pytest
 from exporter import PDFExporter
 from reportlab.pdfgen import canvas
@@ -7,6 +8,7 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import logging
+from xml.etree import ElementTree as ET
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -54,4 +56,250 @@ def test_pdf_export(pdf_exporter):
         pytest.fail(f"Error when reading or analyzing PDF: {e}")
     finally:
         # Clean up
-        os.remove(filepath)
\ No newline at end of file
+        os.remove(filepath)
+
+def test_repeated_export_reuses_styles(pdf_exporter):
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+    processed_content = pdf_exporter.process_book(book_xml)
+
+    styles = pdf_exporter.styles
+    for filename in ("test_book_a", "test_book_b"):
+        pdf_exporter.export(processed_content, filename)
+        filepath = os.path.join(pdf_exporter.output_dir, f"{filename}.pdf")
+        assert os.path.getsize(filepath) > 0
+        os.remove(filepath)
+
+    # Styles are built once and never leak into ReportLab's sample style sheet
+    assert pdf_exporter.styles is styles
+    assert styles["cover_title"] is not styles["chapter_title"]
+    assert getSampleStyleSheet()["Title"].fontSize != styles["cover_title"].fontSize
+    with pytest.raises(TypeError):
+        styles["normal"] = None
+
+
+def _page_count(filepath):
+    with open(filepath, "rb") as pdf:
+        return len(re.findall(rb"/Type /Page\b(?!s)", pdf.read()))
+
+
+def test_export_stream_matches_export(pdf_exporter):
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+
+    # Streaming exports have no table of contents
+    pdf_exporter.toc = False
+    pdf_exporter.export(pdf_exporter.process_book(book_xml), "test_book_list")
+    pdf_exporter.export_stream("tests/book.txt", "test_book_stream")
+
+    list_path = os.path.join(pdf_exporter.output_dir, "test_book_list.pdf")
+    stream_path = os.path.join(pdf_exporter.output_dir, "test_book_stream.pdf")
+    try:
+        assert _page_count(stream_path) == _page_count(list_path) > 1
+    finally:
+        os.remove(list_path)
+        os.remove(stream_path)
+
+
+def test_export_table_of_contents(pdf_exporter):
+    from benchmarks.export_benchmark import make_book
+
+    content = pdf_exporter.process_book(make_book(60, sections=1, sentences=5))
+    toc_pages = len(pdf_exporter._plan_toc(content))
+    assert toc_pages == 2
+
+    pdf_exporter.toc = False
+    plain_path = pdf_exporter.export(content, "test_book_plain")
+    pdf_exporter.toc = True
+    toc_path = pdf_exporter.export(content, "test_book_toc")
+    try:
+        assert _page_count(toc_path) == _page_count(plain_path) + toc_pages
+        # The cover and TOC come first; every chapter starts on a new page
+        assert pdf_exporter._chapter_pages == list(range(4, 64))
+        with open(toc_path, "rb") as pdf:
+            data = pdf.read()
+        assert data.count(b"/Subtype /Form") == toc_pages
+        assert data.count(b"/Subtype /Link") == 60
+        assert b"/Outlines" in data
+    finally:
+        os.remove(plain_path)
+        os.remove(toc_path)
+
+
+def test_export_stream_invalid_xml(pdf_exporter, tmp_path):
+    broken = tmp_path / "broken.xml"
+    broken.write_text("<book><title>Broken</title><chapters><chapter>", encoding="utf-8")
+    with pytest.raises(ValueError):
+        pdf_exporter.export_stream(str(broken), "test_book_broken")
+
+
+def test_export_incremental_reuses_unchanged_chapters(pdf_exporter):
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+    content = pdf_exporter.process_book(book_xml)
+    fragments = len(pdf_exporter._split_into_fragments(content))
+
+    pdf_exporter.export(content, "test_book_full")
+    pdf_exporter.export_incremental(content, "test_book_incremental")
+    assert pdf_exporter.render_cache_misses == fragments
+
+    # Edit a single paragraph: only its chapter is laid out again
+    edited = [dict(item) for item in content]
+    last_paragraph = max(
+        i for i, item in enumerate(edited) if item["type"] == "paragraph"
+    )
+    edited[last_paragraph]["text"] += " An extra closing sentence."
+    pdf_exporter.export_incremental(edited, "test_book_incremental")
+    assert pdf_exporter.render_cache_misses == fragments + 1
+    assert pdf_exporter.render_cache_hits == fragments - 1
+
+    full_path = os.path.join(pdf_exporter.output_dir, "test_book_full.pdf")
+    incremental_path = os.path.join(pdf_exporter.output_dir, "test_book_incremental.pdf")
+    try:
+        assert _page_count(incremental_path) == _page_count(full_path)
+    finally:
+        os.remove(full_path)
+        os.remove(incremental_path)
+
+
+def test_export_all_formats(tmp_path):
+    import zipfile
+    from exporter import export_all
+
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+
+    paths = export_all(book_xml, "test_book", output_dir=str(tmp_path))
+    assert set(paths) == {"pdf", "epub", "html", "md"}
+    for path in paths.values():
+        assert os.path.getsize(path) > 0
+
+    with open(paths["md"], "r", encoding="utf-8") as file:
+        assert file.read().startswith("# Shadow of Doubt, Heart of Truth")
+    with open(paths["html"], "r", encoding="utf-8") as file:
+        assert "<h2>The Interview Room</h2>" in file.read()
+    with zipfile.ZipFile(paths["epub"]) as epub:
+        names = epub.namelist()
+        assert names[0] == "mimetype"
+        assert epub.read("mimetype") == b"application/epub+zip"
+        assert "OEBPS/nav.xhtml" in names
+        # Every XHTML document must be well-formed
+        for name in names:
+            if name.endswith(".xhtml"):
+                ET.fromstring(epub.read(name))
+
+
+def test_export_all_reuses_the_pdf_exporter_layouts(tmp_path):
+    from exporter import export_all
+
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+    pdf_exporter = PDFExporter(output_dir=str(tmp_path))
+    content = pdf_exporter.process_book(book_xml)
+    pdf_exporter.export_incremental(content, "draft")
+    misses = pdf_exporter.render_cache_misses
+
+    paths = export_all(
+        book_xml,
+        "final",
+        formats=["pdf"],
+        output_dir=str(tmp_path),
+        pdf_exporter=pdf_exporter,
+    )
+
+    assert pdf_exporter.render_cache_misses == misses
+    assert pdf_exporter.render_cache_hits == len(
+        pdf_exporter._split_into_fragments(content)
+    )
+    assert _page_count(paths["pdf"]) == _page_count(str(tmp_path / "draft.pdf"))
+
+
+def test_export_all_unknown_format(tmp_path):
+    from exporter import export_all
+
+    with pytest.raises(ValueError):
+        export_all("<book/>", "test_book", formats=["docx"], output_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        export_all("<book/>", "test_book", formats=[" ", ""], output_dir=str(tmp_path))
+
+
+def test_export_all_strips_format_names(tmp_path):
+    from exporter import export_all
+
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        book_xml = file.read()
+
+    paths = export_all(
+        book_xml, "test_book", formats=["md ", " html", ""], output_dir=str(tmp_path)
+    )
+    assert set(paths) == {"md", "html"}
+
+
+def test_split_paragraphs():
+    from exporter import _split_paragraphs
+
+    text = "\n        First paragraph.\n\n        Second   paragraph,\tspread out.\n      "
+    assert _split_paragraphs(text) == ["First paragraph.", "Second paragraph, spread out."]
+
+    wrapped = "First line of a paragraph\n  continues here.\n\n  Next paragraph."
+    assert _split_paragraphs(wrapped) == [
+        "First line of a paragraph continues here.",
+        "Next paragraph.",
+    ]
+
+    sentence = 'He said "stop." '
+    paragraphs = _split_paragraphs(sentence * 100, max_chars=100)
+    assert len(paragraphs) > 1
+    assert all(p.endswith('"stop."') for p in paragraphs)
+    assert " ".join(paragraphs) == (sentence * 100).strip()
+
+
+def test_export_escapes_markup(pdf_exporter):
+    book_xml = (
+        "<book><title>Fish &amp; Chips</title><chapters><chapter><title>1 &lt; 2</title>"
+        "<content><section><title>A &amp; B</title>"
+        "<text>Salt &amp; vinegar &lt;b&gt; unclosed.\n\nSecond paragraph.</text>"
+        "</section></content></chapter></chapters></book>"
+    )
+    content = pdf_exporter.process_book(book_xml)
+    assert [item["text"] for item in content if item["type"] == "paragraph"] == [
+        "Salt & vinegar <b> unclosed.",
+        "Second paragraph.",
+    ]
+    filepath = pdf_exporter.export(content, "test_book_markup")
+    try:
+        assert os.path.getsize(filepath) > 0
+    finally:
+        os.remove(filepath)
+
+
+def test_batch_export_skips_unchanged(tmp_path):
+    from exporter import batch_export
+
+    books = tmp_path / "books"
+    books.mkdir()
+    (books / "good.xml").write_text(
+        "<book><title>Good</title><chapters><chapter><title>One</title><content>"
+        "<section><title>S</title><text>Some text.</text></section>"
+        "</content></chapter></chapters></book>",
+        encoding="utf-8",
+    )
+    (books / "bad.xml").write_text("<book><title>Bad</title>", encoding="utf-8")
+    output_dir = str(tmp_path / "out")
+
+    results = batch_export([str(books)], output_dir=output_dir, workers=1)
+    assert [(os.path.basename(r["path"]), r["status"]) for r in results] == [
+        ("bad.xml", "failed"),
+        ("good.xml", "exported"),
+    ]
+    assert os.path.exists(os.path.join(output_dir, "good.pdf"))
+
+    results = batch_export([str(books / "good.xml")], output_dir=output_dir, workers=1)
+    assert results[0]["status"] == "skipped"
+
+    results = batch_export(
+        [str(books / "*.xml")], output_dir=output_dir, workers=1, force=True
+    )
+    assert [r["status"] for r in results] == ["failed", "exported"]
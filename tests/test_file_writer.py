@@ -0,0 +1,59 @@
+# tests/test_file_writer.py
+import asyncio
+import threading
+import pytest
+from file_writer import AsyncFileWriter
+
+
+def test_appends_are_batched_and_ordered(tmp_path):
+    path = str(tmp_path / "logs" / "prompts.log")
+
+    async def run():
+        writer = AsyncFileWriter(max_pending=8, batch_size=4)
+        await asyncio.gather(*(writer.append(path, f"{i}\n") for i in range(100)))
+        await writer.sync()
+        with open(path, encoding="utf-8") as log:
+            synced = log.read()
+        await writer.close()
+        return synced
+
+    assert asyncio.run(run()).split() == [str(i) for i in range(100)]
+
+
+def test_call_runs_on_writer_thread(tmp_path):
+    async def run():
+        writer = AsyncFileWriter()
+        await writer.append(str(tmp_path / "a.log"), "before\n")
+        # Calls run after the appends queued before them
+        content = await writer.call(
+            lambda: (tmp_path / "a.log").read_text(encoding="utf-8")
+        )
+        thread = await writer.call(threading.current_thread)
+        with pytest.raises(ZeroDivisionError):
+            await writer.call(lambda: 1 / 0)
+        await writer.close()
+        return content, thread
+
+    content, thread = asyncio.run(run())
+    assert content == "before\n"
+    assert thread.name == "file-writer"
+
+
+def test_cancelled_call_is_skipped(tmp_path):
+    calls = []
+
+    async def run():
+        writer = AsyncFileWriter()
+        release = threading.Event()
+        blocker = asyncio.ensure_future(writer.call(release.wait))
+        queued = asyncio.ensure_future(writer.call(calls.append, "ran"))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        await blocker
+        await writer.call(calls.append, "after")
+        await writer.close()
+
+    asyncio.run(run())
+    assert calls == ["after"]
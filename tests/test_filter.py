@@ -46,4 +46,41 @@ def test_clear_negative_keywords():
     assert filter.feedback_keywords
     filter.clear_negative_keywords()
     assert not filter.feedback_keywords
-    assert filter.is_approved(score=8, feedback="This is a poor book") == True
\ No newline at end of file
+    assert filter.is_approved(score=8, feedback="This is a poor book") == True
+
+def test_filter_parsed_feedback():
+    filter = Filter(threshold=5, feedback_keywords=["Plagiarism", "graphic violence"])
+    feedback = {
+        "Coherence": {"rating": 4, "comment": "Flows well."},
+        "Content": {"rating": 2, "comment": "Contains GRAPHIC violence in chapter 3."},
+    }
+    assert filter.is_approved(score=8, feedback=feedback) == False
+    assert filter.find_negative_keyword(feedback) == "GRAPHIC violence"
+    assert filter.is_approved(score=8, feedback={"Coherence": {"rating": 4, "comment": None}}) == True
+
+def test_filter_keywords_recompiled_on_change():
+    filter = Filter(threshold=5, feedback_keywords=["bad"])
+    assert filter.is_approved(score=8, feedback="a (weird) book") == True
+    matcher = filter._keyword_matcher()
+    assert filter._keyword_matcher() is matcher
+    filter.add_negative_keywords(["(weird)"])
+    assert filter.is_approved(score=8, feedback="a (weird) book") == False
+    filter.clear_negative_keywords()
+    assert filter._keyword_matcher() is None
+    filter.feedback_keywords = ["book"]
+    assert filter.is_approved(score=8, feedback="a (weird) book") == False
+
+def test_filter_keywords_returned_as_a_copy():
+    filter = Filter(threshold=5, feedback_keywords=["bad"])
+    filter.feedback_keywords.append("weird")
+    assert filter.feedback_keywords == ["bad"]
+    assert filter.is_approved(score=8, feedback="a weird book") == True
+
+def test_filter_approve_many(monkeypatch):
+    filter = Filter(threshold=5, feedback_keywords=[f"phrase {i}" for i in range(500)])
+    lookups = []
+    keyword_matcher = filter._keyword_matcher
+    monkeypatch.setattr(filter, "_keyword_matcher", lambda: lookups.append(1) or keyword_matcher())
+    candidates = [(8, "fine"), (4, "fine"), (9, "mentions phrase 321 here"), ("x", "fine")]
+    assert filter.approve_many(candidates) == [True, False, False, False]
+    assert len(lookups) == 1
@@ -0,0 +1,79 @@
+# tests/test_metrics.py
+import json
+import pytest
+from metrics import MetricsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(db_path=str(tmp_path / "metrics.db"))
+    yield store
+    store.close()
+
+
+def _record(run_id, epoch, score, approved=False):
+    return {
+        "run_id": run_id,
+        "epoch": epoch,
+        "provider": "mock",
+        "writer_model": "mock",
+        "reviewer_model": "mock",
+        "overall_score": score,
+        "approved": approved,
+        "writer_prompt_tokens": 100,
+        "writer_latency": 1.5,
+        "categories": {"Literary_Merit": score},
+        "aspects": {"Coherence": 7},
+    }
+
+
+def test_record_and_read_epochs(store):
+    store.record_epoch(_record("run-a", 1, 70))
+    store.record_epoch(_record("run-a", 2, 88, approved=True))
+
+    epochs = store.epochs("run-a")
+    assert [e["epoch"] for e in epochs] == [1, 2]
+    assert epochs[1]["approved"] == 1
+    assert epochs[0]["writer_prompt_tokens"] == 100
+
+
+def test_jsonl_mirror(store):
+    store.record_epoch(_record("run-a", 1, 70))
+    with open(store.jsonl_path, "r", encoding="utf-8") as mirror:
+        lines = [json.loads(line) for line in mirror]
+    assert len(lines) == 1
+    assert lines[0]["categories"] == {"Literary_Merit": 70}
+
+
+def test_summary_and_deltas(store):
+    store.record_epoch(_record("run-a", 1, 70))
+    store.record_epoch(_record("run-a", 2, 88, approved=True))
+    store.record_epoch(_record("run-b", 1, 60))
+    store.record_epoch(_record("run-b", 2, 70))
+    store.record_epoch(_record("run-b", 3, 90, approved=True))
+
+    summary = store.summary()
+    assert summary["runs"] == 2
+    assert summary["approved_runs"] == 2
+    assert summary["mean_epochs_to_approval"] == pytest.approx(2.5)
+    assert summary["cached_prompt_ratio"] == 0
+
+    deltas = {row["epoch"]: row["mean_delta"] for row in store.score_deltas()}
+    assert deltas[2] == pytest.approx(14)
+    assert deltas[3] == pytest.approx(20)
+
+
+def test_cached_prompt_ratio(store):
+    store.record_epoch(dict(_record("run-a", 1, 70), writer_cached_tokens=75))
+    store.record_epoch(dict(_record("run-a", 2, 80), reviewer_prompt_tokens=100))
+    assert store.epochs("run-a")[0]["writer_cached_tokens"] == 75
+    assert store.summary()["cached_prompt_ratio"] == pytest.approx(0.25)
+
+
+def test_category_means(store):
+    store.record_epoch(_record("run-a", 1, 70))
+    store.record_epoch(_record("run-a", 2, 90))
+    means = {(row["kind"], row["name"]): row["mean"] for row in store.category_means()}
+    assert means[("category", "Literary_Merit")] == pytest.approx(80)
+    assert means[("aspect", "Coherence")] == pytest.approx(7)
+
@@ -0,0 +1,158 @@
+# tests/test_pipeline.py
+import asyncio
+from api.api import Completion, prompt_text
+from agents.writer.writer_agent import WriterAgent
+from agents.reviewer.reviewer_agent import ReviewerAgent
+from book import Book
+from pipeline import ChapterStream, PipelinedReview
+from quality_gate import QualityGate
+
+BOOK = (
+    "<book><title>T</title><chapters>"
+    + "".join(
+        f"<chapter><title>C{n}</title><content><section><title>S{n}</title>"
+        f"<text>Text {n}.</text></section></content><summary>Sum {n}</summary></chapter>"
+        for n in range(1, 4)
+    )
+    + "</chapters></book>"
+)
+
+
+def review_xml(score, rating):
+    return (
+        f"<review><score><overall>{score}</overall><categories>"
+        f'<category name="Literary_Merit" score="{score // 10}" /></categories></score>'
+        f'<feedback><aspect name="Coherence" rating="{rating}">'
+        f"<comment>Rated {rating}</comment></aspect></feedback></review>"
+    )
+
+
+class StreamingAPI:
+    """Streams a book slowly and answers chapter reviews from a list."""
+
+    def __init__(self, book, reviews, delay=0.01):
+        self.book = book
+        self.reviews = list(reviews)
+        self.delay = delay
+        self.events = []
+
+    async def stream_text(self, prompt, model=None):
+        for start in range(0, len(self.book), 40):
+            await asyncio.sleep(self.delay)
+            yield self.book[start : start + 40]
+        self.events.append("written")
+        yield Completion("", model="w", usage={"completion_tokens": 50})
+
+    async def generate_text(self, prompt, model=None):
+        number = prompt_text(prompt).split("Review only chapter ")[1].split(" ")[0]
+        self.events.append(f"review {number}")
+        return Completion(self.reviews.pop(0), model="r", usage={"prompt_tokens": 5})
+
+
+def make_pipeline(tmp_path, monkeypatch, api, gate=None):
+    monkeypatch.chdir(tmp_path)  # Keep the prompt logs out of the repository
+    monkeypatch.setattr(WriterAgent, "_load_role_description", lambda self: "Writer")
+    monkeypatch.setattr(WriterAgent, "_load_output_structure", lambda self: "")
+    monkeypatch.setattr(
+        ReviewerAgent, "_load_role_description", lambda self: "Reviewer"
+    )
+    monkeypatch.setattr(ReviewerAgent, "_load_review_structure", lambda self: "")
+    return PipelinedReview(WriterAgent(api), ReviewerAgent(api), gate=gate)
+
+
+def test_chapter_stream_reports_chapters_as_they_close():
+    stream = ChapterStream()
+    text = "```xml\n" + BOOK + "\n```"
+    cut = BOOK.index("</chapter>") + len("</chapter>") + len("```xml\n")
+    first = stream.feed(text[:5]) + stream.feed(text[5 : cut - 3])
+    assert first == []
+    chapters = stream.feed(text[cut - 3 : cut])
+    assert [chapter.findtext("title") for chapter in chapters] == ["C1"]
+    rest = stream.feed(text[cut:])
+    assert [chapter.findtext("title") for chapter in rest] == ["C2", "C3"]
+    assert stream.done
+
+
+def test_chapter_stream_stops_on_invalid_xml():
+    stream = ChapterStream()
+    assert stream.feed("<book><chapter></section>") == []
+    assert stream.done
+    assert stream.feed("<chapter></chapter>") == []
+
+
+def test_chapters_are_reviewed_while_the_book_streams(tmp_path, monkeypatch):
+    api = StreamingAPI(BOOK, [review_xml(80, 6), review_xml(90, 8), review_xml(94, 7)])
+    pipeline = make_pipeline(tmp_path, monkeypatch, api)
+
+    result = asyncio.run(pipeline.run("Theme"))
+
+    assert isinstance(result["book"], Book)
+    assert str(result["book"]) == BOOK
+    assert result["completion"].usage == {"completion_tokens": 50}
+    # The first chapters were reviewed before the writer finished
+    assert api.events.index("review 1") < api.events.index("written")
+    assert api.events.index("review 2") < api.events.index("written")
+    assert result["parsed"]["overall_score"] == 88
+    assert result["parsed"]["feedback"]["Coherence"]["rating"] == 7
+    assert "[Chapter 3] Rated 7" in result["review"]
+    assert [label for label, _ in result["answers"]] == [
+        "Chapter 1",
+        "Chapter 2",
+        "Chapter 3",
+    ]
+
+
+def test_failed_chapter_review_is_left_out(tmp_path, monkeypatch):
+    api = StreamingAPI(BOOK, [review_xml(80, 6), "not a review", review_xml(90, 8)])
+    pipeline = make_pipeline(tmp_path, monkeypatch, api)
+
+    result = asyncio.run(pipeline.run("Theme"))
+
+    assert result["parsed"]["overall_score"] == 85
+    assert [label for label, _ in result["answers"]] == ["Chapter 1", "Chapter 3"]
+
+
+def test_later_chapters_see_earlier_summaries(tmp_path, monkeypatch):
+    api = StreamingAPI(BOOK, [review_xml(80, 6)] * 3)
+    prompts = []
+    generate_text = api.generate_text
+
+    async def record(prompt, model=None):
+        prompts.append(prompt_text(prompt))
+        return await generate_text(prompt, model)
+
+    api.generate_text = record
+    pipeline = make_pipeline(tmp_path, monkeypatch, api)
+    asyncio.run(pipeline.run("Theme"))
+
+    third = next(prompt for prompt in prompts if "Review only chapter 3" in prompt)
+    assert '<summary chapter="1">Sum 1</summary>' in third
+    assert '<summary chapter="2">Sum 2</summary>' in third
+
+
+def test_chapter_failing_the_gate_stops_the_reviews(tmp_path, monkeypatch):
+    book = BOOK.replace("</summary>", "</summary><notes>N</notes>")
+    broken = book.replace("<summary>Sum 2</summary>", "")
+    api = StreamingAPI(broken, [review_xml(80, 6)] * 3)
+    gate = QualityGate("agents/writer/structure.xml", target_words=1)
+    pipeline = make_pipeline(tmp_path, monkeypatch, api, gate)
+
+    result = asyncio.run(pipeline.run("Theme"))
+
+    # Chapter 1 may have been reviewed before chapter 2 arrived, no later one was
+    assert "review 2" not in api.events and "review 3" not in api.events
+    assert result["parsed"] is None
+    assert "chapter[2] is missing &lt;summary&gt;" in result["gate_review"]
+
+
+def test_complete_draft_failing_the_gate_gets_the_gate_review(tmp_path, monkeypatch):
+    book = BOOK.replace("</summary>", "</summary><notes>N</notes>")
+    api = StreamingAPI(book, [review_xml(80, 6)] * 3)
+    gate = QualityGate("agents/writer/structure.xml", min_chapters=4, target_words=1)
+    pipeline = make_pipeline(tmp_path, monkeypatch, api, gate)
+
+    result = asyncio.run(pipeline.run("Theme"))
+
+    # Every chapter passed on its own; the book is one chapter short
+    assert result["parsed"] is None and result["review"] is None
+    assert "The book has 3 chapters" in result["gate_review"]
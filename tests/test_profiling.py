@@ -0,0 +1,81 @@
+# tests/test_profiling.py
+import time
+import asyncio
+import threading
+import profiling
+from profiling import Profiler, traced
+
+
+@traced("build")
+def build(size):
+    return [str(i) for i in range(size)]
+
+
+def test_stages_and_memory_are_reported(tmp_path):
+    build(10)  # Not recorded without an active profiler
+    profiler = Profiler(str(tmp_path), run_id="run")
+    try:
+        with profiling.stage("parse"):
+            build(1000)
+        with profiling.stage("parse"):
+            # Nested stages count towards the outer one
+            with profiling.stage("inner"):
+                build(1000)
+        profiling.wrap("export", build)(10)
+    finally:
+        profiler.close()
+    assert profiling._ACTIVE is None
+
+    directory = tmp_path / "run"
+    for stage in ("parse", "export"):
+        assert (directory / f"{stage}.prof").exists()
+        assert "build" in (directory / f"{stage}.txt").read_text(encoding="utf-8")
+    assert not (directory / "inner.prof").exists()
+    memory = (directory / "memory.txt").read_text(encoding="utf-8")
+    assert memory.count("build: peak") == 3
+
+
+def test_memory_blocks_on_other_threads_wait(tmp_path):
+    profiler = Profiler(str(tmp_path), run_id="run")
+    inside = threading.Event()
+    order = []
+
+    def first():
+        with profiler.memory("first"):
+            data = bytearray(10_000_000)
+            del data
+            inside.set()
+            time.sleep(0.05)
+            order.append("first")
+
+    def second():
+        inside.wait()
+        # Would reset the peak of the first block if it did not wait
+        with profiler.memory("second"):
+            order.append("second")
+
+    try:
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        peaks = {label: peak for label, _, peak, _ in profiler._memory}
+    finally:
+        profiler.close()
+    assert order == ["first", "second"]
+    assert peaks["first"] >= 10_000_000
+
+
+def test_slow_callbacks_are_logged(tmp_path):
+    async def run():
+        profiler = Profiler(str(tmp_path), run_id="run", slow_callback=0.01)
+        profiler.watch_event_loop()
+        await asyncio.sleep(0)
+        time.sleep(0.05)  # Blocks the event loop
+        await asyncio.sleep(0)
+        profiler.close()
+
+    asyncio.run(run())
+    log = (tmp_path / "run" / "slow_callbacks.log").read_text(encoding="utf-8")
+    assert "took" in log
@@ -0,0 +1,75 @@
+# tests/test_quality_gate.py
+import pytest
+from quality_gate import QualityGate
+from agents.reviewer.reviewer_agent import ReviewerAgent
+from api.mock_api import MockAPI
+
+
+@pytest.fixture
+def gate():
+    return QualityGate()
+
+
+@pytest.fixture
+def book_xml():
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def test_well_formed_book_passes(gate, book_xml):
+    assert gate.check(book_xml) == {}
+    assert gate.review(book_xml) is None
+
+
+def test_invalid_xml_fails(gate):
+    issues = gate.check("<book><title>Broken</title>")
+    assert list(issues) == ["Structure"]
+    assert "not valid XML" in issues["Structure"][0]
+
+
+def test_missing_elements_and_short_chapters(gate, book_xml):
+    broken = book_xml.replace("<summary>", "<recap>", 1).replace("</summary>", "</recap>", 1)
+    issues = gate.check(broken)
+    assert issues["Structure"] == ["book/chapters[1]/chapter[1] is missing <summary>."]
+
+    short = (
+        "<book><title>T</title><chapters><chapter><title>C</title><content>"
+        "<section><title>S</title><text> </text></section></content>"
+        "<summary>S</summary><notes>N</notes></chapter></chapters></book>"
+    )
+    length = gate.check(short)["Length"]
+    assert length[0] == "The book has 1 chapters; at least 4 are required."
+    assert "Chapter 1 has 0 words" in length[1]
+    assert length[2] == "Section 1 of chapter 1 is empty."
+
+
+def test_repetition_review_is_parseable(gate, book_xml):
+    repeated = "the same four words " * 100
+    start = book_xml.index("<text>") + len("<text>")
+    end = book_xml.index("</text>")
+    review = gate.review(book_xml[:start] + repeated + book_xml[end:])
+
+    parsed = ReviewerAgent(MockAPI()).parse_review(review)
+    assert parsed["overall_score"] == 0
+    assert "Repetition" in parsed["feedback"]
+    assert '"the same four words"' in parsed["feedback"]["Repetition"]["comment"]
+
+
+def test_each_check_parses_the_book_once(gate, book_xml, monkeypatch):
+    from xml.etree import ElementTree
+    from book import Book
+
+    parsed = Book.from_xml(book_xml)
+    assert not hasattr(parsed, "_root")  # The tree is not kept alongside the model
+
+    calls = []
+    fromstring = ElementTree.fromstring
+
+    def counting(text, *args, **kwargs):
+        calls.append(text)
+        return fromstring(text, *args, **kwargs)
+
+    monkeypatch.setattr(ElementTree, "fromstring", counting)
+    assert gate.check(book_xml) == {}
+    assert gate.check(parsed) == {}
+    assert len(calls) == 2
@@ -0,0 +1,66 @@
+# tests/test_router.py
+from router import ModelRouter, RoleRoute
+
+
+def _router(margin=10):
+    return ModelRouter(
+        {
+            "writer": RoleRoute("fast-w", "strong-w", margin),
+            "reviewer": RoleRoute("fast-r", "strong-r", margin),
+        },
+        threshold=86,
+    )
+
+
+def test_writer_escalates_near_threshold():
+    router = _router()
+    assert router.writer_model(None) == "fast-w"
+    assert router.writer_model(60) == "fast-w"
+    assert router.writer_model(76) == "strong-w"
+    assert router.writer_model(90) == "strong-w"
+
+
+def test_reviewer_confirmation():
+    router = _router()
+    assert router.reviewer_model() == "fast-r"
+    assert router.reviewer_model(confirm=True) == "strong-r"
+    assert not router.needs_confirmation(50)
+    assert router.needs_confirmation(80)
+
+
+def test_same_models_never_cascade():
+    router = ModelRouter(
+        {"writer": RoleRoute("m", "m"), "reviewer": RoleRoute("m", "m")}, threshold=86
+    )
+    assert router.writer_model(None) == "m"
+    assert not router.needs_confirmation(85)
+
+
+def test_for_api_uses_provider_defaults():
+    class FakeAPI:
+        MODEL_NAME = "strong"
+        FAST_MODEL_NAME = "fast"
+
+    router = ModelRouter.for_api(
+        FakeAPI(), threshold=86, overrides={"reviewer": ("r1", "r2")}
+    )
+    assert router.writer_model(None) == "fast"
+    assert router.reviewer_model(confirm=True) == "r2"
+
+
+def test_for_api_single_model_and_role_margins():
+    class FakeAPI:
+        MODEL_NAME = "strong"
+        FAST_MODEL_NAME = "fast"
+
+    router = ModelRouter.for_api(
+        FakeAPI(),
+        threshold=86,
+        escalation_margin=10,
+        overrides={"writer": ("only",)},
+        margins={"reviewer": 2},
+    )
+    assert router.writer_model(None) == "only"
+    assert router.routes["writer"].escalation_margin == 10
+    assert router.needs_confirmation(84)
+    assert not router.needs_confirmation(80)
@@ -0,0 +1,75 @@
+# tests/test_scoring.py
+import numpy as np
+import pytest
+from scoring import ScoringEngine
+
+
+def _review(overall, categories=None, aspects=None):
+    return {
+        "overall_score": overall,
+        "categories": categories or {},
+        "feedback": {
+            name: {"rating": rating, "comment": ""}
+            for name, rating in (aspects or {}).items()
+        },
+    }
+
+
+def test_matrix_marks_missing_scores():
+    engine = ScoringEngine()
+    matrix, columns = engine.matrix(
+        [_review(80, {"Literary_Merit": 7}), _review(90, aspects={"Pacing": 4})]
+    )
+    assert columns == ["aspect:Pacing", "category:Literary_Merit", "overall"]
+    assert np.isnan(matrix[0, 0]) and np.isnan(matrix[1, 1])
+    assert matrix[:, 2].tolist() == [80, 90]
+
+
+def test_weighted_ranking_and_minimums():
+    engine = ScoringEngine(
+        weights={"overall": 1.0, "aspect:Creativity": 1.0},
+        minimums={"aspect:Grammar": 3},
+        threshold=0.55,
+    )
+    reviews = [
+        _review(80, aspects={"Creativity": 2, "Grammar": 5}),
+        _review(70, aspects={"Creativity": 5, "Grammar": 5}),
+        _review(90, aspects={"Creativity": 5, "Grammar": 2}),
+        _review(60),
+    ]
+    result = engine.evaluate(reviews)
+    assert np.allclose(result["scores"], [0.5, 0.6, 0.7, 0.6])
+    assert result["ranking"].tolist() == [2, 1, 3, 0]
+    # Below the threshold, too low on Grammar, and missing Grammar altogether
+    assert result["approved"].tolist() == [False, True, False, False]
+    assert engine.best(reviews) == 1
+
+
+def test_category_and_aspect_of_same_name_stay_apart():
+    engine = ScoringEngine(
+        weights={"category:Emotional_Impact": 1.0, "aspect:Emotional_Impact": 1.0}
+    )
+    review = _review(
+        90, categories={"Emotional_Impact": 80}, aspects={"Emotional_Impact": 4}
+    )
+    matrix, columns = engine.matrix([review])
+    assert dict(zip(columns, matrix[0])) == {
+        "aspect:Emotional_Impact": 4,
+        "category:Emotional_Impact": 80,
+        "overall": 90,
+    }
+    # Both scales count equally once normalized: (0.8 + 0.4) / 2
+    assert np.allclose(engine.evaluate([review])["scores"], [0.6])
+
+
+def test_no_candidate_approved():
+    engine = ScoringEngine(threshold=0.9)
+    assert engine.best([_review(80), _review(85)]) is None
+    assert engine.best([]) is None
+
+
+def test_unknown_score_names_are_rejected():
+    with pytest.raises(ValueError):
+        ScoringEngine(weights={"categories:Literary_Merit": 1.0})
+    with pytest.raises(ValueError):
+        ScoringEngine(minimums={"aspect:": 3})
@@ -0,0 +1,49 @@
+# tests/test_similarity.py
+import pytest
+from book import Book
+from similarity import MinHasher, DraftTracker
+
+
+@pytest.fixture
+def book_xml():
+    with open("tests/book.txt", "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256, shingle_size=1)
+    a = hasher.signature(" ".join(f"w{i}" for i in range(100)))
+    b = hasher.signature(" ".join(f"w{i}" for i in range(50, 150)))
+    # True Jaccard similarity is 50 / 150
+    assert MinHasher.similarity(a, a) == 1.0
+    assert abs(MinHasher.similarity(a, b) - 1 / 3) < 0.1
+    assert MinHasher.similarity(hasher.signature(""), a) == 0.0
+
+
+def test_tracker_reuses_review_and_detects_stagnation(book_xml):
+    tracker = DraftTracker(threshold=0.9, patience=2)
+    first = tracker.compare(Book.from_xml(book_xml), 1)
+    assert first["epoch"] is None and not first["duplicate"]
+    tracker.set_review(("<review/>", 50, {}))
+
+    second = tracker.compare(Book.from_xml(book_xml), 2)
+    assert second["duplicate"] and second["epoch"] == 1
+    assert second["chapters"] == [1.0] * 4
+    assert second["review"] == ("<review/>", 50, {})
+    assert not second["stagnant"]
+
+    third = tracker.compare(book_xml, 3)
+    assert third["stagnant"]
+
+
+def test_tracker_chapter_level_changes(book_xml):
+    tracker = DraftTracker()
+    book = Book.from_xml(book_xml)
+    tracker.compare(book, 1)
+
+    rewritten = Book.from_xml(book_xml)
+    rewritten.chapters[2].sections[0].text = "An entirely different passage " * 20
+    result = tracker.compare(rewritten, 2)
+    assert result["chapters"][0] == 1.0
+    assert result["chapters"][2] < 0.5
+    assert not result["duplicate"]
@@ -0,0 +1,63 @@
+# tests/test_theme_index.py
+import pytest
+from theme_index import ThemeIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ThemeIndex(str(tmp_path / "themes.db"))
+    yield index
+    index.close()
+
+
+def test_nearest_ranks_similar_themes_first(index):
+    index.add("A mystery in a haunted house", "<book>1</book>", score=88)
+    index.add("A sci-fi thriller on a space station", "<book>2</book>", score=90)
+    index.add("A romance between a detective and a suspect", "<book>3</book>")
+
+    matches = index.nearest("Haunted house mystery", k=3)
+
+    assert matches[0]["theme"] == "A mystery in a haunted house"
+    assert matches[0]["similarity"] > 0.7
+    assert all(m["similarity"] < 0.3 for m in matches[1:])
+    assert index.nearest("Xyzzy") == []
+
+
+def test_identical_theme_prefers_best_book(index):
+    index.add("A fantasy adventure", "<book>low</book>", score=87)
+    index.add("A fantasy adventure", "<book>high</book>", score=95)
+
+    match = index.nearest("A fantasy adventure")[0]
+
+    assert match["similarity"] == pytest.approx(1.0)
+    assert match["score"] == 95
+
+
+def test_seed_returns_book_and_review_above_threshold(index):
+    index.add(
+        "A mystery in a haunted house",
+        "<book>ghosts</book>",
+        "<review>ok</review>",
+        91,
+        "run-1",
+    )
+
+    seed = index.seed("A mystery in a haunted house", min_similarity=0.7)
+    assert seed["book"] == "<book>ghosts</book>"
+    assert seed["review"] == "<review>ok</review>"
+    assert seed["run_id"] == "run-1"
+    assert index.seed("A sci-fi thriller on a space station", 0.7) is None
+
+
+def test_index_persists_across_instances(tmp_path):
+    path = str(tmp_path / "themes.db")
+    index = ThemeIndex(path)
+    index.add("A mystery in a haunted house", "<book/>", score=90)
+    index.close()
+
+    reopened = ThemeIndex(path)
+    try:
+        assert len(reopened) == 1
+        assert reopened.seed("A mystery in a haunted house")["score"] == 90
+    finally:
+        reopened.close()
@@ -0,0 +1,92 @@
+# tests/test_writer_agent.py
+import asyncio
+import pytest
+from api.api import Completion, prompt_text
+from agents.writer.writer_agent import WriterAgent, _complete_prefix
+from book import Book
+
+BOOK = (
+    "<book><title>T</title><chapters>"
+    "<chapter><title>One</title><content><section><title>S1</title>"
+    "<text>First text.</text></section></content><summary>A</summary></chapter>"
+    "<chapter><title>Two</title><content><section><title>S2</title>"
+    "<text>Second text.</text></section></content><summary>B</summary></chapter>"
+    "</chapters></book>"
+)
+
+
+class FakeAPI:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def generate_text(self, prompt, model=None):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    def make(responses):
+        writer = WriterAgent(FakeAPI(responses))
+        writer._log_prompt = lambda prompt: asyncio.sleep(0)
+        return writer
+
+    return make
+
+
+def test_complete_prefix_cuts_to_last_complete_element():
+    cut = BOOK.index("<text>Second")
+    prefix, open_elements = _complete_prefix(BOOK[: cut + 10])
+    assert prefix == BOOK[:cut]
+    assert open_elements == ["book", "chapters", "chapter", "content", "section"]
+
+
+def test_truncated_book_is_continued(writer):
+    cut = BOOK.index("Second") + 3
+    first = Completion(
+        "```xml\n" + BOOK[:cut],
+        model="m",
+        usage={"completion_tokens": 100},
+        finish_reason="length",
+    )
+    rest = BOOK[BOOK.index("<text>Second") :]
+    second = Completion(rest, usage={"completion_tokens": 10}, finish_reason="stop")
+    agent = writer([first, second])
+
+    book = asyncio.run(agent.generate_book("Theme"))
+    assert len(agent.api.prompts) == 2
+    continuation = agent.api.prompts[1]
+    assert continuation[0] == agent.api.prompts[0][0]  # Same cacheable prefix
+    assert "<partial_book>" in prompt_text(continuation)
+    assert str(book) == BOOK
+    assert book.model == "m" and book.usage == {"completion_tokens": 110}
+    assert not book.truncated
+
+
+def test_book_is_closed_when_continuations_run_out(writer):
+    cut = BOOK.index("<chapter><title>Two")
+    truncated = Completion(BOOK[: cut + 30], finish_reason="length")
+    agent = writer([truncated, truncated, truncated])
+    agent.max_continuations = 1
+
+    book = Book.from_xml(asyncio.run(agent.generate_book("Theme")))
+    assert len(agent.api.prompts) == 2
+    assert [chapter.title for chapter in book.chapters] == ["One", "Two"]
+
+
+def test_prompt_starts_with_static_system_message(writer):
+    agent = writer([BOOK, BOOK])
+    asyncio.run(agent.generate_book("Theme"))
+    asyncio.run(agent.generate_book("Theme", [BOOK, BOOK], ["<review/>", "<review/>"]))
+    first, second = agent.api.prompts
+    assert first[0] == second[0] == {"role": "system", "content": agent.system_prompt}
+    assert "<output_structure>" in first[0]["content"]
+    assert second[1]["content"].startswith("<theme>Theme</theme><best_book>")
+    assert "<output_structure>" not in second[1]["content"]
+
+
+def test_complete_book_is_not_continued(writer):
+    agent = writer([Completion(BOOK, finish_reason="stop")])
+    assert asyncio.run(agent.generate_book("Theme")) == BOOK
+    assert len(agent.api.prompts) == 1
@@ -0,0 +1,203 @@
+# theme_index.py
+import os
+import re
+import math
+import time
+import sqlite3
+import logging
+from collections import Counter
+
+_WORD = re.compile(r"\w+(?:'\w+)?")
+
+
+def _features(text) -> Counter:
+    """
+    Returns the term counts of a theme: its words, word pairs and the character
+    trigrams of its words, so that "detectives" still matches "detective".
+    """
+    words = [word.lower() for word in _WORD.findall(text or "")]
+    features = Counter(f"w:{word}" for word in words)
+    features.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f" {word} "
+        features.update(f"c:{padded[i : i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+class ThemeIndex:
+    """
+    Index of the themes of approved books, for warm-starting runs on similar themes.
+
+    Themes are compared by the cosine similarity of their TF-IDF vectors over words,
+    word pairs and character trigrams. The vectors are held in an inverted index, so
+    a lookup only scores the themes sharing at least one term with the query. The
+    books and reviews themselves stay in SQLite until a match asks for them.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS themes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            theme TEXT NOT NULL,
+            run_id TEXT,
+            score INTEGER,
+            book TEXT NOT NULL,
+            review TEXT,
+            timestamp REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path="output/theme_index.db"):
+        """
+        Initializes the index, loading the themes of the database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        # Books may be added from a file-writer thread; access is serialized there
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(self.SCHEMA)
+        self._postings = {}  # term -> {theme id: count}
+        self._themes = {}  # theme id -> row without the book and review
+        self._norms = None
+        for row in self.connection.execute(
+            "SELECT id, theme, run_id, score FROM themes ORDER BY id"
+        ):
+            self._index(dict(row))
+        logging.info(f"ThemeIndex initialized with {len(self)} themes at: {db_path}")
+
+    def __len__(self):
+        return len(self._themes)
+
+    def _index(self, row):
+        self._themes[row["id"]] = row
+        for term, count in _features(row["theme"]).items():
+            self._postings.setdefault(term, {})[row["id"]] = count
+        self._norms = None
+
+    def _idf(self, term) -> float:
+        frequency = len(self._postings.get(term, ()))
+        return math.log((1 + len(self._themes)) / (1 + frequency)) + 1
+
+    def _theme_norms(self) -> dict:
+        """Vector lengths of the indexed themes, recomputed after the IDF changes."""
+        if self._norms is None:
+            squares = dict.fromkeys(self._themes, 0.0)
+            for term, postings in self._postings.items():
+                idf = self._idf(term)
+                for theme_id, count in postings.items():
+                    squares[theme_id] += (count * idf) ** 2
+            self._norms = {theme_id: math.sqrt(s) for theme_id, s in squares.items()}
+        return self._norms
+
+    def add(self, theme, book, review=None, score=None, run_id=None) -> int:
+        """
+        Adds an approved book.
+
+        Args:
+            theme (str): The theme the book was written on.
+            book (str): The book's XML.
+            review (str, optional): The review that approved it.
+            score (int, optional): Its overall score.
+            run_id (str, optional): The run that wrote it.
+
+        Returns:
+            int: Identifier of the new entry.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO themes (theme, run_id, score, book, review, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (theme, run_id, score, str(book), review and str(review), time.time()),
+            )
+        row = {"id": cursor.lastrowid, "theme": theme, "run_id": run_id, "score": score}
+        self._index(row)
+        return row["id"]
+
+    def nearest(self, theme, k=1) -> list[dict]:
+        """
+        Finds the indexed themes closest to a theme.
+
+        Args:
+            theme (str): The theme to look up.
+            k (int): Number of matches to return.
+
+        Returns:
+            list[dict]: Up to ``k`` matches, closest first, each with the ``id``,
+            ``theme``, ``run_id`` and ``score`` of the entry and its ``similarity``
+            to the query between 0 and 1. Themes sharing no term are left out.
+        """
+        query = {
+            term: count * self._idf(term) for term, count in _features(theme).items()
+        }
+        query_norm = math.sqrt(sum(weight**2 for weight in query.values()))
+        dots = {}
+        for term, weight in query.items():
+            if term not in self._postings:
+                continue
+            idf = self._idf(term)
+            for theme_id, count in self._postings[term].items():
+                dots[theme_id] = dots.get(theme_id, 0.0) + weight * count * idf
+        if not dots:
+            return []
+        norms = self._theme_norms()
+        matches = [
+            dict(
+                self._themes[theme_id], similarity=dot / (query_norm * norms[theme_id])
+            )
+            for theme_id, dot in dots.items()
+        ]
+        # Among equally close themes, prefer the best book
+        matches.sort(key=lambda m: (-m["similarity"], -(m["score"] or 0)))
+        return matches[:k]
+
+    def seed(self, theme, min_similarity=0.5):
+        """
+        Returns the approved book to start a run on a theme from.
+
+        Args:
+            theme (str): The theme of the new run.
+            min_similarity (float): Similarity below which no book is returned.
+
+        Returns:
+            dict: The closest match as returned by ``nearest``, with its ``book`` and
+            ``review``, or None if no indexed theme is close enough.
+        """
+        matches = self.nearest(theme)
+        if not matches or matches[0]["similarity"] < min_similarity:
+            return None
+        match = matches[0]
+        row = self.connection.execute(
+            "SELECT book, review FROM themes WHERE id = ?", (match["id"],)
+        ).fetchone()
+        return dict(match, book=row["book"], review=row["review"])
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the index of approved themes")
+    parser.add_argument("theme", help="Theme to find the closest approved books for")
+    parser.add_argument("-k", type=int, default=5, help="Number of matches to print")
+    parser.add_argument(
+        "--db", type=str, default="output/theme_index.db", help="Theme index path"
+    )
+    args = parser.parse_args()
+
+    index = ThemeIndex(args.db)
+    try:
+        for match in index.nearest(args.theme, args.k):
+            print(
+                f"{match['similarity']:.3f}  score {match['score']}  "
+                f"run {match['run_id']}  {match['theme']}"
+            )
+    finally:
+        index.close()